@@ -0,0 +1,175 @@
+"""
+Buffered ActivityLog writes.
+
+log_activity() builds the ActivityLog row for an action, with the user,
+IP address and user agent taken from the request, and hands it to the
+process's ActivityLogWriter once the surrounding transaction commits, so
+a rolled-back write leaves no audit entry behind.
+
+The writer keeps rows in a bounded in-memory queue drained by a
+background thread, which inserts them with bulk_create() once
+ACTIVITY_LOG_BATCH_SIZE rows are waiting or ACTIVITY_LOG_FLUSH_INTERVAL
+seconds have passed, and once more at interpreter shutdown. When the
+queue is full, or ACTIVITY_LOG_ASYNC is off, the row is inserted in the
+caller's thread instead.
+
+Entries still queued when a process is killed outright are lost; run
+with ACTIVITY_LOG_ASYNC = False where every entry must be durable
+before the response is sent. Values are stored as given, so callers
+must not mutate old_values/new_values after logging them.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT_MAX_LENGTH = ActivityLog._meta.get_field('user_agent').max_length
+
+
+def get_client_ip(request):
+    """Get client IP address from request"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0].strip()
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return ip or None
+
+
+# ============= WRITER =============
+class ActivityLogWriter:
+    """Bounded queue of ActivityLog rows, inserted in batches by a background thread"""
+
+    def __init__(self, batch_size=None, flush_interval=None, max_size=None):
+        self.batch_size = batch_size or getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 100)
+        self.flush_interval = flush_interval or getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 2.0)
+        self.queue = queue.Queue(maxsize=max_size or getattr(settings, 'ACTIVITY_LOG_QUEUE_SIZE', 10000))
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+        self.stopping = threading.Event()
+
+    def put(self, entry):
+        """Queue one unsaved ActivityLog, inserting it directly when the queue is full"""
+        self.ensure_started()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.write([entry])
+
+    def ensure_started(self):
+        # A forked worker inherits the queue but not the thread
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, name='activity-log-writer', daemon=True)
+            self.thread.start()
+
+    def run(self):
+        try:
+            while not self.stopping.is_set():
+                batch = self.collect()
+                if batch:
+                    self.write(batch)
+                close_old_connections()
+        finally:
+            connection.close()
+
+    def collect(self):
+        """Wait for a full batch or the flush interval, whichever comes first"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0 or self.stopping.is_set():
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def flush(self):
+        """Insert everything queued so far in the calling thread"""
+        batch = self.drain()
+        for start in range(0, len(batch), self.batch_size):
+            self.write(batch[start:start + self.batch_size])
+        return len(batch)
+
+    def write(self, batch):
+        try:
+            ActivityLog.objects.bulk_create(batch)
+        except Exception:
+            # One bad row (e.g. a deleted user) must not drop the whole batch
+            for entry in batch:
+                try:
+                    entry.save()
+                except Exception:
+                    logger.exception('Dropped activity log entry %s', entry.action)
+
+    def stop(self, timeout=5.0):
+        """Stop the background thread and write whatever is still queued"""
+        self.stopping.set()
+        if self.thread is not None and self.pid == os.getpid():
+            self.thread.join(timeout)
+        self.thread = None
+        self.flush()
+
+
+writer = ActivityLogWriter()
+atexit.register(writer.stop)
+
+
+# ============= API =============
+def log_activity(request, action, table_name=None, record_id=None, old_values=None, new_values=None, user=None):
+    """
+    Record an action in the activity log.
+
+    `request` supplies the user, IP address and user agent; pass None
+    outside a request (jobs, commands) and give `user` instead.
+    """
+    ip_address = user_agent = None
+    if request is not None:
+        if user is None:
+            user = request.user
+        ip_address = get_client_ip(request)
+        user_agent = request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_MAX_LENGTH] or None
+    if user is not None and not user.is_authenticated:
+        user = None
+
+    entry = ActivityLog(
+        user=user,
+        action=action,
+        table_name=table_name,
+        record_id=record_id,
+        old_values=old_values,
+        new_values=new_values,
+        ip_address=ip_address,
+        user_agent=user_agent,
+    )
+    if getattr(settings, 'ACTIVITY_LOG_ASYNC', True):
+        transaction.on_commit(lambda: writer.put(entry))
+    else:
+        transaction.on_commit(entry.save)
+    return entry
@@ -0,0 +1,258 @@
+"""
+Activity log retention.
+
+The activity_log table holds the hot window: the last
+ACTIVITY_LOG_RETENTION_DAYS days. archive_before() moves older rows, in
+created_at order, into gzip-compressed JSON-lines files under
+ACTIVITY_LOG_ARCHIVE_DIR, one file per day:
+
+    <ACTIVITY_LOG_ARCHIVE_DIR>/2026/10/2026-10-17.jsonl.gz
+
+Each run appends a new gzip member to the day's file and only deletes
+the rows once the file is synced to disk. A run interrupted in between
+archives those rows again next time; readers skip the repeats.
+
+On MySQL the live table is range-partitioned by month (migration 0030).
+ensure_partitions() keeps partitions ready for the coming months and
+drop_partitions_before() drops the months that archiving has emptied,
+so old rows never linger in the table or its indexes.
+
+read_activity() answers a date range newest first from the table and,
+for the part of the range older than the table's oldest row, from the
+archive files.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ActivityLog
+
+ACTIVITY_LOG_RETENTION_DAYS = getattr(settings, 'ACTIVITY_LOG_RETENTION_DAYS', 90)
+ARCHIVE_BATCH_SIZE = 5000
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'user__username', 'action', 'table_name', 'record_id',
+    'old_values', 'new_values', 'ip_address', 'user_agent', 'created_at',
+)
+
+
+def archive_dir():
+    return str(getattr(settings, 'ACTIVITY_LOG_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'activity_log'))
+
+
+def archive_path(day):
+    return os.path.join(archive_dir(), f'{day:%Y}', f'{day:%m}', f'{day:%Y-%m-%d}.jsonl.gz')
+
+
+def entry_day(created_at):
+    return timezone.localtime(created_at).date() if timezone.is_aware(created_at) else created_at.date()
+
+
+def entry_to_dict(row):
+    entry = dict(row)
+    entry['username'] = entry.pop('user__username')
+    entry['created_at'] = entry['created_at'].isoformat()
+    return entry
+
+
+# ============= ARCHIVING =============
+def archive_before(cutoff, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """Move rows created before `cutoff` to the archive files; returns the number moved"""
+    queryset = ActivityLog.objects.filter(created_at__lt=cutoff).order_by('created_at', 'id')
+    if dry_run:
+        return queryset.count()
+
+    moved = 0
+    while True:
+        rows = list(queryset.values(*ARCHIVE_FIELDS)[:batch_size])
+        if not rows:
+            return moved
+
+        days = {}
+        for row in rows:
+            days.setdefault(entry_day(row['created_at']), []).append(entry_to_dict(row))
+        for day, entries in days.items():
+            append_entries(day, entries)
+
+        ActivityLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+
+
+def append_entries(day, entries):
+    path = archive_path(day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+            for entry in entries:
+                archive.write(json.dumps(entry, cls=DjangoJSONEncoder).encode() + b'\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archived_days(start_day=None, end_day=None):
+    """Days with an archive file, newest first"""
+    root = archive_dir()
+    if not os.path.isdir(root):
+        return []
+    days = []
+    for _, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith('.jsonl.gz'):
+                continue
+            try:
+                day = date.fromisoformat(filename[:-len('.jsonl.gz')])
+            except ValueError:
+                continue
+            if (start_day is None or day >= start_day) and (end_day is None or day <= end_day):
+                days.append(day)
+    return sorted(days, reverse=True)
+
+
+def read_archived_day(day):
+    with gzip.open(archive_path(day), 'rt', encoding='utf-8') as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+
+# ============= READING =============
+def read_activity(start=None, end=None, user_id=None, action=None, table_name=None):
+    """
+    Activity entries created in [start, end), newest first, as dicts.
+
+    Rows still in the table come first; the archive files are only
+    opened for days older than the table's oldest row.
+    """
+    queryset = ActivityLog.objects.order_by('-created_at', '-id')
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    if action:
+        queryset = queryset.filter(action=action)
+    if table_name:
+        queryset = queryset.filter(table_name=table_name)
+    for row in queryset.values(*ARCHIVE_FIELDS).iterator():
+        yield entry_to_dict(row)
+
+    # Archiving always takes the oldest rows, so the table's oldest row is
+    # where the archive ends; anything at or after it is still in the table
+    hot_floor = ActivityLog.objects.order_by('created_at', 'id').values_list('created_at', 'id').first()
+    if hot_floor is not None and start is not None and start >= hot_floor[0]:
+        return
+    last_days = []
+    if end is not None:
+        last_days.append(entry_day(end - timedelta(microseconds=1)))
+    if hot_floor is not None:
+        last_days.append(entry_day(hot_floor[0]))
+
+    for day in archived_days(entry_day(start) if start is not None else None, min(last_days, default=None)):
+        seen = set()
+        for entry in reversed(read_archived_day(day)):
+            if entry['id'] in seen:
+                continue
+            seen.add(entry['id'])
+            created_at = parse_datetime(entry['created_at'])
+            if hot_floor is not None and (created_at, entry['id']) >= hot_floor:
+                continue
+            if (start is not None and created_at < start) or (end is not None and created_at >= end):
+                continue
+            if user_id is not None and entry['user_id'] != user_id:
+                continue
+            if (action and entry['action'] != action) or (table_name and entry['table_name'] != table_name):
+                continue
+            yield entry
+
+
+# ============= MYSQL PARTITIONS =============
+def partition_name(month):
+    """Partition holding the rows of `month` (the first day of a month)"""
+    return f'p{month:%Y%m}'
+
+
+def partition_month(name):
+    """First day of the month a pYYYYMM partition holds, None for other partitions"""
+    try:
+        return datetime.strptime(name, 'p%Y%m').date()
+    except ValueError:
+        return None
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_bounds():
+    """{partition name: upper bound (TO_DAYS value or 'MAXVALUE')} of the live table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT partition_name, partition_description FROM information_schema.partitions "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL",
+            [ActivityLog._meta.db_table],
+        )
+        return dict(cursor.fetchall())
+
+
+def month_partitions(first_month, months):
+    month, clauses = first_month, []
+    for _ in range(months):
+        clauses.append(
+            f"PARTITION {partition_name(month)} VALUES LESS THAN (TO_DAYS('{next_month(month):%Y-%m-%d}'))"
+        )
+        month = next_month(month)
+    return clauses
+
+
+def ensure_partitions(months_ahead=3):
+    """Split the catch-all partition so the next `months_ahead` months each have one; returns the names added"""
+    if connection.vendor != 'mysql':
+        return []
+    existing = partition_bounds()
+    if 'p_future' not in existing:
+        return []
+
+    target = timezone.localdate().replace(day=1)
+    for _ in range(months_ahead):
+        target = next_month(target)
+    months = [partition_month(name) for name in existing if partition_month(name)]
+    month = next_month(max(months)) if months else timezone.localdate().replace(day=1)
+    clauses = []
+    while month <= target:
+        clauses.extend(month_partitions(month, 1))
+        month = next_month(month)
+    if not clauses:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {ActivityLog._meta.db_table} REORGANIZE PARTITION p_future INTO "
+            f"({', '.join(clauses)}, PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        )
+    return [clause.split()[1] for clause in clauses]
+
+
+def drop_partitions_before(cutoff):
+    """Drop the monthly partitions that end on or before `cutoff`; returns their names"""
+    if connection.vendor != 'mysql':
+        return []
+    cutoff_day = entry_day(cutoff)
+    dropped = []
+    for name in sorted(partition_bounds()):
+        month = partition_month(name)
+        if month is None or next_month(month) > cutoff_day:
+            continue
+        # Only drop months that archiving has already emptied
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM {ActivityLog._meta.db_table} PARTITION ({name}) LIMIT 1")
+            if cursor.fetchone():
+                continue
+            cursor.execute(f"ALTER TABLE {ActivityLog._meta.db_table} DROP PARTITION {name}")
+        dropped.append(name)
+    return dropped
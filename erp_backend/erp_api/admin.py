@@ -116,6 +116,18 @@ class ProductTrackingAdmin(admin.ModelAdmin):
     list_filter = ('status',)
     search_fields = ('tracking_number', 'order__order_number')
 
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'quantity', 'status', 'order', 'website_order', 'expires_at')
+    list_filter = ('status',)
+    search_fields = ('product__name', 'product__sku')
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('product', 'movement_type', 'quantity', 'order', 'website_order', 'created_at')
+    list_filter = ('movement_type',)
+    search_fields = ('product__name', 'product__sku')
+
 @admin.register(Permission)
 class PermissionAdmin(admin.ModelAdmin):
     list_display = ('role', 'module', 'can_view', 'can_create', 'can_edit', 'can_delete')
@@ -0,0 +1,145 @@
+"""
+Grouped aggregation helpers for dashboard and report endpoints.
+Order figures are read from DailySalesRollup; each helper issues a
+single query regardless of how many days or categories are involved.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Customer, DailySalesRollup, OrderItem, Product
+
+
+def order_summary(today, source='erp'):
+    """
+    Collect order counts and delivered sales for today, the last 7 days
+    and the last 30 days in one pass over the rollup table.
+    """
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+    delivered = Q(status='delivered')
+
+    today_q = Q(date=today)
+    week_q = Q(date__gte=week_ago)
+    month_q = Q(date__gte=month_ago)
+
+    summary = DailySalesRollup.objects.filter(source=source).aggregate(
+        total_orders=Sum('order_count'),
+        pending_orders=Sum('order_count', filter=Q(status='pending')),
+        today_orders=Sum('order_count', filter=today_q),
+        today_sales=Sum('grand_total', filter=today_q & delivered),
+        week_orders=Sum('order_count', filter=week_q),
+        week_sales=Sum('grand_total', filter=week_q & delivered),
+        month_orders=Sum('order_count', filter=month_q),
+        month_sales=Sum('grand_total', filter=month_q & delivered),
+    )
+    for key in ('total_orders', 'pending_orders', 'today_orders', 'week_orders', 'month_orders'):
+        summary[key] = summary[key] or 0
+    for key in ('today_sales', 'week_sales', 'month_sales'):
+        summary[key] = summary[key] or Decimal('0')
+    return summary
+
+
+def daily_sales_series(end_date, days=7, status='delivered', source='erp'):
+    """
+    Return [{'date': 'YYYY-MM-DD', 'sales': float}, ...] for the `days`
+    days ending on `end_date`, with missing days filled with zero.
+    """
+    start_date = end_date - timedelta(days=days - 1)
+    rows = DailySalesRollup.objects.filter(
+        source=source, status=status, date__range=[start_date, end_date]
+    ).values_list('date', 'grand_total')
+    totals = dict(rows)
+
+    series = []
+    for i in range(days):
+        date = start_date + timedelta(days=i)
+        series.append({
+            'date': date.strftime('%Y-%m-%d'),
+            'sales': float(totals.get(date, 0)),
+        })
+    return series
+
+
+def sales_report(start_date, end_date, status='delivered', source='erp'):
+    """Per-day sales totals and order counts between two dates"""
+    return list(
+        DailySalesRollup.objects.filter(
+            source=source, status=status, date__range=[start_date, end_date]
+        ).values('date').annotate(
+            total_sales=Sum('grand_total'),
+            order_count=Sum('order_count'),
+        ).order_by('date')
+    )
+
+
+def orders_by_status(source='erp'):
+    """Order count per status"""
+    return list(
+        DailySalesRollup.objects.filter(source=source).values('status').annotate(
+            count=Sum('order_count')
+        ).order_by('status')
+    )
+
+
+def revenue_by_category():
+    """Order item revenue grouped by product category, skipping empty ones"""
+    rows = (
+        OrderItem.objects
+        .filter(product__category__isnull=False)
+        .values('product__category_id', 'product__category__name')
+        .annotate(total=Sum('total_price'))
+        .filter(total__gt=0)
+        .order_by('product__category_id')
+    )
+    return [
+        {'category': row['product__category__name'], 'revenue': float(row['total'])}
+        for row in rows
+    ]
+
+
+REPORT_TYPES = ('sales', 'inventory', 'customers')
+
+
+def build_report(report_type):
+    """Build one of the ReportsView reports as a plain dict"""
+    if report_type == 'sales':
+        # Last 30 days sales report
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=30)
+        return {
+            'report_type': 'sales',
+            'period': f'{start_date} to {end_date}',
+            'data': sales_report(start_date, end_date)
+        }
+
+    if report_type == 'inventory':
+        inventory_report = Product.objects.values(
+            'category__name'
+        ).annotate(
+            total_products=Count('id'),
+            total_value=Sum(F('price') * F('stock_quantity')),
+            low_stock=Count('id', filter=Q(stock_quantity__lt=F('min_stock_level')))
+        )
+        return {
+            'report_type': 'inventory',
+            'data': list(inventory_report)
+        }
+
+    if report_type == 'customers':
+        # Customer statistics
+        customer_report = Customer.objects.values(
+            'customer_type'
+        ).annotate(
+            total=Count('id'),
+            avg_credit_limit=Avg('credit_limit'),
+            total_balance=Sum('balance')
+        )
+        return {
+            'report_type': 'customers',
+            'data': list(customer_report)
+        }
+
+    raise ValueError('Invalid report type')
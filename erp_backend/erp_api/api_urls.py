@@ -37,12 +37,14 @@ urlpatterns = [
     
     # Health check
     path('health/', views.health_check, name='health_check'),
+    path('metrics/', views.metrics_view, name='metrics'),
     
     # REST API Views
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.LoginView.as_view(), name='login'),
     path('dashboard/', views.DashboardView.as_view(), name='api_dashboard'),
     path('reports/', views.ReportsView.as_view(), name='reports'),
+    path('activity-logs/', views.ActivityLogAPIView.as_view(), name='api_activity_logs'),
     
     # Staff & Finance User Management
     path('users/create-staff/', views.create_staff_user, name='create_staff_user'),
@@ -86,6 +88,10 @@ urlpatterns = [
     # Update operations
     path('orders/<int:order_id>/status/', views.api_update_order_status, name='api_update_order_status'),
     
+    # Background jobs
+    path('jobs/', views.JobsAPIView.as_view(), name='api_jobs'),
+    path('jobs/<int:job_id>/', views.JobDetailAPIView.as_view(), name='api_job_detail'),
+    
     # Search
     path('search/', views.api_search, name='api_search'),
     
@@ -0,0 +1,420 @@
+"""
+HTTP benchmarks for the hot ERP and storefront endpoints.
+
+run_benchmarks() drives each scenario in SCENARIOS with a fixed number
+of requests from `concurrency` threads, against either
+
+- the Django test client, in process ('client'), or
+- a running server ('http://127.0.0.1:8000'); the command must use the
+  server's settings, since fixtures and sessions go straight to its DB.
+
+and reports latency percentiles, throughput and queries per request for
+each. Queries are read from the request metrics (erp_api.metrics): the
+in-process registry for the test client, /api/metrics/ for a server.
+
+Results are plain JSON (python manage.py run_benchmarks --output ...);
+compare() checks a run against a stored baseline and lists the
+scenarios whose p95 latency grew past a tolerance, whose queries per
+request grew at all, or that started failing.
+
+Every scenario runs against the data already in the database; load a
+repeatable dataset first with generate_load_data. The benchmark's own
+users and product are created on demand, and the website orders placed
+by the checkout scenario are deleted afterwards.
+"""
+import itertools
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.urls import resolve
+from django.utils import timezone
+
+from . import metrics
+from .models import Customer, Invoice, Order, Product, UserProfile, WebsiteOrder
+
+DEFAULT_REQUESTS = 200
+DEFAULT_WARMUP = 5
+DEEP_PAGE_FRACTION = 0.9  # how far into a list the "deep page" scenarios read
+LIST_PAGE_SIZE = 50
+
+STAFF_USERNAME = 'bench_staff'
+CUSTOMER_USERNAME = 'bench_customer'
+PRODUCT_SKU = 'BENCH-CHECKOUT'
+
+
+# ============= SCENARIOS =============
+class Scenario:
+    """
+    One benchmarked endpoint. `request(context, index)` returns the
+    measured (method, path, body); `prepare(context, index)` returns
+    requests sent unmeasured before it (e.g. filling the cart).
+    """
+
+    def __init__(self, name, role, request, prepare=None, writes=False):
+        self.name = name
+        self.role = role
+        self.request = request
+        self.prepare = prepare
+        self.writes = writes
+
+
+HOMEPAGE_PATHS = [
+    '/api/homepage/hero/', '/api/website/hero/', '/api/website/stories/', '/api/website/testimonials/',
+    '/api/website/gallery/', '/api/website/partners/', '/api/website/faq/', '/api/website/newsletter/',
+]
+
+
+def deep_page(total):
+    return max(1, math.ceil(total * DEEP_PAGE_FRACTION / LIST_PAGE_SIZE))
+
+
+def add_to_cart(context, index):
+    product_id = context['product_ids'][index % len(context['product_ids'])]
+    return [('POST', '/api/website/cart/add/', {'product_id': product_id, 'quantity': 1})]
+
+
+SCENARIOS = [
+    Scenario('dashboard', 'staff', lambda context, index: ('GET', '/api/dashboard/', None)),
+    Scenario('customers_deep_page', 'staff', lambda context, index: (
+        'GET', f"/api/customers/?page={context['customer_page']}&page_size={LIST_PAGE_SIZE}", None,
+    )),
+    Scenario('orders_deep_page', 'staff', lambda context, index: (
+        'GET', f"/api/orders/?page={context['order_page']}&page_size={LIST_PAGE_SIZE}", None,
+    )),
+    Scenario('invoices_deep_page', 'staff', lambda context, index: (
+        'GET', f"/api/invoices/?page={context['invoice_page']}&page_size={LIST_PAGE_SIZE}", None,
+    )),
+    Scenario('catalog', None, lambda context, index: (
+        'GET', f"/api/products/catalog/?page={index % 3 + 1}&sort={('newest', 'price_low', 'price_high')[index % 3]}", None,
+    )),
+    Scenario('search', 'staff', lambda context, index: (
+        'GET', f"/api/search/?q={context['search_terms'][index % len(context['search_terms'])]}", None,
+    )),
+    Scenario('cart', 'customer', lambda context, index: ('GET', '/api/website/cart/get/', None), prepare=add_to_cart),
+    Scenario(
+        'checkout', 'customer',
+        lambda context, index: ('POST', '/api/website/checkout/', {'shipping_address': '1 Bench St', 'payment_method': 'cod'}),
+        prepare=lambda context, index: [
+            ('POST', '/api/website/cart/add/', {'product_id': context['checkout_product_id'], 'quantity': 1}),
+        ],
+        writes=True,
+    ),
+    # The storefront homepage loads these one after another
+    Scenario('homepage', None, lambda context, index: ('GET', HOMEPAGE_PATHS[index % len(HOMEPAGE_PATHS)], None)),
+]
+SCENARIO_NAMES = [scenario.name for scenario in SCENARIOS]
+
+
+# ============= FIXTURES =============
+def bench_user(username, role, is_staff):
+    user, created = User.objects.get_or_create(username=username, defaults={'is_staff': is_staff})
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    UserProfile.objects.get_or_create(user=user, defaults={'unique_id': username.upper(), 'role': role})
+    return user
+
+
+def session_key(user):
+    """A logged-in session for `user`, stored the way login() would"""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.create()
+    return store.session_key
+
+
+class Sessions:
+    """One session per thread and role, so concurrent carts do not share a session"""
+
+    def __init__(self, users):
+        self.users = users
+        self.local = threading.local()
+        self.created = []
+
+    def get(self, role):
+        if role is None:
+            return None
+        keys = getattr(self.local, 'keys', None)
+        if keys is None:
+            keys = self.local.keys = {}
+        if role not in keys:
+            keys[role] = session_key(self.users[role])
+            self.created.append(keys[role])
+        return keys[role]
+
+    def delete(self):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        for key in self.created:
+            store(key).delete()
+
+
+def prepare_context():
+    """Benchmark users and product, and the parameters the scenarios read"""
+    staff = bench_user(STAFF_USERNAME, 'admin', True)
+    customer_user = bench_user(CUSTOMER_USERNAME, 'customer', False)
+    customer, _ = Customer.objects.get_or_create(user=customer_user, defaults={
+        'customer_code': 'BENCH-CUSTOMER', 'billing_address': '1 Bench St', 'shipping_address': '1 Bench St',
+        'credit_limit': 0, 'tax_number': '',
+    })
+    product, _ = Product.objects.update_or_create(sku=PRODUCT_SKU, defaults={
+        'name': 'Benchmark checkout product', 'price': 10, 'stock_quantity': 10 ** 9, 'reserved_quantity': 0,
+        'is_active': False,
+    })
+
+    product_ids = list(Product.objects.filter(is_active=True, stock_quantity__gt=0).order_by('id').values_list('id', flat=True)[:50])
+    words = sorted({
+        word.lower() for name in Product.objects.order_by('id').values_list('name', flat=True)[:20]
+        for word in name.split() if len(word) > 3
+    })
+    return {
+        'staff': staff,
+        'customer': customer_user,
+        'customer_id': customer.id,
+        'checkout_product_id': product.id,
+        'product_ids': product_ids or [product.id],
+        'search_terms': words[:10] or ['bench'],
+        'customer_page': deep_page(Customer.objects.count()),
+        'order_page': deep_page(Order.objects.count()),
+        'invoice_page': deep_page(Invoice.objects.count()),
+        'since': timezone.now(),
+    }
+
+
+def cleanup(context):
+    """Remove what the checkout scenario wrote"""
+    WebsiteOrder.objects.filter(customer_id=context['customer_id'], order_date__gte=context['since']).delete()
+    Product.objects.filter(sku=PRODUCT_SKU).update(stock_quantity=10 ** 9, reserved_quantity=0)
+
+
+# ============= TRANSPORTS =============
+class ClientTransport:
+    """Requests through django.test.Client; one client per thread and role"""
+    name = 'client'
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def client(self, session):
+        clients = getattr(self.local, 'clients', None)
+        if clients is None:
+            clients = self.local.clients = {}
+        if session not in clients:
+            clients[session] = Client(raise_request_exception=False)
+            if session:
+                clients[session].cookies[settings.SESSION_COOKIE_NAME] = session
+        return clients[session]
+
+    def send(self, method, path, body, session):
+        client = self.client(session)
+        if method == 'GET':
+            response = client.get(path)
+        else:
+            response = client.generic(method, path, json.dumps(body or {}), content_type='application/json')
+        return response.status_code
+
+    def snapshot(self):
+        return metrics.registry.snapshot()
+
+
+class HttpTransport:
+    """Requests to a running server through urllib"""
+
+    def __init__(self, base_url, timeout=30):
+        self.name = base_url.rstrip('/')
+        self.base_url = self.name
+        self.timeout = timeout
+
+    def send(self, method, path, body, session):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        if session:
+            request.add_header('Cookie', f'{settings.SESSION_COOKIE_NAME}={session}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def snapshot(self):
+        """The server's request metrics, parsed back from /api/metrics/"""
+        request = urllib.request.Request(self.base_url + '/api/metrics/')
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        if token:
+            request.add_header('Authorization', f'Bearer {token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                text = response.read().decode()
+        except (urllib.error.URLError, OSError):
+            return {}
+        return parse_metrics(text)
+
+
+def parse_metrics(text):
+    """{(view, method): series} with request and query counts from Prometheus text"""
+    fields = {'erp_http_requests_total': metrics.COUNT, 'erp_db_queries_total': metrics.QUERIES}
+    totals = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition('{')
+        if name not in fields:
+            continue
+        label_text, _, value = rest.rpartition('} ')
+        labels = dict(part.split('=', 1) for part in label_text.split('",') if '=' in part)
+        key = (labels['view'].strip('"'), labels['method'].strip('"'))
+        totals.setdefault(key, metrics.new_series())[fields[name]] = float(value)
+    return totals
+
+
+# ============= RUNNING =============
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def queries_per_request(before, after, keys):
+    """Queries per request over the (view, method) series in `keys`, from two snapshots"""
+    requests = queries = 0
+    for key in keys:
+        old = before.get(key, metrics.new_series())
+        new = after.get(key, old)
+        requests += new[metrics.COUNT] - old[metrics.COUNT]
+        queries += new[metrics.QUERIES] - old[metrics.QUERIES]
+    return round(queries / requests, 2) if requests > 0 else None
+
+
+def run_scenario(transport, scenario, context, sessions, requests, concurrency, warmup):
+    measured = set()
+
+    def iteration(index):
+        session = sessions.get(scenario.role)
+        for method, path, body in (scenario.prepare(context, index) if scenario.prepare else []):
+            transport.send(method, path, body, session)
+        method, path, body = scenario.request(context, index)
+        measured.add((method, path.split('?')[0]))
+        started = time.perf_counter()
+        status_code = transport.send(method, path, body, session)
+        return time.perf_counter() - started, status_code
+
+    for index in range(warmup):
+        iteration(index)
+
+    before = transport.snapshot()
+
+    counter = itertools.count(warmup)
+    counter_lock = threading.Lock()
+    stop = warmup + requests
+    samples = []
+
+    def worker():
+        results = []
+        try:
+            while True:
+                with counter_lock:
+                    index = next(counter)
+                if index >= stop:
+                    return results
+                results.append(iteration(index))
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        samples = worker()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for results in pool.map(lambda _: worker(), range(concurrency)):
+                samples.extend(results)
+    elapsed = time.perf_counter() - started
+
+    after = transport.snapshot()
+    keys = {(resolve(path).view_name, method) for method, path in measured}
+    latencies = sorted(duration * 1000 for duration, _ in samples)
+    return {
+        'views': sorted(view for view, _ in keys),
+        'requests': len(samples),
+        'errors': sum(1 for _, status_code in samples if status_code >= 400),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+        'max_ms': round(latencies[-1], 3) if latencies else None,
+        'queries_per_request': queries_per_request(before, after, keys),
+    }
+
+
+def run_benchmarks(target='client', scenarios=None, requests=DEFAULT_REQUESTS, concurrency=1,
+                   warmup=DEFAULT_WARMUP, writes=True, progress=None):
+    """Run the named scenarios (all by default) and return the results document"""
+    progress = progress or (lambda name, result: None)
+    transport = ClientTransport() if target == 'client' else HttpTransport(target)
+    selected = [
+        scenario for scenario in SCENARIOS
+        if (scenarios is None or scenario.name in scenarios) and (writes or not scenario.writes)
+    ]
+
+    context = prepare_context()
+    sessions = Sessions({'staff': context['staff'], 'customer': context['customer']})
+    results = {}
+    try:
+        for scenario in selected:
+            results[scenario.name] = run_scenario(transport, scenario, context, sessions, requests, concurrency, warmup)
+            progress(scenario.name, results[scenario.name])
+    finally:
+        cleanup(context)
+        sessions.delete()
+
+    return {
+        'meta': {
+            'target': transport.name,
+            'database': connection.vendor,
+            'concurrency': concurrency,
+            'requests': requests,
+            'warmup': warmup,
+            'started_at': context['since'].isoformat(),
+            'rows': {'customers': Customer.objects.count(), 'orders': Order.objects.count(),
+                     'invoices': Invoice.objects.count(), 'products': Product.objects.count()},
+        },
+        'scenarios': results,
+    }
+
+
+# ============= BASELINES =============
+def compare(results, baseline, tolerance=0.2):
+    """
+    Regressions of `results` against `baseline` as messages: p95 latency
+    more than `tolerance` (a fraction) slower, more queries per request,
+    or errors where the baseline had none.
+    """
+    problems = []
+    for name, old in baseline.get('scenarios', {}).items():
+        new = results['scenarios'].get(name)
+        if new is None:
+            continue
+        if old.get('p95_ms') and new.get('p95_ms') and new['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            problems.append(f"{name}: p95 {new['p95_ms']:.1f}ms vs {old['p95_ms']:.1f}ms baseline")
+        if (old.get('queries_per_request') is not None and new.get('queries_per_request') is not None
+                and new['queries_per_request'] > old['queries_per_request']):
+            problems.append(f"{name}: {new['queries_per_request']} queries/request vs {old['queries_per_request']} baseline")
+        if new['errors'] and not old.get('errors'):
+            problems.append(f"{name}: {new['errors']} errors, baseline had none")
+    return problems
@@ -0,0 +1,92 @@
+"""
+Session cart service for the website.
+
+The session stores {product_id: quantity}. resolve_cart() loads every
+product in one in_bulk() query and prices the lines in Decimal;
+create_order_items() writes the order lines with bulk_create and either
+sells or holds their stock through the stock ledger, so two buyers can
+never both take the last unit.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Product, WebsiteOrderItem
+from .stock import hold_order_stock, sell_order_stock
+
+
+class CartLine:
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+        self.unit_price = product.price
+        self.item_total = product.price * Decimal(quantity)
+
+
+class Cart:
+    """Priced view of the session cart"""
+
+    def __init__(self, lines, missing_ids):
+        self.lines = lines
+        self.missing_ids = missing_ids
+        self.total = sum((line.item_total for line in lines), Decimal('0'))
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def out_of_stock(self):
+        """First line whose product cannot cover the quantity, if any"""
+        for line in self.lines:
+            if line.product.available_quantity < line.quantity:
+                return line
+        return None
+
+
+def resolve_cart(cart_data):
+    """Price a session cart with a single product query"""
+    quantities = {}
+    missing_ids = []
+    for product_id, quantity in cart_data.items():
+        try:
+            quantities[int(product_id)] = int(quantity)
+        except (TypeError, ValueError):
+            missing_ids.append(product_id)
+
+    products = Product.objects.select_related('category').in_bulk(list(quantities))
+
+    lines = []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            missing_ids.append(product_id)
+            continue
+        lines.append(CartLine(product, quantity))
+    return Cart(lines, missing_ids)
+
+
+def create_order_items(order, lines, hold=False):
+    """
+    Write the order lines and take stock for them atomically. With
+    hold=True the stock is only reserved until the order is paid. Any
+    line that runs out of stock rolls the whole set back.
+    """
+    stock_lines = [(line.product, line.quantity) for line in lines]
+    with transaction.atomic():
+        if hold:
+            hold_order_stock(stock_lines, website_order=order)
+        else:
+            sell_order_stock(stock_lines, website_order=order)
+
+        return WebsiteOrderItem.objects.bulk_create([
+            WebsiteOrderItem(
+                order=order,
+                product=line.product,
+                quantity=line.quantity,
+                unit_price=line.unit_price,
+                total_price=line.item_total,
+            )
+            for line in lines
+        ])
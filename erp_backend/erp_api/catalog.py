@@ -0,0 +1,200 @@
+"""
+Public catalog queries.
+
+CatalogQuery turns the catalog request parameters into one filtered
+product queryset and answers a page of results plus the facets the
+products page shows, each with a single query:
+
+- the page itself, read with values() so no model instances are built
+- category counts, grouped over every filter except the category one
+- price histogram buckets, grouped over every filter except the price one
+
+plus, when any product on the page has an image, one lookup of their
+responsive image sets.
+
+Sorts follow the composite (is_active, ...) indexes on products.
+"""
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, Max, Min, Q
+from django.db.models.functions import Floor
+
+from .images import image_sets
+from .models import Product, ProductCategory, StockMovement
+
+CATALOG_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'price_low': ('price', 'id'),
+    'price_high': ('-price', '-id'),
+    'name': ('name', 'id'),
+}
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+PRICE_BUCKETS = 8
+
+CATALOG_FIELDS = (
+    'id', 'name', 'description', 'price', 'cost', 'image', 'stock_quantity', 'sku',
+    'category_id', 'category__name',
+)
+
+
+def parse_decimal(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"Invalid price '{value}'")
+
+
+def parse_positive_int(value, default):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return default
+
+
+def nice_width(span, buckets):
+    """Round a bucket width up to 1, 2 or 5 times a power of ten"""
+    raw = span / buckets
+    if raw <= 0:
+        return Decimal('1')
+    magnitude = Decimal(10) ** math.floor(math.log10(raw))
+    for step in (1, 2, 5, 10):
+        if raw <= step * magnitude:
+            return Decimal(step) * magnitude
+    return 10 * magnitude
+
+
+class CatalogQuery:
+    """Parsed catalog request: filters, sort and page"""
+
+    def __init__(self, params):
+        self.category_ids = [int(cid) for cid in params.get('categories', '').split(',') if cid.strip().isdigit()]
+        self.min_price = parse_decimal(params.get('min_price'))
+        self.max_price = parse_decimal(params.get('max_price'))
+        self.sort = params.get('sort', 'newest')
+        if self.sort not in CATALOG_SORTS:
+            self.sort = 'newest'
+        self.page = parse_positive_int(params.get('page'), 1)
+        self.page_size = min(parse_positive_int(params.get('page_size'), DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+
+    def base_queryset(self):
+        return Product.objects.filter(is_active=True)
+
+    def category_filter(self):
+        return Q(category_id__in=self.category_ids) if self.category_ids else Q()
+
+    def price_filter(self):
+        q = Q()
+        if self.min_price is not None:
+            q &= Q(price__gte=self.min_price)
+        if self.max_price is not None:
+            q &= Q(price__lte=self.max_price)
+        return q
+
+    def queryset(self):
+        return self.base_queryset().filter(self.category_filter(), self.price_filter())
+
+    # ============= RESULTS =============
+    def results(self):
+        queryset = self.queryset()
+        count = queryset.count()
+        start = (self.page - 1) * self.page_size
+        rows = list(queryset.order_by(*CATALOG_SORTS[self.sort]).values(*CATALOG_FIELDS)[start:start + self.page_size])
+        sets = image_sets([row['image'] for row in rows])
+        return [product_row(row, sets.get(row['image'])) for row in rows], count
+
+    # ============= FACETS =============
+    def category_facets(self):
+        rows = (
+            self.base_queryset()
+            .filter(self.price_filter(), category__isnull=False)
+            .values('category_id', 'category__name')
+            .annotate(count=Count('id'))
+            .order_by('category__name', 'category_id')
+        )
+        return [
+            {
+                'id': row['category_id'],
+                'name': row['category__name'],
+                'count': row['count'],
+                'selected': row['category_id'] in self.category_ids,
+            }
+            for row in rows
+        ]
+
+    def price_facets(self, buckets=PRICE_BUCKETS):
+        queryset = self.base_queryset().filter(self.category_filter())
+        bounds = queryset.aggregate(low=Min('price'), high=Max('price'))
+        low, high = bounds['low'], bounds['high']
+        if low is None:
+            return {'min': None, 'max': None, 'buckets': []}
+
+        width = nice_width(high - low, buckets)
+        start = (low / width).to_integral_value(rounding='ROUND_FLOOR') * width
+        counts = dict(
+            queryset
+            .annotate(bucket=Floor((F('price') - start) / width))
+            .values('bucket')
+            .annotate(count=Count('id'))
+            .values_list('bucket', 'count')
+        )
+
+        histogram = []
+        last = int((high - start) // width)
+        for index in range(last + 1):
+            histogram.append({
+                'from': float(start + index * width),
+                'to': float(start + (index + 1) * width),
+                'count': counts.get(index, 0),
+            })
+        return {'min': float(low), 'max': float(high), 'buckets': histogram}
+
+    def facets(self):
+        return {
+            'categories': self.category_facets(),
+            'price': self.price_facets(),
+        }
+
+
+def product_row(row, image_set=None):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'description': row['description'] or '',
+        'price': float(row['price']),
+        'cost_price': float(row['cost']) if row['cost'] else None,
+        'discount_percent': 0,
+        'image': default_storage.url(row['image']) if row['image'] else None,
+        'image_set': image_set,
+        'category': {
+            'id': row['category_id'],
+            'name': row['category__name'],
+        } if row['category_id'] else None,
+        'stock_quantity': row['stock_quantity'],
+        'sku': row['sku'],
+    }
+
+
+def category_counts():
+    """Every category with its active product count, in one grouped query"""
+    return list(
+        ProductCategory.objects
+        .annotate(product_count=Count('product', filter=Q(product__is_active=True)))
+        .order_by('id')
+        .values('id', 'name', 'product_count')
+    )
+
+
+def stock_state(request, *args, **kwargs):
+    """
+    Latest stock movement as a (token, changed_at) pair for
+    conditional_get: the stock ledger changes quantities with update(),
+    which sends no signals, but logs every change.
+    """
+    latest = StockMovement.objects.order_by('-id').values_list('id', 'created_at').first()
+    return latest or (0, None)
@@ -0,0 +1,96 @@
+"""
+Conditional GET for the public read APIs.
+
+Views wrapped with conditional_get(Model, ...) read the ContentVersion
+counters of those models in one query before doing any work. The
+counters become the response ETag and their latest change time the
+Last-Modified header, so a client whose If-None-Match/If-Modified-Since
+is still current gets 304 Not Modified without the view's own queries.
+
+Signals bump a model's counter whenever one of its rows is saved or
+deleted (see signals.py). Code that writes with queryset.update() or
+bulk_create() must call bump_content_version() itself.
+
+Responses are sent with Cache-Control: no-cache, so browsers keep them
+but revalidate on every navigation.
+"""
+import hashlib
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+from .models import ContentVersion
+
+
+def content_key(model):
+    return model._meta.label_lower
+
+
+def bump_content_version(*models):
+    """Mark the content of `models` as changed"""
+    now = timezone.now()
+    for key in sorted({content_key(model) for model in models}):
+        updated = ContentVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=now)
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                ContentVersion.objects.create(key=key, version=1)
+        except IntegrityError:
+            # Another writer created the counter first
+            ContentVersion.objects.filter(key=key).update(version=F('version') + 1, updated_at=now)
+
+
+def content_state(models):
+    """Return ([key:version, ...], last change time) for `models`"""
+    keys = sorted({content_key(model) for model in models})
+    rows = {
+        key: (version, updated_at)
+        for key, version, updated_at in ContentVersion.objects.filter(key__in=keys).values_list(
+            'key', 'version', 'updated_at'
+        )
+    }
+    parts = [f"{key}:{rows[key][0] if key in rows else 0}" for key in keys]
+    last_modified = max((updated_at for _, updated_at in rows.values()), default=None)
+    return parts, last_modified
+
+
+def conditional_get(*models, extra=None):
+    """
+    Answer GET/HEAD with 304 Not Modified while `models` are unchanged.
+
+    `extra(request, *args, **kwargs)` may return a (token, changed_at)
+    pair for state the counters do not cover. Works on function views
+    and, through method_decorator, on class-based view methods.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            parts, last_modified = content_state(models)
+            if extra is not None:
+                token, changed_at = extra(request, *args, **kwargs)
+                parts.append(str(token))
+                if changed_at is not None and (last_modified is None or changed_at > last_modified):
+                    last_modified = changed_at
+            etag = quote_etag(hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest())
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers.setdefault('ETag', etag)
+            if timestamp is not None:
+                response.headers.setdefault('Last-Modified', http_date(timestamp))
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
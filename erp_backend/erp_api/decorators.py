@@ -5,6 +5,7 @@ from functools import wraps
 from django.http import HttpResponseForbidden
 from django.shortcuts import redirect
 from .models import UserProfile
+from .roles import get_access
 
 
 def role_required(*roles):
@@ -19,7 +20,7 @@ def role_required(*roles):
                 return redirect('/accounts/login/?next=' + request.path)
             
             try:
-                user_profile = UserProfile.objects.get(user=request.user)
+                user_profile = get_access(request).require_profile()
                 if user_profile.role in roles or user_profile.role == 'admin':
                     return view_func(request, *args, **kwargs)
                 else:
@@ -44,7 +45,7 @@ def admin_required(view_func):
             return redirect('/accounts/login/?next=' + request.path)
         
         try:
-            user_profile = UserProfile.objects.get(user=request.user)
+            user_profile = get_access(request).require_profile()
             if user_profile.role == 'admin':
                 return view_func(request, *args, **kwargs)
             else:
@@ -66,7 +67,7 @@ def admin_or_manager_required(view_func):
             return redirect('/accounts/login/?next=' + request.path)
         
         try:
-            user_profile = UserProfile.objects.get(user=request.user)
+            user_profile = get_access(request).require_profile()
             if user_profile.role in ['admin', 'manager']:
                 return view_func(request, *args, **kwargs)
             else:
@@ -88,7 +89,7 @@ def finance_required(view_func):
             return redirect('/accounts/login/?next=' + request.path)
         
         try:
-            user_profile = UserProfile.objects.get(user=request.user)
+            user_profile = get_access(request).require_profile()
             if user_profile.role in ['finance', 'admin', 'manager']:
                 return view_func(request, *args, **kwargs)
             else:
@@ -110,7 +111,7 @@ def staff_required(view_func):
             return redirect('/accounts/login/?next=' + request.path)
         
         try:
-            user_profile = UserProfile.objects.get(user=request.user)
+            user_profile = get_access(request).require_profile()
             if user_profile.role in ['staff', 'admin', 'manager']:
                 return view_func(request, *args, **kwargs)
             else:
@@ -0,0 +1,342 @@
+"""
+Streaming CSV/XLSX exports.
+
+Rows are read with values() in keyset chunks of CHUNK_SIZE (each chunk
+starts after the last row of the previous one in the export's ordering),
+so only one chunk of rows is held in memory at a time, even on MySQL
+where mysqlclient buffers a whole result set on the client. CSV is
+written straight into a StreamingHttpResponse;
+XLSX uses an openpyxl write-only workbook spooled to a temporary file and
+then streamed back with FileResponse.
+"""
+import csv
+import tempfile
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+
+from .models import Customer, Invoice, Lead, Order, Payment
+
+CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def format_date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+def full_name(first_name, last_name):
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+class Export:
+    """
+    Base export definition. Subclasses declare the columns and the
+    values() fields they need and turn one values() dict into a row.
+    `ordering` must end with a unique non-null field, since rows are
+    read in keyset chunks.
+    """
+    name = ''
+    sheet_title = ''
+    headers = []
+    column_widths = []
+    fields = []
+    ordering = ['-id']
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def build_row(self, values):
+        raise NotImplementedError
+
+    def iter_rows(self, chunk_size=CHUNK_SIZE, progress=None):
+        """
+        Yield export rows. `progress`, if given, is called with the number
+        of rows produced so far after every chunk.
+        """
+        keys = [field.lstrip('-') for field in self.ordering]
+        queryset = self.get_queryset().order_by(*self.ordering).values(
+            *self.fields, *(key for key in keys if key not in self.fields)
+        )
+        count = 0
+        chunk = list(queryset[:chunk_size])
+        while chunk:
+            for values in chunk:
+                yield self.build_row(values)
+            count += len(chunk)
+            if progress:
+                progress(count)
+            if len(chunk) < chunk_size:
+                break
+            chunk = list(queryset.filter(self.after(chunk[-1]))[:chunk_size])
+
+    def after(self, values):
+        """Q for the rows that follow `values` in the export's ordering"""
+        q, same = Q(), Q()
+        for field in self.ordering:
+            key = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            q |= same & Q(**{f'{key}__{lookup}': values[key]})
+            same &= Q(**{key: values[key]})
+        return q
+
+    def count(self):
+        return self.get_queryset().count()
+
+    def filename(self, extension):
+        return f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+class CustomerExport(Export):
+    name = 'customers'
+    sheet_title = 'Customers'
+    headers = [
+        'Customer Code', 'First Name', 'Last Name', 'Email', 'Phone',
+        'Company', 'Type', 'Status', 'Credit Limit', 'Balance',
+        'Tax Number', 'Billing Address', 'Shipping Address', 'Notes',
+        'Created Date'
+    ]
+    column_widths = [15, 15, 15, 25, 15, 25, 12, 10, 14, 14, 15, 30, 30, 20, 18]
+    fields = [
+        'customer_code', 'user__first_name', 'user__last_name', 'user__email',
+        'user__userprofile__phone', 'company__name', 'customer_type',
+        'credit_limit', 'balance', 'tax_number', 'billing_address',
+        'shipping_address', 'created_at',
+    ]
+
+    def get_queryset(self):
+        return Customer.objects.all()
+
+    def build_row(self, v):
+        return [
+            v['customer_code'],
+            v['user__first_name'] or '',
+            v['user__last_name'] or '',
+            v['user__email'] or '',
+            v['user__userprofile__phone'] or '',
+            v['company__name'] or '',
+            v['customer_type'] or 'regular',
+            'active',
+            str(v['credit_limit']),
+            str(v['balance']),
+            v['tax_number'] or '',
+            v['billing_address'] or '',
+            v['shipping_address'] or '',
+            '',
+            format_datetime(v['created_at']),
+        ]
+
+
+class LeadExport(Export):
+    name = 'leads'
+    sheet_title = 'Leads'
+    headers = ['Lead #', 'Contact Person', 'Company', 'Email', 'Phone', 'Source', 'Status', 'Estimated Value', 'Notes', 'Created At']
+    column_widths = [12, 20, 25, 25, 15, 15, 12, 15, 30, 18]
+    fields = [
+        'id', 'lead_number', 'contact_person', 'company_name', 'email', 'phone',
+        'source', 'status', 'estimated_value', 'notes', 'created_at',
+    ]
+    ordering = ['-created_at', '-id']
+
+    def get_queryset(self):
+        return Lead.objects.all()
+
+    def build_row(self, v):
+        return [
+            v['lead_number'] or f"LEAD{v['id']:04d}",
+            v['contact_person'] or '',
+            v['company_name'] or '',
+            v['email'] or '',
+            v['phone'] or '',
+            v['source'] or '',
+            v['status'] or '',
+            float(v['estimated_value'] or 0),
+            v['notes'] or '',
+            format_datetime(v['created_at']),
+        ]
+
+
+class OrderExport(Export):
+    name = 'orders'
+    sheet_title = 'Orders'
+    headers = [
+        'Order #', 'Customer Code', 'Customer Name', 'Email', 'Order Date',
+        'Status', 'Payment Status', 'Total Amount', 'Tax', 'Discount', 'Grand Total'
+    ]
+    column_widths = [14, 15, 25, 25, 18, 12, 15, 14, 12, 12, 14]
+    fields = [
+        'order_number', 'customer__customer_code', 'customer__user__first_name',
+        'customer__user__last_name', 'customer__user__email', 'order_date', 'status',
+        'payment_status', 'total_amount', 'tax_amount', 'discount_amount', 'grand_total',
+    ]
+    ordering = ['-order_date', '-id']
+
+    def get_queryset(self):
+        return Order.objects.all()
+
+    def build_row(self, v):
+        return [
+            v['order_number'],
+            v['customer__customer_code'] or '',
+            full_name(v['customer__user__first_name'], v['customer__user__last_name']),
+            v['customer__user__email'] or '',
+            format_datetime(v['order_date']),
+            v['status'],
+            v['payment_status'],
+            float(v['total_amount'] or 0),
+            float(v['tax_amount'] or 0),
+            float(v['discount_amount'] or 0),
+            float(v['grand_total'] or 0),
+        ]
+
+
+class InvoiceExport(Export):
+    name = 'invoices'
+    sheet_title = 'Invoices'
+    headers = [
+        'Invoice #', 'Order #', 'Customer Code', 'Customer Name', 'Invoice Date',
+        'Due Date', 'Status', 'Total Amount', 'Tax', 'Paid Amount', 'Balance'
+    ]
+    column_widths = [14, 14, 15, 25, 14, 14, 12, 14, 12, 14, 14]
+    fields = [
+        'invoice_number', 'order__order_number', 'customer__customer_code',
+        'customer__user__first_name', 'customer__user__last_name', 'invoice_date',
+        'due_date', 'status', 'total_amount', 'tax_amount', 'paid_amount', 'balance_amount',
+    ]
+    ordering = ['-created_at', '-id']
+
+    def get_queryset(self):
+        return Invoice.objects.all()
+
+    def build_row(self, v):
+        return [
+            v['invoice_number'],
+            v['order__order_number'] or '',
+            v['customer__customer_code'] or '',
+            full_name(v['customer__user__first_name'], v['customer__user__last_name']),
+            format_date(v['invoice_date']),
+            format_date(v['due_date']),
+            v['status'],
+            float(v['total_amount'] or 0),
+            float(v['tax_amount'] or 0),
+            float(v['paid_amount'] or 0),
+            float(v['balance_amount'] or 0),
+        ]
+
+
+class PaymentExport(Export):
+    name = 'payments'
+    sheet_title = 'Payments'
+    headers = [
+        'Payment #', 'Invoice #', 'Customer Code', 'Customer Name', 'Payment Date',
+        'Method', 'Amount', 'Reference', 'Created At'
+    ]
+    column_widths = [14, 14, 15, 25, 14, 15, 14, 20, 18]
+    fields = [
+        'payment_number', 'invoice__invoice_number', 'customer__customer_code',
+        'customer__user__first_name', 'customer__user__last_name', 'payment_date',
+        'payment_method', 'amount', 'reference_number', 'created_at',
+    ]
+    ordering = ['-created_at', '-id']
+
+    def get_queryset(self):
+        return Payment.objects.all()
+
+    def build_row(self, v):
+        return [
+            v['payment_number'],
+            v['invoice__invoice_number'] or '',
+            v['customer__customer_code'] or '',
+            full_name(v['customer__user__first_name'], v['customer__user__last_name']),
+            format_date(v['payment_date']),
+            v['payment_method'],
+            float(v['amount'] or 0),
+            v['reference_number'] or '',
+            format_datetime(v['created_at']),
+        ]
+
+
+EXPORTS = {
+    export.name: export
+    for export in (CustomerExport, LeadExport, OrderExport, InvoiceExport, PaymentExport)
+}
+
+
+def write_csv(export, fileobj, progress=None):
+    """Write an export as CSV into a text file object"""
+    writer = csv.writer(fileobj)
+    writer.writerow(export.headers)
+    for row in export.iter_rows(progress=progress):
+        writer.writerow(row)
+
+
+def csv_response(export):
+    """Stream an export as CSV, one row at a time"""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(export.headers)
+        for row in export.iter_rows():
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{export.filename("csv")}"'
+    return response
+
+
+def write_xlsx(export, fileobj, progress=None):
+    """Write an export into fileobj using a write-only workbook"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=export.sheet_title)
+
+    for col_idx, width in enumerate(export.column_widths, 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    header_cells = []
+    for header in export.headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in export.iter_rows(progress=progress):
+        ws.append(row)
+
+    wb.save(fileobj)
+
+
+def xlsx_response(export):
+    """Build an XLSX export on disk and stream it back"""
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(export, tmp)
+    tmp.seek(0)
+    return FileResponse(
+        tmp,
+        as_attachment=True,
+        filename=export.filename('xlsx'),
+        content_type=XLSX_CONTENT_TYPE,
+    )
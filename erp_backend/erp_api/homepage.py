@@ -0,0 +1,101 @@
+"""
+Homepage context builder.
+
+build_homepage_context() loads everything the dynamic homepage renders
+with a fixed number of queries: all sections in one query with their
+child rows prefetched, navigation with submenus, footer columns with
+links. get_homepage_context() caches the assembled context under a
+versioned key; signals bump the version whenever a Homepage* model or a
+product is saved or deleted, so stale entries are never read again and
+simply age out.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Prefetch
+
+from .models import (
+    HomepageFeature, HomepageFooterSection, HomepageHeroSection, HomepageNavigation,
+    HomepageSection, HomepageSEO, HomepageSocialLink, Product,
+)
+
+HOMEPAGE_SECTION_TYPES = ('why_us', 'details', 'stories', 'instagram', 'testimonials')
+HOMEPAGE_PRODUCT_COUNT = 12
+
+VERSION_KEY = 'homepage:version'
+
+
+def get_homepage_cache():
+    return caches[getattr(settings, 'HOMEPAGE_CACHE_ALIAS', 'default')]
+
+
+def homepage_version():
+    cache = get_homepage_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version key never points back at
+        # an older context that is still cached
+        version = int(time.time() * 1000)
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_homepage_version():
+    cache = get_homepage_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def build_homepage_context():
+    """Assemble the homepage template context"""
+    sections = {}
+    queryset = HomepageSection.objects.filter(
+        section_type__in=HOMEPAGE_SECTION_TYPES, is_active=True
+    ).order_by('order', 'id').prefetch_related('why_us_items', 'detail_cards', 'stories', 'testimonials', 'instagram_config')
+    for section in queryset:
+        # The lowest-ordered active section of each type wins, as with .first()
+        sections.setdefault(section.section_type, section)
+
+    instagram_section = sections.get('instagram')
+    instagram_config = None
+    if instagram_section is not None:
+        instagram_config = next(
+            (config for config in instagram_section.instagram_config.all() if config.is_active), None
+        )
+
+    return {
+        'hero_section': HomepageHeroSection.objects.filter(is_active=True).first(),
+        'features': list(HomepageFeature.objects.filter(is_active=True).order_by('order')),
+        'products': list(Product.objects.filter(is_active=True).select_related('category')[:HOMEPAGE_PRODUCT_COUNT]),
+        'why_us_section': sections.get('why_us'),
+        'details_section': sections.get('details'),
+        'stories_section': sections.get('stories'),
+        'instagram_section': instagram_section,
+        'instagram_config': instagram_config,
+        'testimonials_section': sections.get('testimonials'),
+        'navigation_items': list(
+            HomepageNavigation.objects.filter(is_active=True).order_by('order').prefetch_related(
+                Prefetch('submenu', queryset=HomepageNavigation.objects.order_by('order'))
+            )
+        ),
+        'footer_sections': list(
+            HomepageFooterSection.objects.filter(is_active=True).order_by('order').prefetch_related('links')
+        ),
+        'social_links': list(HomepageSocialLink.objects.filter(is_active=True).order_by('order')),
+        'seo': HomepageSEO.objects.first(),
+    }
+
+
+def get_homepage_context():
+    """Return the homepage context, building and caching it on a miss"""
+    cache = get_homepage_cache()
+    key = f"homepage:context:{homepage_version()}"
+    context = cache.get(key)
+    if context is None:
+        context = build_homepage_context()
+        cache.set(key, context, getattr(settings, 'HOMEPAGE_CACHE_TIMEOUT', 600))
+    return context
@@ -0,0 +1,240 @@
+"""
+Responsive image variants.
+
+Uploads are decoded in a process pool (imaging.render_image) which
+strips EXIF and other metadata, renders IMAGE_VARIANT_WIDTHS-wide copies
+in the original format and in WebP, and measures a tiny LQIP
+placeholder. The metadata-free copy replaces the original and the
+results are recorded in an ImageAsset row keyed by its storage name.
+Under content-addressed storage the copy gets a new name, and the
+image fields that pointed at the original are moved to it.
+
+ImageUploadView renders small uploads inline and hands larger batches
+to the job worker. Saving a product, CMS content or homepage hero with a
+new image file queues the same job, as does the generate_image_variants
+command for files uploaded before this existed.
+
+image_sets() turns storage names or media URLs into the srcset data
+the APIs return:
+
+    {'src', 'width', 'height', 'lqip', 'srcset', 'webp_srcset'}
+
+Images without an ImageAsset (not processed yet) return None, and the
+clients keep using the plain image URL.
+"""
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.text import slugify
+
+from . import imaging
+from .storage import is_content_addressed
+from .models import CMSContent, HomepageHeroSection, ImageAsset, Product, WebsiteGallery, WebsiteStory
+
+IMAGE_VARIANT_WIDTHS = getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1024, 1600))
+IMAGE_WORKERS = getattr(settings, 'IMAGE_WORKERS', 2)
+IMAGE_QUALITY = getattr(settings, 'IMAGE_QUALITY', 82)
+IMAGE_UPLOAD_DIR = 'uploads'
+IMAGE_VARIANT_DIR = 'variants'
+
+# Image files served to the storefront: {model: ImageField name}
+IMAGE_FIELDS = {
+    Product: 'image',
+    CMSContent: 'image',
+    HomepageHeroSection: 'background_image',
+    WebsiteGallery: 'image',
+    WebsiteStory: 'image',
+}
+# URL fields that may point at uploads from ImageUploadView
+IMAGE_URL_FIELDS = {
+    WebsiteGallery: 'image_url',
+    WebsiteStory: 'image_url',
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process pool for rendering; spawned so workers never inherit Django state"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def render_many(payloads):
+    """Render each bytes payload in the pool; failures come back as the exception"""
+    futures = [
+        get_pool().submit(imaging.render_image, data, IMAGE_VARIANT_WIDTHS, IMAGE_QUALITY)
+        for data in payloads
+    ]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+# ============= NAMES =============
+def upload_name(filename):
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    return f"{IMAGE_UPLOAD_DIR}/{slugify(stem) or 'image'}-{uuid.uuid4().hex[:8]}{ext.lower()}"
+
+
+def variant_name(name, width, extension):
+    return f"{IMAGE_VARIANT_DIR}/{os.path.splitext(name)[0]}/{width}w.{extension}"
+
+
+def storage_name(value):
+    """Storage name for an ImageField name or a URL under MEDIA_URL; None for other URLs"""
+    if not value or value.startswith('data:'):
+        return None
+    if '://' not in value and not value.startswith('/'):
+        return value
+    path = urlparse(value).path
+    media_path = urlparse(settings.MEDIA_URL).path
+    if path.startswith(media_path):
+        return path[len(media_path):]
+    return None
+
+
+# ============= PROCESSING =============
+def repoint_image_fields(old_name, new_name):
+    """Move IMAGE_FIELDS values from one storage name to another"""
+    for model, field in IMAGE_FIELDS.items():
+        # update() sends no post_save, so no new variants job is queued
+        model.objects.filter(**{field: old_name}).update(**{field: new_name})
+
+
+def store_rendered(name, rendered, replace_original=True):
+    """
+    Save a render_image() result for the original at `name` and record
+    its ImageAsset. Returns the asset, whose name may differ from `name`
+    under content-addressed storage.
+    """
+    if replace_original and rendered['original'] is not None:
+        if is_content_addressed():
+            # Hashed names are immutable: the stripped copy is a new file
+            stripped = default_storage.save(name, ContentFile(rendered['original']))
+            if stripped != name:
+                repoint_image_fields(name, stripped)
+                name = stripped
+        else:
+            # Replace the original with its metadata-free copy
+            default_storage.delete(name)
+            stored = default_storage.save(name, ContentFile(rendered['original']))
+            if stored != name:
+                default_storage.delete(stored)
+                raise ValueError(f'Could not replace {name}')
+
+    variants = []
+    for width, extension, data in rendered['variants']:
+        variant = variant_name(name, width, extension)
+        if default_storage.exists(variant):
+            default_storage.delete(variant)
+        variants.append({'width': width, 'format': extension, 'name': default_storage.save(variant, ContentFile(data))})
+
+    asset, _ = ImageAsset.objects.update_or_create(
+        name=name,
+        defaults={
+            'width': rendered['width'],
+            'height': rendered['height'],
+            'lqip': rendered['lqip'],
+            'variants': variants,
+        },
+    )
+    return asset
+
+
+def process_stored(names, replace_original=True):
+    """Render variants for images already in storage; returns {name: ImageAsset or error message}"""
+    payloads = []
+    for name in names:
+        with default_storage.open(name, 'rb') as fileobj:
+            payloads.append(fileobj.read())
+    outcome = {}
+    for name, rendered in zip(names, render_many(payloads)):
+        if isinstance(rendered, Exception):
+            outcome[name] = str(rendered)
+        else:
+            outcome[name] = store_rendered(name, rendered, replace_original)
+    return outcome
+
+
+def save_uploads(files, render=True):
+    """
+    Store uploaded files under IMAGE_UPLOAD_DIR and, with render=True,
+    their variants. Returns [(storage name, ImageAsset or None)].
+    """
+    payloads = [b''.join(uploaded.chunks()) for uploaded in files]
+    rendered = render_many(payloads) if render else [None] * len(files)
+    saved = []
+    for uploaded, data, result in zip(files, payloads, rendered):
+        if isinstance(result, Exception):
+            raise ValueError(f'{uploaded.name} is not a valid image')
+        if result is None:
+            saved.append((default_storage.save(upload_name(uploaded.name), ContentFile(data)), None))
+            continue
+        original = result['original'] if result['original'] is not None else data
+        name = default_storage.save(upload_name(uploaded.name), ContentFile(original))
+        # Content-addressed storage hands back the existing file for a repeat upload
+        asset = ImageAsset.objects.filter(name=name).first()
+        saved.append((name, asset or store_rendered(name, result, replace_original=False)))
+    return saved
+
+
+# ============= OUTPUT =============
+def asset_image_set(asset):
+    def srcset(extensions):
+        return ', '.join(
+            f"{default_storage.url(variant['name'])} {variant['width']}w"
+            for variant in asset.variants if variant['format'] in extensions
+        )
+
+    # The largest fallback variant is the full-size image without metadata
+    fallbacks = [variant for variant in asset.variants if variant['format'] in ('jpg', 'png')]
+    src = max(fallbacks, key=lambda variant: variant['width'])['name'] if fallbacks else asset.name
+    return {
+        'src': default_storage.url(src),
+        'width': asset.width,
+        'height': asset.height,
+        'lqip': asset.lqip,
+        'srcset': srcset(('jpg', 'png')),
+        'webp_srcset': srcset(('webp',)),
+    }
+
+
+def image_sets(values):
+    """{value: image set} for ImageField names or media URLs, in one query"""
+    names = {value: storage_name(value) for value in values if value}
+    wanted = {name for name in names.values() if name}
+    if not wanted:
+        return {}
+    assets = {asset.name: asset for asset in ImageAsset.objects.filter(name__in=wanted)}
+    return {value: asset_image_set(assets[name]) for value, name in names.items() if name in assets}
+
+
+def unprocessed_names():
+    """Storage names referenced by IMAGE_FIELDS/IMAGE_URL_FIELDS that have no ImageAsset yet"""
+    names = set()
+    for fields in (IMAGE_FIELDS, IMAGE_URL_FIELDS):
+        for model, field in fields.items():
+            values = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            names.update(filter(None, map(storage_name, values.values_list(field, flat=True))))
+    names -= set(ImageAsset.objects.filter(name__in=names).values_list('name', flat=True))
+    return sorted(name for name in names if default_storage.exists(name))
+
+
+def image_set(value):
+    return image_sets([value]).get(value) if value else None
@@ -0,0 +1,79 @@
+"""
+Pillow image rendering for the upload pipeline.
+
+Everything here works on bytes and plain values and imports nothing
+from Django, so images.py can run it in worker processes started with
+the "spawn" method.
+"""
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+LQIP_WIDTH = 16
+
+# Formats re-encoded on upload; anything else (e.g. animated GIF) is kept as uploaded
+REENCODED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def encode(image, fmt, quality):
+    buffer = io.BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    elif fmt == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def resized(image, width):
+    if width >= image.width:
+        return image
+    height = max(round(image.height * width / image.width), 1)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def lqip(image):
+    """Tiny blurred-up placeholder as a data: URI"""
+    thumb = resized(image, LQIP_WIDTH).convert('RGB')
+    data = encode(thumb, 'JPEG', 40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii')
+
+
+def render_image(data, widths, quality=82):
+    """
+    Decode an upload and render its responsive variants.
+
+    Returns {'width', 'height', 'lqip', 'original', 'extension',
+    'variants': [(width, extension, bytes), ...]}. `original` is the
+    full-size image re-encoded without EXIF or other metadata (None when
+    the format is kept as uploaded); EXIF orientation is applied first.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        fmt = source.format
+        animated = getattr(source, 'is_animated', False)
+        image = ImageOps.exif_transpose(source)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA' if has_alpha(image) else 'RGB')
+
+    result = {'width': image.width, 'height': image.height, 'lqip': lqip(image), 'variants': []}
+    if fmt not in REENCODED_FORMATS or animated:
+        result.update(original=None, extension=None)
+        return result
+
+    fallback = 'PNG' if has_alpha(image) else 'JPEG'
+    result['original'] = encode(image, fmt, quality)
+    result['extension'] = REENCODED_FORMATS[fmt]
+
+    for width in sorted({min(width, image.width) for width in widths}):
+        variant = resized(image, width)
+        result['variants'].append((width, REENCODED_FORMATS[fallback], encode(variant, fallback, quality)))
+        result['variants'].append((width, 'webp', encode(variant, 'WEBP', quality)))
+    return result
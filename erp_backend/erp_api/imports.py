@@ -0,0 +1,180 @@
+"""
+Batched lead import from Excel.
+
+The sheet is read with openpyxl in read-only mode and every row is
+validated up front. Valid rows are written in chunks: one
+lead_number__in lookup per chunk, then bulk_update for existing leads
+and bulk_create for new ones, each chunk in its own transaction.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .models import Lead
+from .numbering import allocate
+from .search import index_queryset
+from .stats_cache import invalidate_stats
+
+DEFAULT_BATCH_SIZE = getattr(settings, 'IMPORT_BATCH_SIZE', 500)
+
+LEAD_COLUMNS = [
+    'lead_number', 'contact_person', 'company_name', 'email', 'phone',
+    'source', 'status', 'estimated_value', 'notes',
+]
+
+LEAD_UPDATE_FIELDS = [
+    'contact_person', 'company_name', 'email', 'phone', 'source',
+    'status', 'estimated_value', 'notes', 'created_by',
+]
+
+VALID_SOURCES = {choice for choice, _ in Lead.SOURCE_CHOICES}
+VALID_STATUSES = {choice for choice, _ in Lead.STATUS_CHOICES}
+
+# Checked per row: an over-long value would otherwise fail the whole
+# batch in the database after earlier batches were committed
+LEAD_MAX_LENGTHS = {
+    field: Lead._meta.get_field(field).max_length
+    for field in LEAD_COLUMNS
+    if Lead._meta.get_field(field).max_length
+}
+
+
+def clean_text(value):
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def validate_lead_row(row):
+    """
+    Turn one sheet row into a dict of Lead fields.
+    Raises ValueError with a readable message when the row is invalid.
+    """
+    values = dict(zip(LEAD_COLUMNS, list(row) + [None] * (len(LEAD_COLUMNS) - len(row))))
+    data = {field: clean_text(values[field]) for field in LEAD_COLUMNS if field != 'estimated_value'}
+
+    for field, max_length in LEAD_MAX_LENGTHS.items():
+        if len(data[field]) > max_length:
+            label = Lead._meta.get_field(field).verbose_name.capitalize()
+            raise ValueError(f"{label} is longer than {max_length} characters")
+
+    data['source'] = data['source'] or 'other'
+    if data['source'] not in VALID_SOURCES:
+        raise ValueError(f"Invalid source '{data['source']}'")
+
+    data['status'] = data['status'] or 'new'
+    if data['status'] not in VALID_STATUSES:
+        raise ValueError(f"Invalid status '{data['status']}'")
+
+    if data['email']:
+        try:
+            validate_email(data['email'])
+        except ValidationError:
+            raise ValueError(f"Invalid email '{data['email']}'")
+
+    estimated_value = values['estimated_value']
+    if estimated_value in (None, ''):
+        data['estimated_value'] = None
+    else:
+        try:
+            data['estimated_value'] = Decimal(str(estimated_value))
+            for validator in Lead._meta.get_field('estimated_value').validators:
+                validator(data['estimated_value'])
+        except (InvalidOperation, ValidationError):
+            raise ValueError(f"Invalid estimated value '{estimated_value}'")
+
+    return data
+
+
+def allocate_lead_numbers(count):
+    """Allocate `count` unused LEAD numbers"""
+    return allocate('lead', count)
+
+
+class LeadImporter:
+    """Validate and upsert leads from an uploaded workbook"""
+
+    def __init__(self, user=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = max(1, int(batch_size))
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    def iter_sheet_rows(self, fileobj):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            # Skip header row
+            for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
+                yield row_idx, row
+        finally:
+            wb.close()
+
+    def run(self, fileobj):
+        batch = []
+        for row_idx, row in self.iter_sheet_rows(fileobj):
+            if not row or all(value in (None, '') for value in row):
+                continue
+            try:
+                batch.append(validate_lead_row(row))
+            except ValueError as e:
+                self.errors.append(f"Row {row_idx}: {e}")
+                continue
+
+            if len(batch) >= self.batch_size:
+                self.write_batch(batch)
+                batch = []
+
+        if batch:
+            self.write_batch(batch)
+
+        # bulk_create/bulk_update send no model signals
+        if self.imported:
+            invalidate_stats(Lead)
+        return self
+
+    def write_batch(self, rows):
+        missing = [row for row in rows if not row['lead_number']]
+        if missing:
+            for row, number in zip(missing, allocate_lead_numbers(len(missing))):
+                row['lead_number'] = number
+
+        # Later rows win when a number repeats within the batch
+        by_number = {row['lead_number']: row for row in rows}
+
+        with transaction.atomic():
+            existing = Lead.objects.in_bulk(list(by_number), field_name='lead_number')
+
+            to_update = []
+            to_create = []
+            for number, row in by_number.items():
+                lead = existing.get(number)
+                if lead is None:
+                    lead = Lead(lead_number=number)
+                    to_create.append(lead)
+                else:
+                    to_update.append(lead)
+                for field, value in row.items():
+                    setattr(lead, field, value)
+                lead.created_by = self.user
+
+            if to_create:
+                Lead.objects.bulk_create(to_create, batch_size=self.batch_size)
+            if to_update:
+                Lead.objects.bulk_update(to_update, LEAD_UPDATE_FIELDS, batch_size=self.batch_size)
+
+            # bulk writes skip the search index signals
+            index_queryset('leads', Lead.objects.filter(lead_number__in=list(by_number)))
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
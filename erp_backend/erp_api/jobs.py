@@ -0,0 +1,264 @@
+"""
+Background job runner.
+
+Jobs are rows in the `jobs` table, so the table itself is the queue:
+views call enqueue_job(), and the `run_jobs` management command claims
+queued rows with SELECT ... FOR UPDATE SKIP LOCKED and runs them on a
+thread pool. Handlers report progress and store either a JSON result or
+a result file.
+"""
+import io
+import logging
+import os
+import socket
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import images
+from .activity import log_activity
+from .analytics import build_report
+from .exports import EXPORTS, write_csv, write_xlsx
+from .imports import DEFAULT_BATCH_SIZE, LeadImporter
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = getattr(settings, 'JOB_WORKERS', 2)
+JOB_POLL_INTERVAL = getattr(settings, 'JOB_POLL_INTERVAL', 2.0)
+JOB_UPLOAD_DIR = 'jobs/uploads'
+
+
+# ============= ENQUEUE =============
+def enqueue_job(job_type, params=None, user=None):
+    """Queue a job for the worker and return it"""
+    return Job.objects.create(
+        job_type=job_type,
+        params=params or {},
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def save_job_upload(uploaded_file):
+    """Keep an uploaded file in storage until the worker picks the job up"""
+    name = f"{JOB_UPLOAD_DIR}/{uuid.uuid4().hex}{os.path.splitext(uploaded_file.name)[1]}"
+    return default_storage.save(name, uploaded_file)
+
+
+def job_to_dict(job, request=None):
+    result_url = None
+    if job.result_file:
+        result_url = job.result_file.url
+        if request is not None:
+            result_url = request.build_absolute_uri(result_url)
+    return {
+        'id': job.id,
+        'job_type': job.job_type,
+        'status': job.status,
+        'progress': job.progress,
+        'params': job.params,
+        'result': job.result,
+        'result_url': result_url,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# ============= HANDLERS =============
+def set_progress(job, progress):
+    progress = max(0, min(int(progress), 100))
+    Job.objects.filter(pk=job.pk).update(progress=progress)
+    job.progress = progress
+
+
+def run_export(job):
+    export_name = job.params.get('export')
+    output = job.params.get('output', 'csv')
+    if export_name not in EXPORTS:
+        raise ValueError(f"Unknown export '{export_name}'")
+    if output not in ('csv', 'xlsx'):
+        raise ValueError(f"Unsupported output format: {output}")
+
+    export = EXPORTS[export_name]()
+    rows = export.count()
+    total = rows or 1
+
+    def progress(done):
+        set_progress(job, done * 99 // total)
+
+    with tempfile.TemporaryFile() as tmp:
+        if output == 'csv':
+            text = io.TextIOWrapper(tmp, encoding='utf-8', newline='')
+            write_csv(export, text, progress=progress)
+            text.flush()
+            text.detach()
+        else:
+            write_xlsx(export, tmp, progress=progress)
+        tmp.seek(0)
+        job.result_file.save(export.filename(output), File(tmp), save=False)
+
+    return {'rows': rows}
+
+
+def run_lead_import(job):
+    upload = job.params.get('upload')
+    if not upload or not default_storage.exists(upload):
+        raise ValueError('Uploaded file is missing')
+
+    batch_size = job.params.get('batch_size') or DEFAULT_BATCH_SIZE
+    try:
+        with default_storage.open(upload, 'rb') as fileobj:
+            importer = LeadImporter(user=job.created_by, batch_size=batch_size).run(fileobj)
+    finally:
+        default_storage.delete(upload)
+
+    log_activity(
+        None,
+        user=job.created_by,
+        action='IMPORT_LEADS',
+        table_name='leads',
+        new_values={
+            'imported_count': importer.imported,
+            'created_count': importer.created,
+            'updated_count': importer.updated,
+            'error_count': len(importer.errors),
+            'job_id': job.id
+        }
+    )
+    return {
+        'imported': importer.imported,
+        'created': importer.created,
+        'updated': importer.updated,
+        'errors': len(importer.errors),
+        'error_details': importer.errors or None,
+    }
+
+
+def run_report(job):
+    return build_report(job.params.get('type', 'sales'))
+
+
+IMAGE_BATCH_SIZE = 8
+
+
+def run_image_variants(job):
+    names = [name for name in job.params.get('names', []) if default_storage.exists(name)]
+    # Uploads whose URLs were already handed out must keep their names
+    replace = not job.params.get('keep_names')
+    processed, errors = 0, {}
+    for start in range(0, len(names), IMAGE_BATCH_SIZE):
+        for name, outcome in images.process_stored(names[start:start + IMAGE_BATCH_SIZE], replace).items():
+            if isinstance(outcome, str):
+                errors[name] = outcome
+            else:
+                processed += 1
+        set_progress(job, (start + IMAGE_BATCH_SIZE) * 100 / len(names))
+    return {'processed': processed, 'errors': errors or None}
+
+
+JOB_HANDLERS = {
+    'export': run_export,
+    'import_leads': run_lead_import,
+    'report': run_report,
+    'image_variants': run_image_variants,
+}
+
+
+# ============= WORKER =============
+def claim_next_job(worker_name):
+    """Mark the oldest queued job as running for this worker and return it"""
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=skip_locked)
+            .filter(status='queued')
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.worker = worker_name
+        job.started_at = timezone.now()
+        job.save(update_fields=['status', 'worker', 'started_at'])
+    return job
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome"""
+    try:
+        handler = JOB_HANDLERS.get(job.job_type)
+        if handler is None:
+            raise ValueError(f"Unknown job type '{job.job_type}'")
+        job.result = handler(job)
+        job.status = 'succeeded'
+        job.progress = 100
+        job.error = None
+    except Exception as e:
+        logger.exception('Job %s failed', job.pk)
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'result', 'result_file', 'error', 'finished_at'])
+    return job
+
+
+def run_pending_jobs(worker_name=None, limit=None):
+    """Run queued jobs one after another in this thread; returns how many ran"""
+    worker_name = worker_name or default_worker_name()
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next_job(worker_name)
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def _run_in_thread(job):
+    close_old_connections()
+    try:
+        run_job(job)
+    finally:
+        close_old_connections()
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(workers=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL, once=False, stdout=None):
+    """
+    Claim queued jobs and run them on a thread pool until interrupted.
+    With once=True, exit when the queue is empty.
+    """
+    worker_name = default_worker_name()
+    running = set()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            running = {future for future in running if not future.done()}
+
+            claimed = False
+            while len(running) < workers:
+                job = claim_next_job(worker_name)
+                if job is None:
+                    break
+                claimed = True
+                if stdout:
+                    stdout.write(f"Running job {job.id} ({job.job_type})")
+                running.add(pool.submit(_run_in_thread, job))
+
+            if once and not claimed and not running:
+                return
+            time.sleep(poll_interval if not claimed else 0.1)
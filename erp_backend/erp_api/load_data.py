@@ -0,0 +1,573 @@
+"""
+Synthetic data for load and performance testing.
+
+generate() builds a seeded dataset (python manage.py generate_load_data):
+staff and customer users with profiles, companies, customers, product
+categories and products, then orders with items, invoices and payments,
+leads, website enquiries and activity log entries.
+
+The data is skewed the way real data is: recent days are busier than
+old ones and weekdays busier than weekends, a few customers place most
+of the orders, a few products sell most, and statuses follow an order's
+age (old orders are delivered and paid, recent ones still pending).
+
+Rows are written with bulk_create() in large batches. Primary keys are
+assigned up front from the tables' current maximum, so orders, items,
+invoices and payments can be linked without reading ids back (MySQL
+does not return them from bulk inserts) and chunks can be generated by
+several worker processes at once. Every chunk seeds its own Random from
+(seed, kind, chunk), so a seed gives the same data with any number of
+workers. All synthetic users share one password hash.
+
+bulk_create() sends no signals: the daily sales rollup and the search
+index are rebuilt afterwards by the command. Everything generated is
+tagged with the run's prefix, which flush() uses to remove it again.
+"""
+import math
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import (
+    ActivityLog, Company, Customer, Invoice, Lead, Order, OrderItem, Payment, Product, ProductCategory, UserProfile,
+    WebsiteEnquiry,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_PASSWORD = 'LoadTest123!'
+MAX_ITEMS_PER_ORDER = 5
+MAX_PAYMENTS_PER_ORDER = 2
+
+# Models written here, in dependency order
+GENERATED_MODELS = [
+    User, UserProfile, Company, Customer, ProductCategory, Product,
+    Order, OrderItem, Invoice, Payment, Lead, WebsiteEnquiry, ActivityLog,
+]
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Priya', 'Arjun',
+    'Ananya', 'Rahul', 'Mei', 'Wei', 'Hiroshi', 'Yuki', 'Omar', 'Fatima', 'Carlos', 'Lucia',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'Martin', 'Lee', 'Sharma', 'Patel',
+    'Nair', 'Menon', 'Chen', 'Wang', 'Tanaka', 'Sato', 'Khan', 'Hassan', 'Silva', 'Rossi',
+]
+COMPANY_WORDS = [
+    'Oak', 'Maple', 'Harbor', 'Summit', 'Cedar', 'Pioneer', 'Atlas', 'Crescent', 'Lakeside', 'Northwind',
+    'Evergreen', 'Silverline', 'Redwood', 'Bluebird', 'Granite', 'Horizon', 'Meadow', 'Riverside',
+]
+COMPANY_SUFFIXES = ['Interiors', 'Homes', 'Hospitality', 'Offices', 'Design Studio', 'Realty', 'Hotels', 'Living']
+STREETS = ['Main St', 'Park Ave', 'Oak St', 'Lake Rd', 'Hill St', 'Church Rd', 'Station Rd', 'Market St', 'MG Road']
+CITIES = ['Springfield', 'Riverside', 'Fairview', 'Kochi', 'Bengaluru', 'Pune', 'Madison', 'Georgetown', 'Salem']
+CATEGORY_NAMES = ['Sofas', 'Beds', 'Dining', 'Chairs', 'Tables', 'Storage', 'Outdoor', 'Lighting', 'Decor', 'Office']
+PRODUCT_ADJECTIVES = ['Classic', 'Modern', 'Rustic', 'Nordic', 'Compact', 'Deluxe', 'Velvet', 'Teak', 'Walnut', 'Oak']
+PRODUCT_NOUNS = {
+    'Sofas': ['Sofa', 'Loveseat', 'Sectional', 'Recliner'],
+    'Beds': ['Bed Frame', 'Bunk Bed', 'Daybed', 'Headboard'],
+    'Dining': ['Dining Table', 'Dining Set', 'Bench', 'Sideboard'],
+    'Chairs': ['Armchair', 'Accent Chair', 'Rocking Chair', 'Stool'],
+    'Tables': ['Coffee Table', 'Side Table', 'Console', 'Nesting Tables'],
+    'Storage': ['Wardrobe', 'Bookcase', 'Dresser', 'Cabinet'],
+    'Outdoor': ['Patio Set', 'Sun Lounger', 'Hammock', 'Garden Bench'],
+    'Lighting': ['Floor Lamp', 'Table Lamp', 'Pendant', 'Wall Sconce'],
+    'Decor': ['Mirror', 'Rug', 'Vase', 'Wall Art'],
+    'Office': ['Desk', 'Office Chair', 'Filing Cabinet', 'Standing Desk'],
+}
+ACTIVITY_ACTIONS = [('view', 50), ('update', 20), ('create', 15), ('login', 10), ('delete', 3), ('export', 2)]
+ACTIVITY_TABLES = ['orders', 'customers', 'invoices', 'payments', 'leads', 'products', 'website_enquiries']
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148',
+]
+
+# Share of orders placed in each hour of the day
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 9, 10, 10, 9, 9, 10, 10, 9, 8, 8, 7, 6, 4, 3, 2]
+
+
+# ============= RANDOM HELPERS =============
+def chunk_rng(seed, kind, chunk):
+    return random.Random(f'{seed}:{kind}:{chunk}')
+
+
+def weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights)[0]
+
+
+def skewed_age(rng, days):
+    """Days before now, denser towards now (linearly growing traffic)"""
+    return days * (1 - math.sqrt(rng.random()))
+
+
+def skewed_datetime(rng, now, days):
+    while True:
+        moment = now - timedelta(days=skewed_age(rng, days))
+        # Weekends get about half the weekday traffic
+        if moment.weekday() < 5 or rng.random() < 0.5:
+            break
+    hour = rng.choices(range(24), HOUR_WEIGHTS)[0]
+    moment = moment.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+    return min(moment, now)
+
+
+def skewed_index(rng, count, power=2.5):
+    """Index in [0, count) where low indexes are picked far more often"""
+    return min(int(count * rng.random() ** power), count - 1)
+
+
+def money(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def person(rng):
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def address(rng):
+    return f'{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)} {rng.randint(10000, 99999)}'
+
+
+def phone(rng):
+    return f'+1-{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}'
+
+
+def company_name(rng):
+    return f'{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_SUFFIXES)}'
+
+
+# ============= TIMESTAMPS =============
+@contextmanager
+def historical_timestamps():
+    """Let bulk_create() keep the created_at/updated_at values we set instead of now()"""
+    saved = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in GENERATED_MODELS for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in saved:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+# ============= PLAN =============
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+def username_prefix(prefix):
+    return f'{prefix.lower()}_'
+
+
+def category_marker(prefix):
+    return f'[{prefix}] generated load data'
+
+
+def plan(counts, prefix, seed, days, batch_size):
+    """Everything the chunk workers need: sizes, id bases, the product catalog"""
+    return {
+        'counts': counts,
+        'prefix': prefix,
+        'seed': seed,
+        'days': days,
+        'batch_size': batch_size,
+        'now': timezone.now().isoformat(),
+        'staff_count': max(1, counts['users'] // 100),
+        'ids': {model._meta.model_name: next_id(model) for model in GENERATED_MODELS},
+    }
+
+
+def staff_ids(spec):
+    base = spec['ids']['user']
+    return range(base, base + spec['staff_count'])
+
+
+def customer_range(spec):
+    return spec['ids']['customer'], spec['counts']['users'] - spec['staff_count']
+
+
+# ============= REFERENCE DATA =============
+def create_people(spec, password_hash):
+    """Users with profiles, companies and one customer per non-staff user"""
+    rng = chunk_rng(spec['seed'], 'people', 0)
+    now = datetime.fromisoformat(spec['now'])
+    prefix, ids, days = spec['prefix'], spec['ids'], spec['days']
+    batch_size = spec['batch_size']
+
+    companies = []
+    for index in range(spec['counts']['companies']):
+        first, last = person(rng)
+        companies.append(Company(
+            id=ids['company'] + index, name=company_name(rng), address=address(rng), phone=phone(rng),
+            email=f'info{index}@{prefix.lower()}.example.com', contact_person=f'{first} {last}',
+            created_at=skewed_datetime(rng, now, days), created_by_id=ids['user'],
+        ))
+
+    users, profiles, customers = [], [], []
+    staff_count = spec['staff_count']
+    for index in range(spec['counts']['users']):
+        first, last = person(rng)
+        user_id = ids['user'] + index
+        joined = skewed_datetime(rng, now, days)
+        is_staff = index < staff_count
+        users.append(User(
+            id=user_id, username=f'{username_prefix(prefix)}user{index:07d}', password=password_hash,
+            first_name=first, last_name=last, email=f'{first}.{last}.{index}@{prefix.lower()}.example.com'.lower(),
+            is_staff=is_staff, date_joined=joined,
+        ))
+        profiles.append(UserProfile(
+            id=ids['userprofile'] + index, user_id=user_id, unique_id=f'{prefix}-U{index:07d}',
+            role='staff' if is_staff else 'customer', phone=phone(rng),
+        ))
+        if is_staff:
+            continue
+        customer_index = index - staff_count
+        customers.append(Customer(
+            id=ids['customer'] + customer_index, user_id=user_id,
+            company_id=ids['company'] + rng.randrange(len(companies)) if companies and rng.random() < 0.4 else None,
+            customer_code=f'{prefix}-CUST-{customer_index:07d}',
+            customer_type=weighted(rng, [('regular', 75), ('premium', 15), ('minimum', 10)]),
+            billing_address=address(rng), shipping_address=address(rng),
+            credit_limit=money(rng.choice([500000, 1000000, 2500000])), balance=Decimal('0.00'),
+            tax_number=f'TAX-{rng.randint(100000, 999999)}', created_at=joined,
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        UserProfile.objects.bulk_create(profiles, batch_size=batch_size)
+        Company.objects.bulk_create(companies, batch_size=batch_size)
+        Customer.objects.bulk_create(customers, batch_size=batch_size)
+    return {'users': len(users), 'companies': len(companies), 'customers': len(customers)}
+
+
+def create_catalog(spec):
+    """Categories and products; returns the counts and [(product id, price in cents)]"""
+    rng = chunk_rng(spec['seed'], 'catalog', 0)
+    now = datetime.fromisoformat(spec['now'])
+    prefix, ids, days = spec['prefix'], spec['ids'], spec['days']
+
+    categories = [
+        ProductCategory(
+            id=ids['productcategory'] + index, name=name, description=category_marker(prefix),
+            created_at=now - timedelta(days=days),
+        )
+        for index, name in enumerate(CATEGORY_NAMES)
+    ]
+    products, catalog = [], []
+    for index in range(spec['counts']['products']):
+        category_index = rng.randrange(len(categories))
+        price = rng.randint(20, 2000) * 100 - 1
+        product_id = ids['product'] + index
+        name = f"{rng.choice(PRODUCT_ADJECTIVES)} {rng.choice(PRODUCT_NOUNS[CATEGORY_NAMES[category_index]])}"
+        products.append(Product(
+            id=product_id, sku=f'{prefix}-SKU-{index:06d}', name=name, description=f'{name} for load testing',
+            category_id=categories[category_index].id, price=money(price), cost=money(price * 6 // 10),
+            stock_quantity=rng.randint(0, 500), min_stock_level=10, is_active=rng.random() < 0.95,
+            created_at=skewed_datetime(rng, now, days), created_by_id=ids['user'],
+        ))
+        catalog.append((product_id, price))
+
+    with transaction.atomic():
+        ProductCategory.objects.bulk_create(categories)
+        Product.objects.bulk_create(products, batch_size=spec['batch_size'])
+    return {'categories': len(categories), 'products': len(products)}, catalog
+
+
+# ============= CHUNKS =============
+def order_status(rng, age_days):
+    if age_days < 3:
+        return weighted(rng, [('pending', 40), ('confirmed', 30), ('processing', 20), ('cancelled', 10)])
+    if age_days < 14:
+        return weighted(rng, [
+            ('confirmed', 10), ('processing', 25), ('shipped', 40), ('delivered', 15), ('cancelled', 10),
+        ])
+    return weighted(rng, [('delivered', 85), ('shipped', 5), ('cancelled', 10)])
+
+
+def payment_status(rng, status):
+    if status == 'cancelled':
+        return 'pending'
+    if status == 'delivered':
+        return weighted(rng, [('paid', 90), ('partial', 7), ('pending', 3)])
+    if status == 'shipped':
+        return weighted(rng, [('paid', 60), ('partial', 20), ('pending', 20)])
+    return weighted(rng, [('pending', 70), ('partial', 10), ('paid', 20)])
+
+
+def generate_orders(spec, catalog, rng, start, stop, now):
+    prefix, ids = spec['prefix'], spec['ids']
+    customer_base, customer_count = customer_range(spec)
+    staff = staff_ids(spec)
+    # Zipf-like popularity: the first products sell most
+    product_weights = [1 / (rank + 1) for rank in range(len(catalog))]
+
+    orders, items, invoices, payments = [], [], [], []
+    for index in range(start, stop):
+        order_id = ids['order'] + index
+        ordered_at = skewed_datetime(rng, now, spec['days'])
+        status = order_status(rng, (now - ordered_at).days)
+        paid_state = payment_status(rng, status)
+        customer_id = customer_base + skewed_index(rng, customer_count)
+        created_by = rng.choice(staff)
+
+        total = 0
+        picked = rng.choices(catalog, product_weights, k=rng.choices(range(1, MAX_ITEMS_PER_ORDER + 1), [45, 25, 15, 10, 5])[0])
+        for position, (product_id, price) in enumerate(picked):
+            quantity = weighted(rng, [(1, 70), (2, 20), (3, 7), (4, 3)])
+            total += price * quantity
+            items.append(OrderItem(
+                id=ids['orderitem'] + index * MAX_ITEMS_PER_ORDER + position, order_id=order_id,
+                product_id=product_id, quantity=quantity, unit_price=money(price), total_price=money(price * quantity),
+            ))
+        tax = total // 10
+        discount = total * weighted(rng, [(0, 80), (5, 15), (10, 5)]) // 100
+        grand_total = total + tax - discount
+        orders.append(Order(
+            id=order_id, order_number=f'{prefix}-ORD-{index:08d}', customer_id=customer_id, order_date=ordered_at,
+            status=status, total_amount=money(total), tax_amount=money(tax), discount_amount=money(discount),
+            grand_total=money(grand_total), payment_status=paid_state, shipping_address=address(rng),
+            created_by_id=created_by,
+        ))
+
+        if status in ('pending', 'cancelled'):
+            continue
+        invoice_id = ids['invoice'] + index
+        issued = ordered_at + timedelta(hours=rng.randint(1, 48))
+        due = issued.date() + timedelta(days=30)
+        paid = {'paid': grand_total, 'partial': grand_total * rng.randint(30, 70) // 100, 'pending': 0}[paid_state]
+        if paid_state == 'paid':
+            invoice_status = 'paid'
+        elif due < now.date():
+            invoice_status = 'overdue'
+        else:
+            invoice_status = weighted(rng, [('sent', 85), ('draft', 15)]) if not paid else 'sent'
+        invoices.append(Invoice(
+            id=invoice_id, invoice_number=f'{prefix}-INV-{index:08d}', order_id=order_id, customer_id=customer_id,
+            invoice_date=issued.date(), due_date=due, total_amount=money(grand_total), tax_amount=money(tax),
+            paid_amount=money(paid), balance_amount=money(grand_total - paid), status=invoice_status,
+            created_at=issued, created_by_id=created_by,
+        ))
+
+        # Paid invoices are sometimes settled in two instalments
+        parts = [paid] if paid_state != 'paid' or rng.random() < 0.8 else [paid // 2, paid - paid // 2]
+        paid_at = issued
+        for position, amount in enumerate(part for part in parts if part):
+            paid_at = min(paid_at + timedelta(days=rng.randint(0, 20), hours=rng.randint(0, 23)), now)
+            payments.append(Payment(
+                id=ids['payment'] + index * MAX_PAYMENTS_PER_ORDER + position,
+                payment_number=f'{prefix}-PAY-{index:08d}-{position}', invoice_id=invoice_id,
+                customer_id=customer_id, payment_date=paid_at.date(),
+                payment_method=weighted(rng, [
+                    ('online', 40), ('credit_card', 30), ('bank_transfer', 20), ('cash', 7), ('cheque', 3),
+                ]),
+                amount=money(amount), reference_number=f'REF{rng.randint(10 ** 9, 10 ** 10 - 1)}',
+                created_at=paid_at, created_by_id=created_by,
+            ))
+
+    with transaction.atomic():
+        Order.objects.bulk_create(orders, batch_size=spec['batch_size'])
+        OrderItem.objects.bulk_create(items, batch_size=spec['batch_size'])
+        Invoice.objects.bulk_create(invoices, batch_size=spec['batch_size'])
+        Payment.objects.bulk_create(payments, batch_size=spec['batch_size'])
+    return {'orders': len(orders), 'order_items': len(items), 'invoices': len(invoices), 'payments': len(payments)}
+
+
+def lead_status(rng, age_days):
+    if age_days < 14:
+        return weighted(rng, [('new', 50), ('contacted', 30), ('qualified', 15), ('lost', 5)])
+    return weighted(rng, [
+        ('contacted', 10), ('qualified', 10), ('proposal_sent', 10), ('negotiation', 5), ('won', 25), ('lost', 40),
+    ])
+
+
+def generate_leads(spec, catalog, rng, start, stop, now):
+    prefix, ids = spec['prefix'], spec['ids']
+    staff = staff_ids(spec)
+    leads = []
+    for index in range(start, stop):
+        created_at = skewed_datetime(rng, now, spec['days'])
+        first, last = person(rng)
+        leads.append(Lead(
+            id=ids['lead'] + index, lead_number=f'{prefix}-LEAD-{index:08d}', company_name=company_name(rng),
+            contact_person=f'{first} {last}', email=f'{first}.{last}.{index}@example.com'.lower(), phone=phone(rng),
+            source=weighted(rng, [('website', 45), ('referral', 20), ('social_media', 20), ('campaign', 10), ('other', 5)]),
+            status=lead_status(rng, (now - created_at).days),
+            estimated_value=money(rng.randint(500, 50000) * 100), assigned_to_id=rng.choice(staff),
+            created_at=created_at, created_by_id=rng.choice(staff),
+        ))
+    Lead.objects.bulk_create(leads, batch_size=spec['batch_size'])
+    return {'leads': len(leads)}
+
+
+def generate_enquiries(spec, catalog, rng, start, stop, now):
+    prefix, ids = spec['prefix'], spec['ids']
+    staff = staff_ids(spec)
+    lead_count = spec['counts']['leads']
+    enquiries = []
+    for index in range(start, stop):
+        created_at = skewed_datetime(rng, now, spec['days'])
+        status = weighted(rng, [('new', 30), ('contacted', 25), ('qualified', 15), ('converted', 20), ('rejected', 10)])
+        converted = status == 'converted' and lead_count
+        first, last = person(rng)
+        enquiries.append(WebsiteEnquiry(
+            id=ids['websiteenquiry'] + index, enquiry_number=f'{prefix}-ENQ-{index:08d}',
+            enquiry_type=weighted(rng, [('product', 60), ('service', 15), ('support', 15), ('partnership', 5), ('other', 5)]),
+            company_name=company_name(rng), contact_person=f'{first} {last}',
+            email=f'{first}.{last}.{index}@example.com'.lower(), phone=phone(rng),
+            subject='Product enquiry', message='Please share pricing and delivery times.',
+            interested_product_id=rng.choice(catalog)[0] if catalog and rng.random() < 0.6 else None,
+            status=status, lead_id=ids['lead'] + rng.randrange(lead_count) if converted else None,
+            assigned_to_id=rng.choice(staff) if status != 'new' else None,
+            ip_address=f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+            created_at=created_at, updated_at=created_at,
+            converted_at=created_at + timedelta(days=rng.randint(1, 10)) if converted else None,
+            converted_by_id=rng.choice(staff) if converted else None,
+        ))
+    WebsiteEnquiry.objects.bulk_create(enquiries, batch_size=spec['batch_size'])
+    return {'enquiries': len(enquiries)}
+
+
+def generate_activity(spec, catalog, rng, start, stop, now):
+    ids = spec['ids']
+    staff = staff_ids(spec)
+    order_count = max(spec['counts']['orders'], 1)
+    entries = []
+    for index in range(start, stop):
+        action = weighted(rng, ACTIVITY_ACTIONS)
+        entries.append(ActivityLog(
+            id=ids['activitylog'] + index, user_id=rng.choice(staff), action=action,
+            table_name=None if action == 'login' else rng.choice(ACTIVITY_TABLES),
+            record_id=None if action == 'login' else ids['order'] + skewed_index(rng, order_count, 1.5),
+            ip_address=f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+            user_agent=rng.choice(USER_AGENTS), created_at=skewed_datetime(rng, now, spec['days']),
+        ))
+    ActivityLog.objects.bulk_create(entries, batch_size=spec['batch_size'])
+    return {'activity_logs': len(entries)}
+
+
+CHUNK_GENERATORS = {
+    'orders': generate_orders,
+    'leads': generate_leads,
+    'enquiries': generate_enquiries,
+    'activity': generate_activity,
+}
+# Enquiries link to leads, so they wait for the first phase to commit
+PHASES = [('orders', 'leads'), ('enquiries', 'activity')]
+
+
+def generate_chunk(spec, catalog, kind, chunk, start, stop):
+    """Generate rows [start, stop) of `kind`; runs in the command or in a worker process"""
+    rng = chunk_rng(spec['seed'], kind, chunk)
+    now = datetime.fromisoformat(spec['now'])
+    with historical_timestamps():
+        return CHUNK_GENERATORS[kind](spec, catalog, rng, start, stop, now)
+
+
+def chunks(spec, kinds):
+    size = spec['batch_size']
+    for kind in kinds:
+        for chunk, start in enumerate(range(0, spec['counts'][kind], size)):
+            yield kind, chunk, start, min(start + size, spec['counts'][kind])
+
+
+# ============= ENTRY POINTS =============
+def exists(prefix):
+    return User.objects.filter(username__startswith=username_prefix(prefix)).exists()
+
+
+def generate(counts, prefix='LD', seed=42, days=730, batch_size=DEFAULT_BATCH_SIZE, workers=1,
+             password=DEFAULT_PASSWORD, progress=None):
+    """
+    Generate a dataset. `counts` holds users, companies, products, orders,
+    leads, enquiries and activity. Returns {table: rows written}.
+    `progress(message)` is called after each step.
+    """
+    progress = progress or (lambda message: None)
+    spec = plan(counts, prefix, seed, days, batch_size)
+    totals = {}
+
+    # One hash for every synthetic user: hashing is the slow part of creating users
+    with historical_timestamps():
+        totals.update(create_people(spec, make_password(password)))
+        progress(f"{totals['users']} users, {totals['customers']} customers, {totals['companies']} companies")
+        catalog_counts, catalog = create_catalog(spec)
+        totals.update(catalog_counts)
+        progress(f"{totals['products']} products in {totals['categories']} categories")
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            # django.setup, not a function of this module: unpickling that would import models too early
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+        )
+    try:
+        for kinds in PHASES:
+            tasks = list(chunks(spec, kinds))
+            if pool:
+                results = pool.map(generate_chunk, *zip(*[(spec, catalog) + task for task in tasks])) if tasks else []
+            else:
+                results = (generate_chunk(spec, catalog, *task) for task in tasks)
+            for (kind, chunk, start, stop), result in zip(tasks, results):
+                for table, count in result.items():
+                    totals[table] = totals.get(table, 0) + count
+                progress(f'{kind} {start}-{stop} written')
+    finally:
+        if pool:
+            pool.shutdown()
+
+    reset_sequences()
+    return totals
+
+
+def reset_sequences():
+    """Move sequences past the ids assigned here (needed on PostgreSQL; a no-op on MySQL and SQLite)"""
+    statements = connection.ops.sequence_reset_sql(no_style(), GENERATED_MODELS)
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def flush(prefix='LD'):
+    """Delete the data a previous generate() with `prefix` wrote; returns {table: rows deleted}"""
+    users = User.objects.filter(username__startswith=username_prefix(prefix))
+    number_prefix = f'{prefix}-'
+    # Removed in dependency order with plain DELETEs: collecting millions of
+    # rows for signals and cascades would take longer than generating them
+    querysets = [
+        ('payments', Payment.objects.filter(payment_number__startswith=number_prefix)),
+        ('invoices', Invoice.objects.filter(invoice_number__startswith=number_prefix)),
+        ('order_items', OrderItem.objects.filter(order__order_number__startswith=number_prefix)),
+        ('orders', Order.objects.filter(order_number__startswith=number_prefix)),
+        ('enquiries', WebsiteEnquiry.objects.filter(enquiry_number__startswith=number_prefix)),
+        ('leads', Lead.objects.filter(lead_number__startswith=number_prefix)),
+        ('activity_logs', ActivityLog.objects.filter(user_id__in=users.values('id'))),
+        ('customers', Customer.objects.filter(customer_code__startswith=number_prefix)),
+        ('user_profiles', UserProfile.objects.filter(unique_id__startswith=number_prefix)),
+        ('companies', Company.objects.filter(email__endswith=f'@{prefix.lower()}.example.com')),
+        ('products', Product.objects.filter(sku__startswith=number_prefix)),
+        ('categories', ProductCategory.objects.filter(description=category_marker(prefix))),
+        ('users', users),
+    ]
+    deleted = {}
+    with transaction.atomic():
+        for table, queryset in querysets:
+            deleted[table] = queryset._raw_delete(queryset.db)
+    return deleted
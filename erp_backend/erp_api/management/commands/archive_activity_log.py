@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from erp_api import activity_archive
+
+
+class Command(BaseCommand):
+    help = 'Move activity log entries older than the retention window into compressed archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=activity_archive.ACTIVITY_LOG_RETENTION_DAYS,
+            help='Keep this many days in the live table (default: ACTIVITY_LOG_RETENTION_DAYS)',
+        )
+        parser.add_argument('--batch-size', type=int, default=activity_archive.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--months-ahead', type=int, default=3, help='Monthly partitions to keep ready (MySQL)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the entries that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        moved = activity_archive.archive_before(cutoff, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{moved} activity log entries are older than {cutoff:%Y-%m-%d %H:%M}')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} activity log entries to {activity_archive.archive_dir()}'
+        ))
+
+        if connection.vendor == 'mysql':
+            dropped = activity_archive.drop_partitions_before(cutoff)
+            added = activity_archive.ensure_partitions(options['months_ahead'])
+            self.stdout.write(f'Dropped partitions: {", ".join(dropped) or "none"}; added: {", ".join(added) or "none"}')
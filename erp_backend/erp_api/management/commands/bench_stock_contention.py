@@ -0,0 +1,76 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, DatabaseError
+
+from erp_api import stock
+from erp_api.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Race many buyers for one product through the stock ledger and check nothing is oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=100, help='Units on hand at the start')
+        parser.add_argument('--buyers', type=int, default=1000, help='Number of purchase attempts')
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent buyer threads')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per purchase')
+        parser.add_argument('--mode', choices=['sell', 'hold'], default='hold',
+                            help='sell: take stock directly; hold: reserve then commit like card checkout')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark product afterwards')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['buyers'] < 1:
+            raise CommandError('--threads and --buyers must be positive')
+
+        product = Product.objects.create(
+            sku=f"BENCH-{uuid.uuid4().hex[:8].upper()}",
+            name='Stock contention benchmark',
+            price=1,
+            stock_quantity=options['stock'],
+        )
+        quantity = options['quantity']
+
+        def buy(_):
+            close_old_connections()
+            try:
+                if options['mode'] == 'sell':
+                    stock.sell_stock(product, quantity)
+                else:
+                    stock.commit_reservation(stock.reserve_stock(product, quantity))
+                return 'sold'
+            except stock.InsufficientStock:
+                return 'rejected'
+            except DatabaseError:
+                return 'error'
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            outcomes = list(pool.map(buy, range(options['buyers'])))
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        sold = outcomes.count('sold')
+        expected_stock = options['stock'] - sold * quantity
+
+        self.stdout.write(
+            f"{options['buyers']} attempts on {options['threads']} threads in {elapsed:.2f}s "
+            f"({options['buyers'] / elapsed:.0f} req/s)"
+        )
+        self.stdout.write(
+            f"sold={sold} rejected={outcomes.count('rejected')} errors={outcomes.count('error')} "
+            f"stock={product.stock_quantity} reserved={product.reserved_quantity}"
+        )
+
+        oversold = product.stock_quantity < 0 or product.stock_quantity != expected_stock or product.reserved_quantity != 0
+
+        if not options['keep']:
+            product.delete()
+
+        if oversold:
+            raise CommandError(f'Stock is inconsistent: expected {expected_stock} units left')
+        self.stdout.write(self.style.SUCCESS('No oversell'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from erp_api import storage
+
+
+class Command(BaseCommand):
+    help = 'Delete stored media files that no record refers to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=24, metavar='HOURS',
+                            help='Leave files younger than this alone (default 24)')
+        parser.add_argument('--all', action='store_true',
+                            help='Also sweep files saved before content-addressed storage, not just cas/')
+        parser.add_argument('--dry-run', action='store_true', help='Only list what would be deleted')
+
+    def handle(self, *args, **options):
+        removed, freed, assets = storage.collect_garbage(
+            min_age=options['min_age'] * 3600,
+            prefix=None if options['all'] else storage.CAS_PREFIX,
+            dry_run=options['dry_run'],
+        )
+        for name in removed:
+            self.stdout.write(name)
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(removed)} file(s), {freed / 1024 / 1024:.1f} MB, and {assets} image variant set(s)'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from erp_api import images
+from erp_api.jobs import enqueue_job
+
+
+class Command(BaseCommand):
+    help = 'Render responsive variants for stored images that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Images per job or per inline batch')
+        parser.add_argument('--inline', action='store_true', help='Render here instead of queueing jobs for the worker')
+
+    def handle(self, *args, **options):
+        names = images.unprocessed_names()
+        batch_size = max(options['batch_size'], 1)
+        failed = 0
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            if not options['inline']:
+                job = enqueue_job('image_variants', {'names': batch})
+                self.stdout.write(f'Queued job {job.id} for {len(batch)} image(s)')
+                continue
+            for name, outcome in images.process_stored(batch).items():
+                if isinstance(outcome, str):
+                    failed += 1
+                    self.stderr.write(f'{name}: {outcome}')
+
+        verb = 'Rendered' if options['inline'] else 'Queued'
+        self.stdout.write(self.style.SUCCESS(f'{verb} variants for {len(names) - failed} image(s)'))
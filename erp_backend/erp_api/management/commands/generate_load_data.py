@@ -0,0 +1,81 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from erp_api import load_data
+from erp_api.conditional import bump_content_version
+from erp_api.models import Customer, Invoice, Lead, Order, Payment, Product, ProductCategory
+from erp_api.stats_cache import invalidate_stats
+
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic dataset (users, customers, orders, invoices, payments, leads, ...) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users; 1%% are staff, the rest customers')
+        parser.add_argument('--companies', type=int, default=100)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=10000, help='Orders, each with items, most with an invoice')
+        parser.add_argument('--leads', type=int, default=2000)
+        parser.add_argument('--enquiries', type=int, default=1000)
+        parser.add_argument('--activity', type=int, default=20000, help='Activity log entries')
+        parser.add_argument('--days', type=int, default=730, help='Spread the data over this many past days')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='LD', help='Tag for generated numbers, usernames and emails')
+        parser.add_argument('--batch-size', type=int, default=load_data.DEFAULT_BATCH_SIZE, help='Rows per chunk and INSERT')
+        parser.add_argument('--workers', type=int, default=1, help='Processes generating order/lead/enquiry/activity chunks')
+        parser.add_argument('--password', default=load_data.DEFAULT_PASSWORD, help='Password of every generated user')
+        parser.add_argument('--flush', action='store_true', help='Delete the data generated earlier with --prefix first')
+        parser.add_argument('--flush-only', action='store_true', help='Only delete the data generated with --prefix')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help='Do not rebuild the daily sales rollup and search index afterwards')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        counts = {key: options[key] for key in ('users', 'companies', 'products', 'orders', 'leads', 'enquiries', 'activity')}
+        if any(count < 0 for count in counts.values()) or options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('Counts must not be negative; --batch-size and --workers must be positive')
+        if counts['users'] < 2:
+            raise CommandError('--users must be at least 2 (one staff user and one customer)')
+        if counts['orders'] and not counts['products']:
+            raise CommandError('Orders need --products')
+        if not prefix.isalnum():
+            raise CommandError('--prefix must be alphanumeric')
+
+        if options['flush'] or options['flush_only']:
+            deleted = load_data.flush(prefix)
+            self.stdout.write('Deleted ' + ', '.join(f'{count} {table}' for table, count in deleted.items() if count))
+            if options['flush_only']:
+                self.rebuild(options)
+                return
+        if load_data.exists(prefix):
+            raise CommandError(f'Data with prefix {prefix} exists; use --flush or another --prefix')
+
+        started = time.perf_counter()
+
+        def progress(message):
+            self.stdout.write(f'[{time.perf_counter() - started:7.1f}s] {message}')
+
+        totals = load_data.generate(
+            counts, prefix=prefix, seed=options['seed'], days=options['days'], batch_size=options['batch_size'],
+            workers=options['workers'], password=options['password'], progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(', '.join(f'{count} {table}' for table, count in totals.items()))
+        self.stdout.write(f'{rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 0.001):.0f} rows/s)')
+
+        self.rebuild(options)
+        self.stdout.write(self.style.SUCCESS(f'Load data generated (prefix {prefix}, seed {options["seed"]})'))
+
+    def rebuild(self, options):
+        # bulk_create() and raw deletes skip the signals that keep these current
+        bump_content_version(Product, ProductCategory)
+        for model in (Customer, Order, Invoice, Payment, Lead):
+            invalidate_stats(model)
+        if options['skip_rebuild']:
+            self.stdout.write('Skipped rebuilds; run rebuild_sales_rollup and rebuild_search_index')
+            return
+        call_command('rebuild_sales_rollup', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
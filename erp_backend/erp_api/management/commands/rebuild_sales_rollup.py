@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from erp_api import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollup table from orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=sorted(rollups.ROLLUP_SOURCES), help='Only rebuild one order source')
+        parser.add_argument('--start', type=str, help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', type=str, help='Last date to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format')
+
+        sources = [options['source']] if options['source'] else None
+        written = rollups.rebuild(sources=sources, start_date=start_date, end_date=end_date)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt daily sales rollup: {written} rows written'))
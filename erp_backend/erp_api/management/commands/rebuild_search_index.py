@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from erp_api import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index documents and tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entity', action='append', choices=sorted(search.SEARCH_ENTITIES),
+                            help='Only rebuild one entity (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=search.INDEX_BATCH_SIZE, help='Records indexed per batch')
+
+    def handle(self, *args, **options):
+        counts = search.rebuild_index(options['entity'], batch_size=options['batch_size'])
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count} indexed')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt'))
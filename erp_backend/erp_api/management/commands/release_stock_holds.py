@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from erp_api import stock
+
+
+class Command(BaseCommand):
+    help = 'Release checkout stock reservations that have expired'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', type=float, metavar='SECONDS', help='Keep sweeping every SECONDS instead of running once')
+
+    def handle(self, *args, **options):
+        while True:
+            released = stock.release_expired_reservations()
+            self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock reservation(s)'))
+            if not options['loop']:
+                return
+            try:
+                time.sleep(options['loop'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from erp_api import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API endpoints and optionally compare the results with a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='client',
+                            help="'client' for the in-process test client, or a server URL such as http://127.0.0.1:8000")
+        parser.add_argument('--scenario', action='append', choices=benchmarks.SCENARIO_NAMES,
+                            help='Only run this scenario (repeatable)')
+        parser.add_argument('--requests', type=int, default=benchmarks.DEFAULT_REQUESTS, help='Measured requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads sending requests')
+        parser.add_argument('--warmup', type=int, default=benchmarks.DEFAULT_WARMUP, help='Unmeasured requests per scenario')
+        parser.add_argument('--no-writes', action='store_true', help='Skip scenarios that write (checkout)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Results file to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown against the baseline (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['warmup'] < 0:
+            raise CommandError('--requests and --concurrency must be positive and --warmup not negative')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline: {e}')
+
+        self.stdout.write(f"{'scenario':<22}{'reqs':>6}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'queries':>9}")
+
+        def progress(name, result):
+            queries = result['queries_per_request']
+            self.stdout.write(
+                f"{name:<22}{result['requests']:>6}{result['errors']:>6}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['p99_ms']:>10.2f}{result['throughput_rps']:>10.1f}{'-' if queries is None else queries:>9}"
+            )
+
+        results = benchmarks.run_benchmarks(
+            target=options['target'], scenarios=options['scenario'], requests=options['requests'],
+            concurrency=options['concurrency'], warmup=options['warmup'], writes=not options['no_writes'],
+            progress=progress,
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+                output.write('\n')
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            for key in ('target', 'database', 'concurrency'):
+                if baseline.get('meta', {}).get(key) != results['meta'][key]:
+                    self.stderr.write(f"Baseline {key} was {baseline.get('meta', {}).get(key)!r}, this run {results['meta'][key]!r}")
+            problems = benchmarks.compare(results, baseline, tolerance=options['tolerance'])
+            if problems:
+                for problem in problems:
+                    self.stderr.write(problem)
+                raise CommandError(f'{len(problems)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
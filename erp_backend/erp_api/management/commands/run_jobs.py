@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from erp_api import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (exports, imports, reports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=jobs.JOB_WORKERS, help='Number of worker threads')
+        parser.add_argument('--poll', type=float, default=jobs.JOB_POLL_INTERVAL, help='Seconds between queue polls')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Job worker started with {options['workers']} thread(s)"))
+        try:
+            jobs.run_worker(
+                workers=options['workers'],
+                poll_interval=options['poll'],
+                once=options['once'],
+                stdout=self.stdout
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Job worker stopped'))
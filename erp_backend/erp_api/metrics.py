@@ -0,0 +1,192 @@
+"""
+Per-endpoint request metrics in Prometheus text format.
+
+erp_backend.middleware.metrics.MetricsMiddleware times every request and
+counts the queries it runs (through a connection execute_wrapper). It
+records them here per URL name and method:
+
+    erp_http_requests_total                  requests
+    erp_http_request_errors_total            5xx responses
+    erp_http_request_duration_seconds        latency histogram
+    erp_http_response_size_bytes_total       response bytes
+    erp_db_queries_total                     queries run
+    erp_db_query_duration_seconds_total      time spent in the database
+
+Each thread writes to its own shard, so recording takes no lock;
+snapshot() adds the shards up. With METRICS_DIR set, every worker
+process also dumps its totals to METRICS_DIR/<pid>.json at most every
+METRICS_FLUSH_INTERVAL seconds, and /api/metrics/ adds up the files of
+all workers (gunicorn workers share nothing else). Totals of workers
+that have exited stay in their files so counters never go backwards;
+clear the directory when restarting the server.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+METRICS_LATENCY_BUCKETS = tuple(getattr(
+    settings, 'METRICS_LATENCY_BUCKETS', (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+))
+METRICS_FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10.0)
+
+# Positions in a series list; the histogram buckets follow
+COUNT, ERRORS, DURATION, SIZE, QUERIES, DB_TIME = range(6)
+BUCKETS = 6
+
+
+def new_series():
+    return [0, 0, 0.0, 0, 0, 0.0] + [0] * len(METRICS_LATENCY_BUCKETS)
+
+
+def add_series(total, series):
+    for index, value in enumerate(series):
+        total[index] += value
+
+
+class MetricsRegistry:
+    """Request aggregates keyed by (view, method), sharded per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._flushed_at = 0.0
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, view, method, status_code, duration, size, queries, db_time):
+        shard = self._shard()
+        series = shard.get((view, method))
+        if series is None:
+            series = shard[(view, method)] = new_series()
+        series[COUNT] += 1
+        if status_code >= 500:
+            series[ERRORS] += 1
+        series[DURATION] += duration
+        series[SIZE] += size
+        series[QUERIES] += queries
+        series[DB_TIME] += db_time
+        for index, bound in enumerate(METRICS_LATENCY_BUCKETS):
+            if duration <= bound:
+                series[BUCKETS + index] += 1
+                break
+
+    def snapshot(self):
+        """{(view, method): series} for this process"""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, series in shard.copy().items():
+                add_series(totals.setdefault(key, new_series()), series)
+        return totals
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+    # ============= SHARING ACROSS WORKERS =============
+    def maybe_flush(self):
+        """Dump this process's totals to METRICS_DIR if the last dump is old enough"""
+        directory = metrics_dir()
+        now = time.monotonic()
+        if not directory or now - self._flushed_at < METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        self.flush(directory)
+
+    def flush(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        rows = [[view, method, series] for (view, method), series in self.snapshot().items()]
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        with os.fdopen(handle, 'w') as temp_file:
+            json.dump({'buckets': METRICS_LATENCY_BUCKETS, 'series': rows}, temp_file)
+        os.replace(temp_path, os.path.join(directory, f'{os.getpid()}.json'))
+
+
+registry = MetricsRegistry()
+
+
+def metrics_dir():
+    directory = getattr(settings, 'METRICS_DIR', None)
+    return str(directory) if directory else None
+
+
+def collect():
+    """Totals of every worker: the METRICS_DIR files plus this process's live numbers"""
+    totals = registry.snapshot()
+    directory = metrics_dir()
+    if not directory or not os.path.isdir(directory):
+        return totals
+    own_file = f'{os.getpid()}.json'
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json') or filename == own_file:
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as dump:
+                data = json.load(dump)
+        except (OSError, ValueError):
+            continue
+        if tuple(data.get('buckets', ())) != METRICS_LATENCY_BUCKETS:
+            # Written with other bucket settings; the histograms would not line up
+            continue
+        for view, method, series in data['series']:
+            add_series(totals.setdefault((view, method), new_series()), series)
+    return totals
+
+
+# ============= PROMETHEUS TEXT FORMAT =============
+def label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(view, method, **extra):
+    pairs = [('view', view), ('method', method)] + list(extra.items())
+    return '{' + ','.join(f'{name}="{label_value(value)}"' for name, value in pairs) + '}'
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+COUNTERS = (
+    ('erp_http_requests_total', 'Requests handled.', COUNT),
+    ('erp_http_request_errors_total', 'Requests answered with a 5xx status.', ERRORS),
+    ('erp_http_response_size_bytes_total', 'Response body bytes sent.', SIZE),
+    ('erp_db_queries_total', 'Database queries run while handling requests.', QUERIES),
+    ('erp_db_query_duration_seconds_total', 'Time spent in database queries while handling requests.', DB_TIME),
+)
+
+
+def render(totals=None):
+    """Prometheus text exposition (format 0.0.4) of `totals` (default: collect())"""
+    totals = collect() if totals is None else totals
+    keys = sorted(totals)
+    lines = []
+    for name, help_text, index in COUNTERS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [f'{name}{labels(*key)} {number(totals[key][index])}' for key in keys]
+
+    name = 'erp_http_request_duration_seconds'
+    lines += [f'# HELP {name} Request latency.', f'# TYPE {name} histogram']
+    for key in keys:
+        series = totals[key]
+        cumulative = 0
+        for index, bound in enumerate(METRICS_LATENCY_BUCKETS):
+            cumulative += series[BUCKETS + index]
+            lines.append(f'{name}_bucket{labels(*key, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{labels(*key, le="+Inf")} {series[COUNT]}')
+        lines.append(f'{name}_sum{labels(*key)} {number(series[DURATION])}')
+        lines.append(f'{name}_count{labels(*key)} {series[COUNT]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:21
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    DailySalesRollup = apps.get_model('erp_api', 'DailySalesRollup')
+    sources = {
+        'erp': apps.get_model('erp_api', 'Order'),
+        'website': apps.get_model('erp_api', 'WebsiteOrder'),
+    }
+    for source, model in sources.items():
+        rows = (
+            model.objects
+            .annotate(day=TruncDate('order_date'))
+            .values('day', 'status')
+            .annotate(
+                order_count=Count('id'),
+                grand_total=Sum('grand_total'),
+                tax_amount=Sum('tax_amount'),
+                discount_amount=Sum('discount_amount'),
+            )
+            .order_by()
+        )
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(
+                date=row['day'],
+                source=source,
+                status=row['status'],
+                order_count=row['order_count'],
+                grand_total=row['grand_total'] or 0,
+                tax_amount=row['tax_amount'] or 0,
+                discount_amount=row['discount_amount'] or 0,
+            )
+            for row in rows
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp_api', '0021_websitestoriessectionsettings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(choices=[('erp', 'ERP Orders'), ('website', 'Website Orders')], default='erp', max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('grand_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'daily_sales_rollup',
+                'ordering': ['date'],
+                'unique_together': {('date', 'source', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
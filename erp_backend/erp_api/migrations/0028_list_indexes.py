@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp_api', '0027_content_versions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['created_at'], name='activity_log_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at'], name='customers_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['customer_type', 'created_at'], name='customers_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['created_at'], name='invoices_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'created_at'], name='invoices_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'due_date'], name='invoices_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['created_at'], name='leads_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['status', 'created_at'], name='leads_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_date'], name='orders_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'order_date'], name='orders_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['payment_status', 'order_date'], name='orders_pay_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['created_at'], name='payments_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteenquiry',
+            index=models.Index(fields=['created_at'], name='enquiries_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteenquiry',
+            index=models.Index(fields=['status', 'created_at'], name='enquiries_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteorder',
+            index=models.Index(fields=['order_date'], name='web_orders_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='websiteorder',
+            index=models.Index(fields=['status', 'order_date'], name='web_orders_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp_api', '0028_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='user_agent',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
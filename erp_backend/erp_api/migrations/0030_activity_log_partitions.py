@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:52
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+MONTHS_AHEAD = 3
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_activity_log(apps, schema_editor):
+    """Range-partition activity_log by month on MySQL (see erp_api.activity_archive)"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    ActivityLog = apps.get_model('erp_api', 'ActivityLog')
+    oldest = ActivityLog.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    current = timezone.now().date().replace(day=1)
+    month = (oldest.date() if oldest else current).replace(day=1)
+    last = current
+    for _ in range(MONTHS_AHEAD):
+        last = next_month(last)
+
+    partitions = []
+    while month <= last:
+        partitions.append(
+            f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{next_month(month):%Y-%m-%d}'))"
+        )
+        month = next_month(month)
+    partitions.append('PARTITION p_future VALUES LESS THAN MAXVALUE')
+
+    # The partitioning column must be part of every unique key
+    schema_editor.execute('ALTER TABLE activity_log DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)')
+    schema_editor.execute(
+        'ALTER TABLE activity_log PARTITION BY RANGE (TO_DAYS(created_at)) (' + ', '.join(partitions) + ')'
+    )
+
+
+def unpartition_activity_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('ALTER TABLE activity_log REMOVE PARTITIONING')
+    schema_editor.execute('ALTER TABLE activity_log DROP PRIMARY KEY, ADD PRIMARY KEY (id)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp_api', '0029_activity_log_user_agent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(partition_activity_log, unpartition_activity_log),
+    ]
@@ -0,0 +1,101 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+TOKEN_MAX_LENGTH = 64
+WORD_RE = re.compile(r'[^\W_]+')
+STRIP_CHARS = '.,;:!?()[]{}<>"\''
+
+# The search index as defined when this migration was written:
+# {entity: (model, [(values() path, weight), ...])}
+ENTITIES = {
+    'customers': ('Customer', [
+        ('customer_code', 3), ('user__first_name', 2), ('user__last_name', 2),
+        ('user__email', 2), ('user__username', 2),
+    ]),
+    'products': ('Product', [
+        ('name', 3), ('sku', 3), ('description', 1),
+    ]),
+    'orders': ('Order', [
+        ('order_number', 3), ('customer__user__first_name', 1), ('customer__user__last_name', 1),
+        ('customer__user__email', 1), ('customer__user__username', 1),
+    ]),
+    'leads': ('Lead', [
+        ('lead_number', 3), ('contact_person', 2), ('company_name', 2), ('email', 2), ('phone', 1),
+    ]),
+    'companies': ('Company', [
+        ('name', 3), ('email', 2), ('phone', 1), ('address', 1),
+    ]),
+}
+
+
+def tokenize(text):
+    text = str(text or '').lower()
+    tokens = set(WORD_RE.findall(text))
+    for chunk in text.split():
+        chunk = chunk.strip(STRIP_CHARS)
+        if len(chunk) > 1 and not chunk.isalnum():
+            tokens.add(chunk)
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens if token}
+
+
+def build_document(fields, values):
+    parts = []
+    weights = {}
+    for path, weight in fields:
+        value = values.get(path)
+        if value in (None, ''):
+            continue
+        parts.extend([str(value)] * weight)
+        for token in tokenize(value):
+            weights[token] = max(weight, weights.get(token, 0))
+    return ' '.join(parts), weights
+
+
+def backfill_search_index(apps, schema_editor):
+    # 0025 created the index tables empty; signals only index rows saved
+    # since, so fill in every entity that has no documents yet
+    SearchDocument = apps.get_model('erp_api', 'SearchDocument')
+    SearchToken = apps.get_model('erp_api', 'SearchToken')
+
+    def write(name, fields, rows):
+        built = {row['pk']: build_document(fields, row) for row in rows}
+        SearchDocument.objects.bulk_create([
+            SearchDocument(entity=name, object_id=object_id, content=content)
+            for object_id, (content, _) in built.items()
+        ])
+        # MySQL does not return ids from bulk_create
+        document_ids = dict(
+            SearchDocument.objects.filter(entity=name, object_id__in=built).values_list('object_id', 'id')
+        )
+        SearchToken.objects.bulk_create([
+            SearchToken(document_id=document_ids[object_id], entity=name, token=token, weight=weight)
+            for object_id, (_, weights) in built.items()
+            for token, weight in weights.items()
+        ], batch_size=BATCH_SIZE)
+
+    for name, (model_name, fields) in ENTITIES.items():
+        if SearchDocument.objects.filter(entity=name).exists():
+            continue
+        model = apps.get_model('erp_api', model_name)
+        paths = [path for path, _ in fields]
+        batch = []
+        for row in model.objects.values('pk', *paths).iterator(chunk_size=BATCH_SIZE):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                write(name, fields, batch)
+                batch = []
+        if batch:
+            write(name, fields, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('erp_api', '0032_number_sequences'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
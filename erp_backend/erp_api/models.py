@@ -4,6 +4,7 @@ from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 
 class UserProfile(models.Model):
     ROLE_CHOICES = [
@@ -97,6 +98,10 @@ class Customer(models.Model):
     
     class Meta:
         db_table = 'customers'
+        indexes = [
+            models.Index(fields=['created_at'], name='customers_created_idx'),
+            models.Index(fields=['customer_type', 'created_at'], name='customers_type_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} ({self.customer_code})"
@@ -120,6 +125,7 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=15, decimal_places=2)
     cost = models.DecimalField(max_digits=15, decimal_places=2, null=True)
     stock_quantity = models.IntegerField(default=0)
+    reserved_quantity = models.PositiveIntegerField(default=0)
     min_stock_level = models.IntegerField(default=10)
     image = models.ImageField(upload_to='products/%Y/%m/%d/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
@@ -128,9 +134,21 @@ class Product(models.Model):
     
     class Meta:
         db_table = 'products'
+        # Back the public catalog filters and sorts
+        indexes = [
+            models.Index(fields=['is_active', 'created_at'], name='products_active_created_idx'),
+            models.Index(fields=['is_active', 'price'], name='products_active_price_idx'),
+            models.Index(fields=['is_active', 'name'], name='products_active_name_idx'),
+            models.Index(fields=['is_active', 'category', 'price'], name='products_active_cat_price_idx'),
+        ]
     
     def __str__(self):
         return self.name
+    
+    @property
+    def available_quantity(self):
+        """Stock on hand that is not held by a checkout reservation"""
+        return self.stock_quantity - self.reserved_quantity
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -163,6 +181,12 @@ class Order(models.Model):
     
     class Meta:
         db_table = 'orders'
+        # List filters and the rollup refresh, newest first
+        indexes = [
+            models.Index(fields=['order_date'], name='orders_date_idx'),
+            models.Index(fields=['status', 'order_date'], name='orders_status_date_idx'),
+            models.Index(fields=['payment_status', 'order_date'], name='orders_pay_status_date_idx'),
+        ]
     
     def __str__(self):
         return self.order_number
@@ -205,6 +229,11 @@ class Invoice(models.Model):
     
     class Meta:
         db_table = 'invoices'
+        indexes = [
+            models.Index(fields=['created_at'], name='invoices_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='invoices_status_created_idx'),
+            models.Index(fields=['status', 'due_date'], name='invoices_status_due_idx'),
+        ]
     
     def __str__(self):
         return self.invoice_number
@@ -231,6 +260,9 @@ class Payment(models.Model):
     
     class Meta:
         db_table = 'payments'
+        indexes = [
+            models.Index(fields=['created_at'], name='payments_created_idx'),
+        ]
     
     def __str__(self):
         return self.payment_number
@@ -294,6 +326,10 @@ class Lead(models.Model):
     
     class Meta:
         db_table = 'leads'
+        indexes = [
+            models.Index(fields=['created_at'], name='leads_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='leads_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.lead_number} - {self.company_name}"
@@ -375,17 +411,22 @@ class Permission(models.Model):
         return f"{self.role} - {self.module}"
 
 class ActivityLog(models.Model):
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    # No database constraint: MySQL partitioned tables cannot have foreign keys
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, db_constraint=False)
     action = models.CharField(max_length=100)
     table_name = models.CharField(max_length=100, null=True, blank=True)
     record_id = models.IntegerField(null=True, blank=True)
     old_values = models.JSONField(null=True, blank=True)
     new_values = models.JSONField(null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'activity_log'
+        indexes = [
+            models.Index(fields=['created_at'], name='activity_log_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user} - {self.action}"
@@ -599,6 +640,10 @@ class WebsiteEnquiry(models.Model):
     class Meta:
         db_table = 'website_enquiries'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='enquiries_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='enquiries_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.enquiry_number} - {self.company_name}"
@@ -654,6 +699,10 @@ class WebsiteOrder(models.Model):
     class Meta:
         db_table = 'website_orders'
         ordering = ['-order_date']
+        indexes = [
+            models.Index(fields=['order_date'], name='web_orders_date_idx'),
+            models.Index(fields=['status', 'order_date'], name='web_orders_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.order_number} - {self.customer.user.username}"
@@ -1198,4 +1247,209 @@ class WebsiteStoriesSectionSettings(models.Model):
         db_table = 'website_stories_section'
     
     def __str__(self):
-        return f"Stories Section - {self.heading or 'Default'}"
\ No newline at end of file
+        return f"Stories Section - {self.heading or 'Default'}"
+
+# ============= REPORTING ROLLUPS =============
+class DailySalesRollup(models.Model):
+    """Per-day order totals by status, kept current by order signals"""
+    SOURCE_CHOICES = [
+        ('erp', 'ERP Orders'),
+        ('website', 'Website Orders'),
+    ]
+    
+    date = models.DateField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='erp')
+    status = models.CharField(max_length=20)
+    order_count = models.PositiveIntegerField(default=0)
+    grand_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    tax_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_sales_rollup'
+        unique_together = ['date', 'source', 'status']
+        ordering = ['date']
+    
+    def __str__(self):
+        return f"{self.date} {self.source}/{self.status}: {self.order_count}"
+
+
+# ============= BACKGROUND JOBS =============
+class Job(models.Model):
+    """Long-running export, import or report build processed by the job worker"""
+    TYPE_CHOICES = [
+        ('export', 'Export'),
+        ('import_leads', 'Lead Import'),
+        ('report', 'Report'),
+        ('image_variants', 'Image Variants'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    job_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    progress = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    result_file = models.FileField(upload_to='jobs/%Y/%m/%d/', blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='jobs_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.id} ({self.job_type}) - {self.status}"
+
+
+# ============= INVENTORY =============
+class StockReservation(models.Model):
+    """Stock held for an order until it is paid for or the hold expires"""
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('committed', 'Committed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='held')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_reservations')
+    website_order = models.ForeignKey(WebsiteOrder, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_reservations')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='stock_res_status_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product} x{self.quantity} ({self.status})"
+
+
+class StockMovement(models.Model):
+    """Append-only log of every change to a product's stock or holds"""
+    MOVEMENT_CHOICES = [
+        ('reserve', 'Reserved'),
+        ('release', 'Released'),
+        ('expire', 'Expired'),
+        ('sale', 'Sale'),
+        ('adjustment', 'Adjustment'),
+    ]
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_CHOICES)
+    quantity = models.IntegerField(help_text='Signed change in units')
+    reservation = models.ForeignKey(StockReservation, on_delete=models.SET_NULL, null=True, blank=True)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True)
+    website_order = models.ForeignKey(WebsiteOrder, on_delete=models.SET_NULL, null=True, blank=True)
+    notes = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'stock_movements'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='stock_mov_product_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product} {self.movement_type} {self.quantity:+d}"
+
+
+# ============= SEARCH INDEX =============
+class SearchDocument(models.Model):
+    """Denormalized searchable text for one record, maintained by signals"""
+    entity = models.CharField(max_length=30)
+    object_id = models.PositiveBigIntegerField()
+    content = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'search_documents'
+        unique_together = ['entity', 'object_id']
+    
+    def __str__(self):
+        return f"{self.entity}:{self.object_id}"
+
+
+class SearchToken(models.Model):
+    """Normalized token of a SearchDocument, matched by prefix"""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='tokens')
+    entity = models.CharField(max_length=30)
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'search_tokens'
+        indexes = [
+            models.Index(fields=['entity', 'token'], name='search_tokens_entity_tok_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.entity}:{self.token}"
+
+
+# ============= CONTENT VERSIONS =============
+class ContentVersion(models.Model):
+    """Change counter for one public content model, used for conditional GETs"""
+    key = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'content_versions'
+    
+    def __str__(self):
+        return f"{self.key}@{self.version}"
+
+
+# ============= NUMBER SEQUENCES =============
+class NumberSequence(models.Model):
+    """Next value of one document number series (see numbering.py)"""
+    name = models.CharField(max_length=100, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'number_sequences'
+    
+    def __str__(self):
+        return f"{self.name}@{self.next_value}"
+
+
+class ImageAsset(models.Model):
+    """Responsive variants rendered for one stored image (see images.py)"""
+    name = models.CharField(max_length=255, unique=True)  # storage name of the original
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    lqip = models.TextField(blank=True)  # data: URI placeholder
+    variants = models.JSONField(default=list)  # [{'width', 'format', 'name'}, ...]
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'image_assets'
+    
+    def __str__(self):
+        return self.name
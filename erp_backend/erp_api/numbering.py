@@ -0,0 +1,219 @@
+"""
+Document numbers for orders, invoices, payments, leads, enquiries and
+generated customer usernames.
+
+Each series keeps its next value in one NumberSequence row. Allocating
+locks that row with SELECT ... FOR UPDATE and advances it, so
+concurrent creates never get the same number and nothing counts the
+whole table on every create.
+
+Outside a transaction the row is advanced by a block of numbers and
+the process hands the rest of the block out from memory, touching the
+row once per block. Numbers cached by a process that exits are never
+used, so such series have gaps. Inside a transaction only the numbers
+needed are taken: the row stays locked until the transaction ends and
+a rollback hands them back, which keeps series gap-free when the number
+is allocated in the transaction that saves the document (as invoices
+are, with a block of 1 so they never come from the cache).
+
+A series' row is created on first use, starting after the highest
+number its documents already use in the series' format. Numbers that
+are already taken (entered by hand, or by another series sharing the
+format) are skipped, so a stale counter costs a lookup, never a
+duplicate.
+
+NUMBER_SEQUENCES in settings overrides the format and block of a series
+or adds new ones, e.g.
+    {'order': {'format': 'SO-{date:%Y}-{number:06d}', 'block': 50}}
+Formats receive `number` and `date` (today, local time).
+"""
+import re
+import threading
+from datetime import date as date_type
+from string import Formatter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+
+from .models import NumberSequence
+
+# model/field: where the numbers end up; used to seed the series and
+# to skip numbers already taken
+SERIES = {
+    'order': {'format': 'ORD{number:05d}', 'block': 20, 'model': 'erp_api.Order', 'field': 'order_number'},
+    'invoice': {'format': 'INV{number:05d}', 'block': 1, 'model': 'erp_api.Invoice', 'field': 'invoice_number'},
+    'payment': {'format': 'PAY{number:05d}', 'block': 20, 'model': 'erp_api.Payment', 'field': 'payment_number'},
+    'lead': {'format': 'LEAD{number:04d}', 'block': 20, 'model': 'erp_api.Lead', 'field': 'lead_number'},
+    'website_lead': {'format': 'WEB-{number:06d}', 'block': 20, 'model': 'erp_api.Lead', 'field': 'lead_number'},
+    'enquiry_lead': {
+        'format': 'LEAD{date:%Y%m%d}{number:04d}', 'block': 20, 'model': 'erp_api.Lead', 'field': 'lead_number',
+    },
+    'enquiry': {
+        'format': 'ENQ{date:%Y%m%d}{number:04d}', 'block': 20, 'model': 'erp_api.WebsiteEnquiry',
+        'field': 'enquiry_number',
+    },
+    'customer': {'format': 'cust{number:04d}', 'block': 20, 'model': 'auth.User', 'field': 'username'},
+}
+
+# (alias, series) -> [[next, stop], ...] numbers this process may hand out
+_blocks = {}
+_lock = threading.Lock()
+
+
+def series_config(name):
+    config = dict(SERIES.get(name, {}))
+    config.update(getattr(settings, 'NUMBER_SEQUENCES', {}).get(name, {}))
+    if 'format' not in config:
+        raise ValueError(f"Unknown number series '{name}'")
+    if bool(config.get('model')) != bool(config.get('field')):
+        raise ValueError(f"Number series '{name}' needs both 'model' and 'field', or neither")
+    config.setdefault('block', 1)
+    return config
+
+
+def format_pattern(fmt):
+    """
+    Return (regex with a `number` group, leading literal, fixed length)
+    for a series format. Dates must use fixed-width directives.
+    """
+    parts, prefix, fixed = [], None, 0
+    for literal, field, spec, _ in Formatter().parse(fmt):
+        parts.append(re.escape(literal))
+        fixed += len(literal)
+        if prefix is None:
+            prefix = literal
+        if field == 'number':
+            parts.append(r'(?P<number>\d+)')
+        elif field == 'date':
+            width = len(format(date_type(2000, 1, 1), spec))
+            parts.append(f'.{{{width}}}')
+            fixed += width
+        elif field is not None:
+            raise ValueError(f"Unsupported field '{field}' in number format '{fmt}'")
+    return re.compile(''.join(parts)), prefix or '', fixed
+
+
+def next_number(name):
+    """Return the next formatted number of series `name`"""
+    return allocate(name)[0]
+
+
+def allocate(name, count=1):
+    """Return `count` unused formatted numbers of series `name`, in order"""
+    config = series_config(name)
+    alias = router.db_for_write(NumberSequence)
+    numbers = []
+    while len(numbers) < count:
+        numbers.extend(_unused(alias, config, _allocate(alias, name, count - len(numbers), config)))
+    return numbers
+
+
+def _allocate(alias, name, count, config):
+    """Return `count` formatted numbers of the series, taken or not"""
+    numbers = _from_cache(alias, name, count)
+
+    missing = count - len(numbers)
+    if missing:
+        block = missing
+        if not connections[alias].in_atomic_block:
+            # A block cached inside a transaction could be handed out
+            # again after a rollback
+            block = max(missing, int(config['block']))
+        first = _take(alias, name, block, config)
+        numbers.extend(range(first, first + missing))
+        if block > missing:
+            _to_cache(alias, name, [first + missing, first + block])
+
+    date = timezone.localdate()
+    return [config['format'].format(number=number, date=date) for number in numbers]
+
+
+def _take(alias, name, count, config):
+    """Advance the series row by `count` and return its old value"""
+    manager = NumberSequence.objects.using(alias)
+    with transaction.atomic(using=alias):
+        sequence = manager.select_for_update().filter(name=name).first()
+        if sequence is None:
+            sequence = _create(alias, name, config)
+        first = sequence.next_value
+        sequence.next_value = first + count
+        sequence.save(using=alias, update_fields=['next_value', 'updated_at'])
+    return first
+
+
+def _unused(alias, config, numbers):
+    if not config.get('model'):
+        return numbers
+    field = config['field']
+    taken = set(
+        apps.get_model(config['model']).objects.using(alias)
+        .filter(**{f'{field}__in': numbers}).values_list(field, flat=True)
+    )
+    return [number for number in numbers if number not in taken]
+
+
+def _seed(alias, name, config):
+    """First value after the highest number the series' documents use"""
+    if not config.get('model'):
+        return 1
+    pattern, prefix, fixed = format_pattern(config['format'])
+    # A number fitting several series' formats (LEAD0001 and
+    # LEAD202601010001 both fit LEAD{number}) counts for the most specific
+    rivals = []
+    for other_name in SERIES:
+        other = series_config(other_name)
+        if other_name == name or (other.get('model'), other.get('field')) != (config['model'], config['field']):
+            continue
+        rival, _, rival_fixed = format_pattern(other['format'])
+        if rival_fixed > fixed:
+            rivals.append(rival)
+
+    field = config['field']
+    values = (
+        apps.get_model(config['model']).objects.using(alias)
+        .filter(**{f'{field}__startswith': prefix}).values_list(field, flat=True)
+    )
+    highest = 0
+    for value in values.iterator():
+        match = pattern.fullmatch(value)
+        if match and not any(rival.fullmatch(value) for rival in rivals):
+            highest = max(highest, int(match.group('number')))
+    return highest + 1
+
+
+def _create(alias, name, config):
+    start = _seed(alias, name, config)
+    try:
+        with transaction.atomic(using=alias):
+            NumberSequence.objects.using(alias).create(name=name, next_value=start)
+    except IntegrityError:
+        # Another process created the row first
+        pass
+    return NumberSequence.objects.using(alias).select_for_update().get(name=name)
+
+
+def _from_cache(alias, name, count):
+    numbers = []
+    with _lock:
+        blocks = _blocks.get((alias, name), [])
+        while blocks and len(numbers) < count:
+            block = blocks[0]
+            taken = min(count - len(numbers), block[1] - block[0])
+            numbers.extend(range(block[0], block[0] + taken))
+            block[0] += taken
+            if block[0] == block[1]:
+                blocks.pop(0)
+    return numbers
+
+
+def _to_cache(alias, name, block):
+    with _lock:
+        _blocks.setdefault((alias, name), []).append(block)
+
+
+def reset_cache():
+    """Forget the numbers cached by this process"""
+    with _lock:
+        _blocks.clear()
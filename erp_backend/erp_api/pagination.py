@@ -0,0 +1,120 @@
+"""
+Pagination helpers shared by the list API views.
+
+Two modes are supported, both newest first on (key_field, id):
+- page mode (default): ?page=N&page_size=M with an exact count
+- cursor mode: ?cursor=<token>&page_size=M. Send an empty cursor for
+  the first page and pass the returned next_cursor to get the following
+  one. Each page is a range scan on the key, so deep pages cost the
+  same as the first.
+  The count is estimated unless ?count=exact is given.
+"""
+import base64
+import json
+
+from django.db import connection
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(key_value, pk):
+    """Opaque cursor token for a (key, id) position"""
+    payload = json.dumps([key_value.isoformat() if hasattr(key_value, 'isoformat') else key_value, pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, key_field):
+    """Turn a cursor token back into (key value, id); raises ValueError if malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key_value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return key_field.to_python(key_value), int(pk)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def estimate_count(queryset):
+    """
+    Cheap row count for an unfiltered queryset, read from table statistics.
+    Returns None when no estimate is available.
+    """
+    if queryset.query.where or connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None else None
+
+
+def get_page_size(request):
+    page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def paginate_queryset(request, queryset, key_field='created_at'):
+    """
+    Paginate a queryset according to the request params.
+    Returns (page_items, pagination) where pagination is merged into
+    the response body.
+    """
+    if 'cursor' in request.GET:
+        return cursor_paginate(request, queryset, key_field)
+
+    page = int(request.GET.get('page', 1))
+    page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+
+    total_count = queryset.count()
+    # Same order as cursor mode, so pages are stable and read off the key index
+    queryset = queryset.order_by(f'-{key_field}', '-id')
+    start = (page - 1) * page_size
+    end = start + page_size
+
+    return queryset[start:end], {
+        'count': total_count,
+        'page': page,
+        'page_size': page_size,
+        'total_pages': (total_count + page_size - 1) // page_size
+    }
+
+
+def cursor_paginate(request, queryset, key_field='created_at'):
+    """Keyset pagination over (key_field, id), newest first"""
+    page_size = get_page_size(request)
+    token = request.GET.get('cursor', '').strip()
+
+    if request.GET.get('count') == 'exact':
+        count, estimated = queryset.count(), False
+    else:
+        count, estimated = estimate_count(queryset), True
+
+    queryset = queryset.order_by(f'-{key_field}', '-id')
+    if token:
+        field = queryset.model._meta.get_field(key_field)
+        key_value, pk = decode_cursor(token, field)
+        queryset = queryset.filter(
+            Q(**{f'{key_field}__lt': key_value}) |
+            Q(**{key_field: key_value, 'id__lt': pk})
+        )
+
+    items = list(queryset[:page_size + 1])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, key_field), last.pk)
+
+    return items, {
+        'count': count,
+        'count_estimated': estimated,
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
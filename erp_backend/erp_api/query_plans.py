@@ -0,0 +1,99 @@
+"""
+EXPLAIN-based checks on the queries an endpoint runs.
+
+capture_plans() runs a callable, collects every SELECT it sent to the
+database and returns a QueryPlan per statement:
+
+- full_scans: tables read end to end with no index to narrow or order
+  the rows (SQLite "SCAN <table>" without USING INDEX, MySQL access
+  type ALL, PostgreSQL "Seq Scan")
+- sorts: the rows are sorted after reading instead of read in index
+  order (SQLite USE TEMP B-TREE FOR ORDER BY, MySQL Using filesort,
+  PostgreSQL Sort nodes)
+
+The regression tests in tests.py seed data and assert that the list and
+report endpoints stay on their indexes. analyze_tables() refreshes the
+optimizer statistics first so plans are costed on the seeded row counts
+rather than empty tables.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+POSTGRES_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+POSTGRES_SORT_RE = re.compile(r'(?:^|->)\s*Sort\b')
+
+
+class QueryPlan:
+    """One captured statement with its EXPLAIN output"""
+
+    def __init__(self, sql, plan, full_scans, sorts):
+        self.sql = sql
+        self.plan = plan
+        self.full_scans = full_scans
+        self.sorts = sorts
+
+    def __str__(self):
+        return f"{self.sql}\n  " + '\n  '.join(self.plan)
+
+
+def explain(sql):
+    """Return (plan lines, fully scanned tables, sorts) for one SELECT"""
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+            scans = [match.group(1) for match in map(SQLITE_SCAN_RE.match, details) if match]
+            return details, scans, 'USE TEMP B-TREE FOR ORDER BY' in details
+        if vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}')
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            details = [
+                f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} {row['Extra'] or ''}".strip()
+                for row in rows
+            ]
+            scans = [row['table'] for row in rows if row['type'] == 'ALL']
+            return details, scans, any('Using filesort' in (row['Extra'] or '') for row in rows)
+        if vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}')
+            details = [row[0] for row in cursor.fetchall()]
+            scans = [match.group(1) for line in details for match in POSTGRES_SCAN_RE.finditer(line)]
+            return details, scans, any(POSTGRES_SORT_RE.search(line) for line in details)
+    raise NotImplementedError(f'EXPLAIN is not supported on {vendor}')
+
+
+def capture_plans(func, *args, **kwargs):
+    """Run func and EXPLAIN every SELECT it executed"""
+    with CaptureQueriesContext(connection) as captured:
+        func(*args, **kwargs)
+    return [
+        QueryPlan(query['sql'], *explain(query['sql']))
+        for query in captured.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def regressions(plans, allowed_scans=(), allow_sorts=False):
+    """Plans that fully scan a table outside `allowed_scans` or sort their rows"""
+    return [
+        plan for plan in plans
+        if (plan.sorts and not allow_sorts) or set(plan.full_scans) - set(allowed_scans)
+    ]
+
+
+def analyze_tables(models):
+    """Refresh optimizer statistics for the tables of `models`"""
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE ' + ', '.join(connection.ops.quote_name(table) for table in tables))
+            cursor.fetchall()
+        elif connection.vendor == 'postgresql':
+            for table in tables:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
@@ -0,0 +1,160 @@
+"""
+Read replica routing.
+
+Views marked with replica_reads (list, report, export, search and
+public catalog views) declare a read intent: while they run, reads go
+to the REPLICA_DATABASE alias. Everything else reads from and writes
+to the primary.
+
+Reads stay on the primary when:
+- the request has already written (ReplicaRouter.db_for_write marks
+  it), so a view reads its own writes;
+- the primary is inside a transaction, so reads see its uncommitted
+  rows;
+- the client wrote in the last REPLICA_STICKY_SECONDS. ReplicaMiddleware
+  pins it with a cookie and, for signed-in users, a cache entry, so a
+  list opened right after a save does not miss the new row while the
+  replica catches up.
+
+Results that outlive the request, such as the cached list stats, are
+computed under primary_reads() so replica lag is never cached.
+
+The intent lives in a ContextVar set per request by ReplicaMiddleware;
+threads and management commands without one use the primary. With no
+REPLICA_DATABASE configured the decorator and router do nothing.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_pin'
+
+
+class ReadState:
+    """Read intent and write marker of one request"""
+
+    def __init__(self):
+        self.replica = None  # alias reads go to while set
+        self.wrote = False
+
+
+_state = ContextVar('erp_db_read_state', default=None)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias in settings.DATABASES else None
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+def pin_key(user_id):
+    return f"db_pin:{user_id}"
+
+
+def is_pinned(request):
+    """Whether the client behind `request` wrote within the sticky window"""
+    if request is None:
+        return False
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and cache.get(pin_key(user.pk)))
+
+
+def pin(request, response):
+    """Keep the client on the primary for the sticky window"""
+    seconds = sticky_seconds()
+    if seconds <= 0:
+        return
+    response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(pin_key(user.pk), True, seconds)
+
+
+@contextmanager
+def request_scope():
+    """Fresh read state for one request; yields it"""
+    state = ReadState()
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def read_intent(request=None):
+    """Send the reads of the block to the replica unless the client is pinned"""
+    alias = replica_alias()
+    state = _state.get()
+    token = None
+    if state is None:
+        state = ReadState()
+        token = _state.set(state)
+    previous = state.replica
+    if alias is not None and not is_pinned(request):
+        state.replica = alias
+    try:
+        yield state
+    finally:
+        state.replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary for the block, even under a read intent"""
+    state = _state.get()
+    previous = state.replica if state is not None else None
+    if state is not None:
+        state.replica = None
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.replica = previous
+
+
+def replica_reads(view):
+    """
+    Run a read-only view against the replica. Works on function views
+    and, through method_decorator, on class-based view methods.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if replica_alias() is None:
+            return view(request, *args, **kwargs)
+        with read_intent(request):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Routes reads under a read intent to the replica (see module docstring)"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.replica is None or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
@@ -0,0 +1,222 @@
+"""
+Role and permission resolution for access checks.
+
+get_access(request) returns the Access of the request's user: the
+UserProfile role plus, when first asked for, the role's Permission
+matrix. It is resolved at most once per request, from the first of:
+
+1. the Access memoized on the request
+2. the role claim of the request's JWT, while the claim's profile
+   version is current (see tokens_for_user) and, unless the roles cache
+   is shared by every worker, for ROLE_CACHE_TIMEOUT seconds after the
+   claim was issued
+3. a process-level cache keyed by (user id, profile version)
+4. the database
+
+Profile and matrix versions live in the roles cache and are bumped by
+signals when a UserProfile or Permission row changes (see signals.py),
+so a change is picked up on the next request. A per-process roles
+cache (LocMemCache) only sees the bumps of its own worker, so role
+claims and process-level entries are both limited to ROLE_CACHE_TIMEOUT
+seconds, which bounds staleness when workers do not share a cache. Set
+ROLE_CACHE_SHARED to override the detection from the cache backend.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+
+from .models import Permission, UserProfile
+
+ROLE_CACHE_TIMEOUT = getattr(settings, 'ROLE_CACHE_TIMEOUT', 60)
+ROLE_CACHE_MAX_ENTRIES = 10000
+MATRIX_VERSION_KEY = 'roles:matrix:version'
+
+ROLE_CLAIM = 'role'
+ROLE_VERSION_CLAIM = 'role_version'
+ROLE_ISSUED_CLAIM = 'role_iat'
+
+PERMISSION_ACTIONS = ('view', 'create', 'edit', 'delete')
+
+MISSING = object()
+
+_entries = {}
+_entries_lock = threading.Lock()
+
+
+def get_roles_cache():
+    return caches[getattr(settings, 'ROLE_CACHE_ALIAS', 'default')]
+
+
+def roles_cache_shared():
+    """Whether version bumps made by one worker are seen by every other"""
+    shared = getattr(settings, 'ROLE_CACHE_SHARED', None)
+    if shared is None:
+        shared = not isinstance(get_roles_cache(), (LocMemCache, DummyCache))
+    return shared
+
+
+def profile_version_key(user_id):
+    return f"roles:profile:{user_id}:version"
+
+
+# ============= VERSIONS =============
+def current_versions(user_id):
+    """Return the (profile version, matrix version) of a user in one cache round trip"""
+    cache = get_roles_cache()
+    keys = [profile_version_key(user_id), MATRIX_VERSION_KEY]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Start from the clock so a lost key never matches an older entry
+        start = int(time.time() * 1000)
+        for key in missing:
+            cache.add(key, start, None)
+        found.update(cache.get_many(missing))
+        for key in missing:
+            found.setdefault(key, start)
+    return found[keys[0]], found[keys[1]]
+
+
+def bump_version(key):
+    cache = get_roles_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def bump_profile_version(user_id):
+    bump_version(profile_version_key(user_id))
+
+
+def bump_matrix_version():
+    bump_version(MATRIX_VERSION_KEY)
+
+
+# ============= PROCESS CACHE =============
+def local_get(key):
+    entry = _entries.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return MISSING
+    return entry[1]
+
+
+def local_set(key, value):
+    with _entries_lock:
+        if len(_entries) >= ROLE_CACHE_MAX_ENTRIES:
+            _entries.clear()
+        _entries[key] = (time.monotonic() + ROLE_CACHE_TIMEOUT, value)
+
+
+def clear_local_cache():
+    with _entries_lock:
+        _entries.clear()
+
+
+# ============= RESOLUTION =============
+def role_permissions(role, matrix_version):
+    """{module: {action: bool}} for a role, cached per matrix version"""
+    key = ('matrix', role, matrix_version)
+    permissions = local_get(key)
+    if permissions is MISSING:
+        permissions = {
+            row['module']: {action: row[f'can_{action}'] for action in PERMISSION_ACTIONS}
+            for row in Permission.objects.filter(role=role).values(
+                'module', *(f'can_{action}' for action in PERMISSION_ACTIONS)
+            )
+        }
+        local_set(key, permissions)
+    return permissions
+
+
+class Access:
+    """A user's role and the Permission matrix of that role"""
+
+    def __init__(self, user, role=None, profile_version=None, matrix_version=None):
+        self.user = user
+        self.role = role
+        self.profile_version = profile_version
+        self.matrix_version = matrix_version
+        self._permissions = None
+
+    @property
+    def permissions(self):
+        if self._permissions is None:
+            self._permissions = role_permissions(self.role, self.matrix_version) if self.role else {}
+        return self._permissions
+
+    @property
+    def is_staff(self):
+        return bool(self.user.is_authenticated and (self.user.is_staff or self.user.is_superuser))
+
+    def has_role(self, *roles):
+        return self.role is not None and self.role in roles
+
+    def can(self, module, action='view'):
+        """Whether the role may perform `action` on `module`; admins may do anything"""
+        if self.role == 'admin':
+            return True
+        return self.permissions.get(module, {}).get(action, False)
+
+    def require_profile(self):
+        """Return self, or raise UserProfile.DoesNotExist for users without a profile"""
+        if self.role is None:
+            raise UserProfile.DoesNotExist('User profile not found')
+        return self
+
+
+def claim_is_current(token, profile_version):
+    """Whether the role claim of `token` may stand in for the profile"""
+    if ROLE_CLAIM not in token or token.get(ROLE_VERSION_CLAIM) != profile_version:
+        return False
+    if roles_cache_shared():
+        return True
+    # Another worker may have bumped the version in its own cache
+    issued = token.get(ROLE_ISSUED_CLAIM)
+    return issued is not None and time.time() - issued <= ROLE_CACHE_TIMEOUT
+
+
+def resolve_access(user, token=None):
+    """Resolve the Access of a user, trusting `token`'s role claim while it is current"""
+    if user is None or not user.is_authenticated:
+        return Access(user)
+
+    profile_version, matrix_version = current_versions(user.pk)
+    role = MISSING
+    if token is not None and claim_is_current(token, profile_version):
+        role = token[ROLE_CLAIM]
+    if role is MISSING:
+        key = ('role', user.pk, profile_version)
+        role = local_get(key)
+        if role is MISSING:
+            role = UserProfile.objects.filter(user_id=user.pk).values_list('role', flat=True).first()
+            local_set(key, role)
+    return Access(user, role, profile_version, matrix_version)
+
+
+def get_access(request):
+    """The Access of the request's user, resolved once per request"""
+    # DRF wraps the Django request; memoize on the inner one so both see it
+    target = getattr(request, '_request', request)
+    access = getattr(target, '_access', None)
+    if access is None or access.user is not request.user:
+        token = getattr(request, 'auth', None)
+        access = resolve_access(request.user, token if isinstance(token, Token) else None)
+        target._access = access
+    return access
+
+
+def tokens_for_user(user):
+    """SimpleJWT refresh token for `user`, carrying its role as a claim"""
+    refresh = RefreshToken.for_user(user)
+    if getattr(settings, 'ROLE_JWT_CLAIM', True):
+        access = resolve_access(user)
+        refresh[ROLE_CLAIM] = access.role
+        refresh[ROLE_VERSION_CLAIM] = access.profile_version
+        refresh[ROLE_ISSUED_CLAIM] = int(time.time())
+    return refresh
@@ -0,0 +1,289 @@
+"""
+Search index for customers, products, orders, leads and companies.
+
+Each indexed record has one SearchDocument row holding its searchable
+text (including joined fields such as the customer's name on an order)
+and SearchToken rows holding the normalized words of that text. Model
+signals keep both current (see signals.py); `rebuild_search_index`
+repopulates them.
+
+Two backends rank matches:
+
+- fulltext: MySQL MATCH ... AGAINST in boolean mode on the FULLTEXT
+  index over search_documents.content
+- tokens: prefix matches on search_tokens(entity, token), scored by the
+  field weights of the matched tokens; used on other databases and for
+  terms FULLTEXT cannot handle (short words, emails, codes with dashes)
+
+Every term must match (AND) and matching is by word prefix, so "jo smi"
+finds "John Smith" without a leading-wildcard LIKE.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Company, Customer, Lead, Order, Product, SearchDocument, SearchToken
+
+TOKEN_MAX_LENGTH = 64
+WORD_RE = re.compile(r'[^\W_]+')
+STRIP_CHARS = '.,;:!?()[]{}<>"\''
+
+DEFAULT_RESULT_LIMIT = 5
+MAX_RESULT_LIMIT = 50
+FULLTEXT_MIN_TOKEN = getattr(settings, 'SEARCH_FULLTEXT_MIN_TOKEN', 3)
+INDEX_BATCH_SIZE = 1000
+
+
+class SearchEntity:
+    """
+    One searchable model: the values() paths that make up its text with
+    their ranking weights, and the values() returned in search results.
+    """
+
+    def __init__(self, name, model, fields, result_fields):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.result_fields = result_fields
+
+    def field_paths(self):
+        return [path for path, _ in self.fields]
+
+
+SEARCH_ENTITIES = {
+    entity.name: entity
+    for entity in (
+        SearchEntity('customers', Customer, [
+            ('customer_code', 3), ('user__first_name', 2), ('user__last_name', 2),
+            ('user__email', 2), ('user__username', 2),
+        ], ['id', 'customer_code', 'user__username']),
+        SearchEntity('products', Product, [
+            ('name', 3), ('sku', 3), ('description', 1),
+        ], ['id', 'name', 'sku', 'price']),
+        SearchEntity('orders', Order, [
+            ('order_number', 3), ('customer__user__first_name', 1), ('customer__user__last_name', 1),
+            ('customer__user__email', 1), ('customer__user__username', 1),
+        ], ['id', 'order_number', 'customer__user__username', 'grand_total']),
+        SearchEntity('leads', Lead, [
+            ('lead_number', 3), ('contact_person', 2), ('company_name', 2), ('email', 2), ('phone', 1),
+        ], ['id', 'lead_number', 'company_name', 'contact_person']),
+        SearchEntity('companies', Company, [
+            ('name', 3), ('email', 2), ('phone', 1), ('address', 1),
+        ], ['id', 'name', 'email', 'phone']),
+    )
+}
+
+MODEL_ENTITIES = {entity.model: entity.name for entity in SEARCH_ENTITIES.values()}
+
+
+# ============= TOKENIZING =============
+def tokenize(text):
+    """
+    Lowercased words of `text`, plus whole chunks such as emails or
+    dashed codes so they can be matched as typed.
+    """
+    text = str(text or '').lower()
+    tokens = set(WORD_RE.findall(text))
+    for chunk in text.split():
+        chunk = chunk.strip(STRIP_CHARS)
+        if len(chunk) > 1 and not chunk.isalnum():
+            tokens.add(chunk)
+    return {token[:TOKEN_MAX_LENGTH] for token in tokens if token}
+
+
+def query_terms(query):
+    """Search terms of a user query, each matched as a token prefix"""
+    terms = []
+    for chunk in str(query or '').lower().split():
+        chunk = chunk.strip(STRIP_CHARS)
+        if chunk and chunk not in terms:
+            terms.append(chunk[:TOKEN_MAX_LENGTH])
+    return terms
+
+
+# ============= INDEXING =============
+def build_document(entity, values):
+    """Return (content, {token: weight}) for one values() row"""
+    parts = []
+    weights = {}
+    for path, weight in entity.fields:
+        value = values.get(path)
+        if value in (None, ''):
+            continue
+        # Repeat heavier fields so FULLTEXT relevance favours them too
+        parts.extend([str(value)] * weight)
+        for token in tokenize(value):
+            weights[token] = max(weight, weights.get(token, 0))
+    return ' '.join(parts), weights
+
+
+def write_documents(entity, rows):
+    """Upsert the documents and tokens for a batch of values() rows"""
+    built = {row['pk']: build_document(entity, row) for row in rows}
+    if not built:
+        return 0
+
+    with transaction.atomic(savepoint=False):
+        existing = {
+            document.object_id: document
+            for document in SearchDocument.objects.filter(entity=entity.name, object_id__in=built)
+        }
+        now = timezone.now()
+        to_update = []
+        for object_id, document in existing.items():
+            document.content = built[object_id][0]
+            document.updated_at = now
+            to_update.append(document)
+        if to_update:
+            SearchDocument.objects.bulk_update(to_update, ['content', 'updated_at'])
+            SearchToken.objects.filter(document__in=to_update).delete()
+
+        created = SearchDocument.objects.bulk_create([
+            SearchDocument(entity=entity.name, object_id=object_id, content=content)
+            for object_id, (content, _) in built.items() if object_id not in existing
+        ])
+        document_ids = {document.object_id: document.id for document in to_update + created}
+        if created and created[0].id is None:
+            # MySQL does not return ids from bulk_create, so read them back
+            document_ids.update(
+                SearchDocument.objects.filter(entity=entity.name, object_id__in=built).values_list('object_id', 'id')
+            )
+
+        SearchToken.objects.bulk_create([
+            SearchToken(document_id=document_ids[object_id], entity=entity.name, token=token, weight=weight)
+            for object_id, (_, weights) in built.items()
+            for token, weight in weights.items()
+        ], batch_size=INDEX_BATCH_SIZE)
+    return len(built)
+
+
+def index_objects(entity_name, pks):
+    """(Re)index the given primary keys of one entity; missing rows are removed"""
+    entity = SEARCH_ENTITIES[entity_name]
+    pks = set(pks)
+    if not pks:
+        return 0
+
+    rows = list(entity.model.objects.filter(pk__in=pks).values('pk', *entity.field_paths()))
+    with transaction.atomic():
+        missing = pks - {row['pk'] for row in rows}
+        if missing:
+            SearchDocument.objects.filter(entity=entity_name, object_id__in=missing).delete()
+        return write_documents(entity, rows)
+
+
+def index_queryset(entity_name, queryset, batch_size=INDEX_BATCH_SIZE):
+    """Index every row of a queryset in batches; returns how many were indexed"""
+    entity = SEARCH_ENTITIES[entity_name]
+    rows = queryset.values('pk', *entity.field_paths()).iterator(chunk_size=batch_size)
+    indexed = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            indexed += write_documents(entity, batch)
+            batch = []
+    if batch:
+        indexed += write_documents(entity, batch)
+    return indexed
+
+
+def remove_object(entity_name, pk):
+    SearchDocument.objects.filter(entity=entity_name, object_id=pk).delete()
+
+
+def rebuild_index(entity_names=None, batch_size=INDEX_BATCH_SIZE):
+    """Drop and rebuild the index for some or all entities"""
+    counts = {}
+    for name in entity_names or SEARCH_ENTITIES:
+        SearchDocument.objects.filter(entity=name).delete()
+        counts[name] = index_queryset(name, SEARCH_ENTITIES[name].model.objects.all(), batch_size)
+    return counts
+
+
+# ============= QUERYING =============
+def use_fulltext(terms):
+    backend = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if backend == 'tokens' or (backend == 'auto' and connection.vendor != 'mysql'):
+        return False
+    # FULLTEXT drops short words and splits on punctuation
+    return all(term.isalnum() and len(term) >= FULLTEXT_MIN_TOKEN for term in terms)
+
+
+def fulltext_documents(entity_name, terms):
+    """Matching documents annotated with their relevance `score`"""
+    boolean_query = ' '.join(f'+{term}*' for term in terms)
+    return (
+        SearchDocument.objects
+        .filter(entity=entity_name)
+        .annotate(score=RawSQL('MATCH (content) AGAINST (%s IN BOOLEAN MODE)', (boolean_query,)))
+        .filter(score__gt=0)
+    )
+
+
+def token_documents(entity_name, terms):
+    """document__object_id/score rows of the documents matching every term"""
+    any_term = Q()
+    term_flags = {}
+    for index, term in enumerate(terms):
+        any_term |= Q(token__startswith=term)
+        term_flags[f'term_{index}'] = Max(Case(
+            When(token__startswith=term, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+    return (
+        SearchToken.objects
+        .filter(any_term, entity=entity_name)
+        .values('document__object_id')
+        .annotate(score=Sum('weight'), **term_flags)
+        .filter(**{flag: 1 for flag in term_flags})
+    )
+
+
+def search_ids(entity_name, query, limit=DEFAULT_RESULT_LIMIT):
+    """Ranked primary keys of `entity_name` records matching `query`"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    if use_fulltext(terms):
+        matches = fulltext_documents(entity_name, terms).order_by('-score', '-object_id').values_list('object_id', 'score')
+    else:
+        matches = token_documents(entity_name, terms).order_by('-score', '-document__object_id').values_list(
+            'document__object_id', 'score'
+        )
+    return [object_id for object_id, _ in matches[:limit]]
+
+
+def filter_queryset(queryset, entity_name, query):
+    """
+    Restrict a list view queryset to records matching `query`. Every
+    match is kept (a subquery, not a ranked id list), so counts and
+    pages stay exact; the list view keeps its own ordering.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset
+    if use_fulltext(terms):
+        matches = fulltext_documents(entity_name, terms).values('object_id')
+    else:
+        matches = token_documents(entity_name, terms).values('document__object_id')
+    return queryset.filter(pk__in=matches)
+
+
+def search(query, entity_names, limit=DEFAULT_RESULT_LIMIT):
+    """
+    Ranked results per entity as {name: [values dict, ...]}, at most
+    `limit` per entity.
+    """
+    results = {}
+    for name in entity_names:
+        entity = SEARCH_ENTITIES[name]
+        ids = search_ids(name, query, limit=limit)
+        rows = {row['id']: row for row in entity.model.objects.filter(pk__in=ids).values(*entity.result_fields)} if ids else {}
+        results[name] = [rows[pk] for pk in ids if pk in rows]
+    return results
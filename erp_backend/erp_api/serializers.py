@@ -1,7 +1,37 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import models
 from .models import *
-from rest_framework_simplejwt.tokens import RefreshToken
+from .roles import tokens_for_user
+from .images import image_set, image_sets
+
+
+class ImageSetListSerializer(serializers.ListSerializer):
+    """Looks up the image sets of every item in one query"""
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        self.context['image_sets'] = image_sets([self.child.image_value(item) for item in items])
+        return super().to_representation(items)
+
+
+class ImageSetMixin(serializers.Serializer):
+    """Adds `image_set`: srcset data for the first non-empty of `image_set_sources`"""
+    image_set = serializers.SerializerMethodField()
+    image_set_sources = ('image',)
+    
+    def image_value(self, obj):
+        for source in self.image_set_sources:
+            value = getattr(obj, source)
+            value = getattr(value, 'name', value)
+            if value:
+                return value
+        return None
+    
+    def get_image_set(self, obj):
+        value = self.image_value(obj)
+        if 'image_sets' in self.context:
+            return self.context['image_sets'].get(value)
+        return image_set(value)
 
 class UserProfileSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
@@ -39,7 +69,7 @@ class RegisterSerializer(serializers.ModelSerializer):
                   'unique_id', 'role', 'phone', 'department', 'token']
     
     def get_token(self, obj):
-        refresh = RefreshToken.for_user(obj)
+        refresh = tokens_for_user(obj)
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -79,7 +109,7 @@ class LoginSerializer(serializers.Serializer):
     user = serializers.SerializerMethodField(read_only=True)
     
     def get_tokens(self, obj):
-        refresh = RefreshToken.for_user(obj['user'])
+        refresh = tokens_for_user(obj['user'])
         return {
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -127,13 +157,14 @@ class ProductCategorySerializer(serializers.ModelSerializer):
         model = ProductCategory
         fields = '__all__'
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(ImageSetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.username', read_only=True)
     
     class Meta:
         model = Product
         fields = '__all__'
+        list_serializer_class = ImageSetListSerializer
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
@@ -270,12 +301,13 @@ class WebsiteEnquirySerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['enquiry_number', 'created_at', 'updated_at', 'converted_at']
 
-class CMSContentSerializer(serializers.ModelSerializer):
+class CMSContentSerializer(ImageSetMixin, serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.get_full_name', read_only=True)
     
     class Meta:
         model = CMSContent
         fields = '__all__'
+        list_serializer_class = ImageSetListSerializer
         read_only_fields = ['created_at', 'updated_at']
 
 class CMSPageSectionSerializer(serializers.ModelSerializer):
@@ -304,10 +336,13 @@ class SiteInfoSerializer(serializers.ModelSerializer):
 
 # Website Content Serializers
 
-class WebsiteStorySerializer(serializers.ModelSerializer):
+class WebsiteStorySerializer(ImageSetMixin, serializers.ModelSerializer):
+    image_set_sources = ('image', 'image_url')
+    
     class Meta:
         model = WebsiteStory
-        fields = ['id', 'title', 'excerpt', 'author', 'image', 'image_url', 'order', 'is_active', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'excerpt', 'author', 'image', 'image_url', 'image_set', 'order', 'is_active', 'created_at', 'updated_at']
+        list_serializer_class = ImageSetListSerializer
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
@@ -318,10 +353,13 @@ class WebsiteTestimonialSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class WebsiteGallerySerializer(serializers.ModelSerializer):
+class WebsiteGallerySerializer(ImageSetMixin, serializers.ModelSerializer):
+    image_set_sources = ('image', 'image_url')
+    
     class Meta:
         model = WebsiteGallery
-        fields = ['id', 'title', 'image', 'image_url', 'category', 'order', 'is_active', 'created_at', 'updated_at']
+        fields = ['id', 'title', 'image', 'image_url', 'image_set', 'category', 'order', 'is_active', 'created_at', 'updated_at']
+        list_serializer_class = ImageSetListSerializer
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
@@ -0,0 +1,167 @@
+"""
+Model signal handlers for erp_api.
+Connected in ErpApiConfig.ready().
+"""
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import images, rollups, search
+from .conditional import bump_content_version
+from .homepage import bump_homepage_version
+from .jobs import enqueue_job
+from .models import (
+    Customer, ImageAsset, Invoice, Lead, Order, Payment, Permission, Product, ProductCategory, SiteInfo,
+    UserProfile, WebsiteEnquiry, WebsiteOrder, WebsiteOrderItem,
+)
+from .roles import bump_matrix_version, bump_profile_version
+from .stats_cache import invalidate_stats
+
+
+# ============= DAILY SALES ROLLUP =============
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=WebsiteOrder)
+def remember_rollup_bucket(sender, instance, raw=False, **kwargs):
+    """Keep the bucket an order is leaving so it can be refreshed after save"""
+    instance._rollup_previous = None
+    if raw or not instance.pk:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values('order_date', 'status').first()
+    if previous:
+        instance._rollup_previous = (rollups.order_day(previous['order_date']), previous['status'])
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=WebsiteOrder)
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    source = rollups.source_for(sender)
+    buckets = {(rollups.order_day(instance.order_date), instance.status)}
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        buckets.add(previous)
+    for date, order_status in buckets:
+        rollups.refresh_bucket(source, date, order_status)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=WebsiteOrder)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    rollups.refresh_bucket(
+        rollups.source_for(sender), rollups.order_day(instance.order_date), instance.status
+    )
+
+
+# ============= LIST STATS CACHE =============
+STATS_MODELS = (Customer, Order, Invoice, Payment, Lead)
+
+
+def drop_cached_stats(sender, **kwargs):
+    invalidate_stats(sender)
+    # Drop again after commit so a read racing this transaction cannot
+    # leave pre-commit figures in the cache
+    transaction.on_commit(lambda: invalidate_stats(sender))
+
+
+for stats_model in STATS_MODELS:
+    post_save.connect(drop_cached_stats, sender=stats_model, dispatch_uid=f'stats-save-{stats_model.__name__}')
+    post_delete.connect(drop_cached_stats, sender=stats_model, dispatch_uid=f'stats-delete-{stats_model.__name__}')
+
+
+# ============= HOMEPAGE CONTEXT CACHE =============
+HOMEPAGE_MODELS = [
+    model for model in apps.get_app_config('erp_api').get_models()
+    if model.__name__.startswith('Homepage')
+] + [Product]
+
+
+def drop_cached_homepage(sender, **kwargs):
+    bump_homepage_version()
+    transaction.on_commit(bump_homepage_version)
+
+
+for homepage_model in HOMEPAGE_MODELS:
+    post_save.connect(drop_cached_homepage, sender=homepage_model, dispatch_uid=f'homepage-save-{homepage_model.__name__}')
+    post_delete.connect(drop_cached_homepage, sender=homepage_model, dispatch_uid=f'homepage-delete-{homepage_model.__name__}')
+
+
+# ============= CONTENT VERSIONS =============
+CONTENT_MODELS = [
+    model for model in apps.get_app_config('erp_api').get_models()
+    if model.__name__.startswith(('Homepage', 'Website', 'CMS'))
+    and model not in (WebsiteOrder, WebsiteOrderItem, WebsiteEnquiry)
+] + [Product, ProductCategory, SiteInfo, ImageAsset]
+
+
+def bump_content(sender, **kwargs):
+    bump_content_version(sender)
+
+
+for content_model in CONTENT_MODELS:
+    post_save.connect(bump_content, sender=content_model, dispatch_uid=f'content-save-{content_model.__name__}')
+    post_delete.connect(bump_content, sender=content_model, dispatch_uid=f'content-delete-{content_model.__name__}')
+
+
+# ============= IMAGE VARIANTS =============
+def queue_image_variants(sender, instance, raw=False, **kwargs):
+    """Have the job worker render variants for a newly attached image file"""
+    if raw:
+        return
+    name = getattr(instance, images.IMAGE_FIELDS[sender]).name
+    if not name or ImageAsset.objects.filter(name=name).exists():
+        return
+    transaction.on_commit(lambda: enqueue_job('image_variants', {'names': [name]}))
+
+
+for image_model in images.IMAGE_FIELDS:
+    post_save.connect(queue_image_variants, sender=image_model, dispatch_uid=f'images-save-{image_model.__name__}')
+
+
+# ============= ROLE RESOLUTION =============
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_role_profile(sender, instance, **kwargs):
+    user_id = instance.user_id
+    bump_profile_version(user_id)
+    transaction.on_commit(lambda: bump_profile_version(user_id))
+
+
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def bump_role_matrix(sender, **kwargs):
+    bump_matrix_version()
+    transaction.on_commit(bump_matrix_version)
+
+
+# ============= SEARCH INDEX =============
+def index_for_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_objects(search.MODEL_ENTITIES[sender], [instance.pk])
+
+
+def remove_from_search(sender, instance, **kwargs):
+    search.remove_object(search.MODEL_ENTITIES[sender], instance.pk)
+
+
+for search_model in search.MODEL_ENTITIES:
+    post_save.connect(index_for_search, sender=search_model, dispatch_uid=f'search-save-{search_model.__name__}')
+    post_delete.connect(remove_from_search, sender=search_model, dispatch_uid=f'search-delete-{search_model.__name__}')
+
+
+USER_SEARCH_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=User)
+def reindex_user_records(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Customer and order documents carry the user's name and email"""
+    if raw or created:
+        return
+    # Logins save only last_login
+    if update_fields is not None and not set(update_fields) & USER_SEARCH_FIELDS:
+        return
+    search.index_queryset('customers', Customer.objects.filter(user=instance))
+    search.index_queryset('orders', Order.objects.filter(customer__user=instance))
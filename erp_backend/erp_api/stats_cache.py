@@ -0,0 +1,43 @@
+"""
+Cache for the global "stats" blocks returned by the list API views.
+Entries are keyed per model and dropped by post_save/post_delete
+signals (see signals.py); ?fresh=1 forces a recompute. Stats are always
+computed on the primary: a lagging replica's numbers would otherwise be
+cached past the invalidation.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .replicas import primary_reads
+
+
+def get_stats_cache():
+    return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'default')]
+
+
+def stats_key(model):
+    # Stats such as "new this month" or "today's revenue" depend on the
+    # date, so the key rolls over at midnight
+    return f"stats:{model._meta.label_lower}:{timezone.localdate().isoformat()}"
+
+
+def cached_stats(model, compute, request=None):
+    """Return the stats dict for a model, computing and caching it on a miss"""
+    cache = get_stats_cache()
+    key = stats_key(model)
+    fresh = request is not None and request.GET.get('fresh') == '1'
+
+    if not fresh:
+        stats = cache.get(key)
+        if stats is not None:
+            return stats
+
+    with primary_reads():
+        stats = compute()
+    cache.set(key, stats, getattr(settings, 'STATS_CACHE_TIMEOUT', 300))
+    return stats
+
+
+def invalidate_stats(model):
+    get_stats_cache().delete(stats_key(model))
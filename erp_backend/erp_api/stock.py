@@ -0,0 +1,267 @@
+"""
+Stock ledger: reservations, sales and the movement log.
+
+Product.stock_quantity is stock on hand and Product.reserved_quantity is
+the part of it held by open checkouts. Every change is a single
+conditional UPDATE with F() expressions, so concurrent buyers never read
+and write back a stale count and the last unit can only be taken once:
+
+- reserve_stock() holds units for a limited time at checkout start
+- commit_reservation() turns a hold into a sale once the order is paid
+- release_reservation() gives a hold back; release_expired_reservations()
+  is the sweeper run by the `release_stock_holds` command
+- sell_stock() takes stock immediately when no hold is needed
+- adjust_stock() applies manual corrections, never below the held units
+
+Reservation state changes are compare-and-set updates on the reservation
+row, so a hold is committed or released exactly once even if the sweeper
+and a payment confirmation race. Each change writes a StockMovement row.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OrderItem, Product, StockMovement, StockReservation
+
+RESERVATION_TTL = timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 900))
+SWEEP_BATCH_SIZE = 500
+
+
+class InsufficientStock(Exception):
+    """Raised when a product no longer has enough unreserved stock"""
+
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f'Insufficient stock for {product.name}')
+
+
+def record_movement(product, movement_type, quantity, reservation=None, order=None,
+                    website_order=None, notes=None, user=None):
+    return StockMovement.objects.create(
+        product=product,
+        movement_type=movement_type,
+        quantity=quantity,
+        reservation=reservation,
+        order=order,
+        website_order=website_order,
+        notes=notes,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+# ============= RESERVATIONS =============
+def reserve_stock(product, quantity, order=None, website_order=None, ttl=None):
+    """
+    Hold `quantity` units of `product` until the hold expires.
+    Raises InsufficientStock if fewer units are available.
+    """
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            pk=product.pk,
+            stock_quantity__gte=F('reserved_quantity') + quantity,
+        ).update(reserved_quantity=F('reserved_quantity') + quantity)
+        if not updated:
+            raise InsufficientStock(product)
+
+        reservation = StockReservation.objects.create(
+            product=product,
+            quantity=quantity,
+            order=order,
+            website_order=website_order,
+            expires_at=timezone.now() + (ttl or RESERVATION_TTL),
+        )
+        record_movement(product, 'reserve', -quantity, reservation=reservation,
+                        order=order, website_order=website_order)
+    product.reserved_quantity += quantity
+    return reservation
+
+
+def commit_reservation(reservation):
+    """
+    Turn a hold into a sale. A hold that was already released or swept
+    is re-taken from available stock, which raises InsufficientStock if
+    the units have been sold in the meantime.
+    """
+    with transaction.atomic():
+        held = StockReservation.objects.filter(pk=reservation.pk, status='held').update(
+            status='committed', updated_at=timezone.now()
+        )
+        if held:
+            Product.objects.filter(pk=reservation.product_id).update(
+                stock_quantity=F('stock_quantity') - reservation.quantity,
+                reserved_quantity=F('reserved_quantity') - reservation.quantity,
+            )
+        else:
+            reservation.refresh_from_db(fields=['status'])
+            if reservation.status == 'committed':
+                return reservation
+            take_stock(reservation.product, reservation.quantity)
+            StockReservation.objects.filter(pk=reservation.pk).update(
+                status='committed', updated_at=timezone.now()
+            )
+
+        record_movement(reservation.product, 'sale', -reservation.quantity,
+                        reservation=reservation, order=reservation.order,
+                        website_order=reservation.website_order)
+    reservation.status = 'committed'
+    return reservation
+
+
+def release_reservation(reservation, status='released'):
+    """Give a held reservation back; returns False if it was no longer held"""
+    with transaction.atomic():
+        released = StockReservation.objects.filter(pk=reservation.pk, status='held').update(
+            status=status, updated_at=timezone.now()
+        )
+        if not released:
+            return False
+        Product.objects.filter(pk=reservation.product_id).update(
+            reserved_quantity=F('reserved_quantity') - reservation.quantity
+        )
+        record_movement(reservation.product, 'expire' if status == 'expired' else 'release',
+                        reservation.quantity, reservation=reservation,
+                        order=reservation.order, website_order=reservation.website_order)
+    reservation.status = status
+    return True
+
+
+def release_expired_reservations(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """Release every hold past its expiry; returns how many were released"""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        batch = list(
+            StockReservation.objects
+            .select_related('product')
+            .filter(status='held', expires_at__lte=now)
+            .order_by('expires_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return released
+        for reservation in batch:
+            if release_reservation(reservation, status='expired'):
+                released += 1
+
+
+# ============= SALES =============
+def take_stock(product, quantity):
+    """
+    Decrement unreserved stock in one conditional UPDATE.
+    Raises InsufficientStock if the row no longer has enough units.
+    """
+    updated = Product.objects.filter(
+        pk=product.pk,
+        stock_quantity__gte=F('reserved_quantity') + quantity,
+    ).update(stock_quantity=F('stock_quantity') - quantity)
+    if not updated:
+        raise InsufficientStock(product)
+    product.stock_quantity -= quantity
+
+
+def sell_stock(product, quantity, order=None, website_order=None, user=None):
+    """Take stock for an immediate sale and log it"""
+    with transaction.atomic():
+        take_stock(product, quantity)
+        record_movement(product, 'sale', -quantity, order=order,
+                        website_order=website_order, user=user)
+
+
+def adjust_stock(product, quantity, notes=None, user=None):
+    """
+    Apply a manual signed stock correction.
+    Raises InsufficientStock if it would leave less than the held units.
+    """
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            pk=product.pk,
+            stock_quantity__gte=F('reserved_quantity') - quantity,
+        ).update(stock_quantity=F('stock_quantity') + quantity)
+        if not updated:
+            raise InsufficientStock(product)
+        record_movement(product, 'adjustment', quantity, notes=notes, user=user)
+    product.stock_quantity += quantity
+
+
+# ============= ORDERS =============
+def _by_product(lines):
+    # Touch product rows in a stable order to avoid deadlocks between orders
+    return sorted(lines, key=lambda line: line[0].pk)
+
+
+def hold_order_stock(lines, order=None, website_order=None, ttl=None):
+    """Reserve every (product, quantity) line, all or nothing"""
+    with transaction.atomic():
+        return [
+            reserve_stock(product, quantity, order=order, website_order=website_order, ttl=ttl)
+            for product, quantity in _by_product(lines)
+        ]
+
+
+def sell_order_stock(lines, order=None, website_order=None, user=None):
+    """Take stock for every (product, quantity) line, all or nothing"""
+    with transaction.atomic():
+        for product, quantity in _by_product(lines):
+            sell_stock(product, quantity, order=order, website_order=website_order, user=user)
+
+
+def commit_order_stock(order=None, website_order=None):
+    """Commit every open hold of an order; returns the reservations"""
+    reservations = list(
+        StockReservation.objects
+        .select_related('product', 'order', 'website_order')
+        .filter(order=order, website_order=website_order)
+        .exclude(status='committed')
+        .order_by('product_id')
+    )
+    with transaction.atomic():
+        for reservation in reservations:
+            commit_reservation(reservation)
+    return reservations
+
+
+def release_order_stock(order=None, website_order=None):
+    """Release every open hold of an order; returns how many were released"""
+    reservations = StockReservation.objects.select_related('product').filter(
+        order=order, website_order=website_order, status='held'
+    )
+    return sum(1 for reservation in reservations if release_reservation(reservation))
+
+
+def create_erp_order_items(order, items, user=None):
+    """
+    Create the OrderItems of an ERP order from a list of
+    {'product_id', 'quantity', 'unit_price'?} dicts and sell their stock.
+    Products are loaded with one query; raises ValueError for bad lines.
+    """
+    quantities = []
+    for item in items:
+        try:
+            product_id, quantity = int(item['product_id']), int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Each item needs a product_id and a quantity')
+        if quantity <= 0:
+            raise ValueError('Item quantity must be positive')
+        quantities.append((product_id, quantity, item.get('unit_price')))
+
+    products = Product.objects.in_bulk([product_id for product_id, _, _ in quantities])
+    order_items = []
+    for product_id, quantity, unit_price in quantities:
+        product = products.get(product_id)
+        if product is None:
+            raise ValueError(f'Product {product_id} not found')
+        unit_price = product.price if unit_price in (None, '') else Decimal(str(unit_price))
+        order_items.append(OrderItem(
+            order=order,
+            product=product,
+            quantity=quantity,
+            unit_price=unit_price,
+            total_price=unit_price * quantity,
+        ))
+
+    with transaction.atomic():
+        sell_order_stock([(item.product, item.quantity) for item in order_items], order=order, user=user)
+        return OrderItem.objects.bulk_create(order_items)
@@ -0,0 +1,172 @@
+"""
+Content-addressed media storage.
+
+ContentAddressedStorage stores every file under the SHA-256 of its
+bytes, whatever name it was saved with:
+
+    cas/3f/a9/3fa9...c1.jpg
+
+The hash is computed while the upload is streamed to a temporary file
+next to its destination, so identical uploads share one file and a
+second copy is never written. A path's content can never change, so
+the files can be served with a far-future immutable Cache-Control
+header (see serve_immutable for development; configure the web server
+to do the same for MEDIA_URL + 'cas/').
+
+Because one file may back several records, delete() leaves hashed files
+alone. collect_garbage() (python manage.py collect_media_garbage)
+removes the files no FileField/ImageField, *_url field, image variant
+or pending job refers to any more. Files saved before the switch keep
+their names and are read as before; the collector only sweeps them
+when asked to.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+from django.views.static import serve
+
+CAS_PREFIX = 'cas'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by the SHA-256 of their content"""
+    content_addressed = True
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed in _save()
+        return name
+
+    def hashed_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return f"{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def _save(self, name, content):
+        directory = os.path.join(self.location, CAS_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            final_name = self.hashed_name(digest.hexdigest(), name)
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                # Same bytes already stored: keep the existing file, but
+                # restart its garbage collection grace period
+                os.remove(temp_path)
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return final_name
+
+    def delete(self, name):
+        # Hashed files may be shared; collect_garbage() removes unreferenced ones
+        if name and name.startswith(f'{CAS_PREFIX}/'):
+            return
+        super().delete(name)
+
+
+def is_content_addressed(storage=None):
+    return getattr(storage or default_storage, 'content_addressed', False)
+
+
+def serve_immutable(request, path, document_root=None):
+    """django.views.static.serve for hashed paths, cacheable forever"""
+    response = serve(request, path, document_root=document_root)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+
+# ============= GARBAGE COLLECTION =============
+def referenced_names():
+    """Storage names referenced by a file field, a media URL field or a pending job"""
+    from .images import storage_name
+    from .models import Job
+
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                values = model._default_manager.exclude(**{field.name: ''}).values_list(field.name, flat=True)
+            elif isinstance(field, (models.URLField, models.CharField)) and field.name.endswith('url'):
+                values = model._default_manager.filter(
+                    **{f'{field.attname}__contains': '/'}
+                ).values_list(field.attname, flat=True)
+                values = map(storage_name, values)
+            else:
+                continue
+            names.update(value for value in values if value)
+
+    for params in Job.objects.filter(status__in=['queued', 'running']).values_list('params', flat=True):
+        if params.get('upload'):
+            names.add(params['upload'])
+        names.update(params.get('names', []))
+    return names
+
+
+def stored_names(storage, directory=''):
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        yield f'{directory}/{filename}' if directory else filename
+    for subdirectory in directories:
+        yield from stored_names(storage, f'{directory}/{subdirectory}' if directory else subdirectory)
+
+
+def collect_garbage(min_age=24 * 3600, prefix=CAS_PREFIX, dry_run=False, storage=None):
+    """
+    Delete files under `prefix` (everything for None) that nothing refers
+    to and that are older than `min_age` seconds; younger files may
+    belong to an upload whose record is not saved yet. ImageAsset rows of
+    unreferenced originals go too, releasing their variants.
+
+    Returns (removed names, bytes freed, ImageAsset rows removed).
+    """
+    from .models import ImageAsset
+
+    storage = storage or default_storage
+    cutoff = time.time() - min_age
+    referenced = referenced_names()
+
+    stale_assets = []
+    for asset_id, name, variants, updated_at in ImageAsset.objects.values_list('id', 'name', 'variants', 'updated_at'):
+        if name in referenced or updated_at.timestamp() > cutoff:
+            referenced.add(name)
+            referenced.update(variant['name'] for variant in variants)
+        else:
+            stale_assets.append(asset_id)
+    if stale_assets and not dry_run:
+        ImageAsset.objects.filter(id__in=stale_assets).delete()
+
+    removed, freed = [], 0
+    directory = prefix or ''
+    if directory and not storage.exists(directory):
+        return removed, freed, len(stale_assets)
+    for name in stored_names(storage, directory):
+        if name in referenced:
+            continue
+        path = storage.path(name)
+        stat = os.stat(path)
+        if stat.st_mtime > cutoff:
+            continue
+        removed.append(name)
+        freed += stat.st_size
+        if not dry_run:
+            os.remove(path)
+    return removed, freed, len(stale_assets)
@@ -1,3 +1,1619 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+import json
+import os
+import shutil
+import tempfile
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import (
+    ActivityLog, CMSContent, Customer, DailySalesRollup, HomepageNavigation, HomepageSection, HomepageWhyUsItem,
+    ImageAsset, Invoice, Job, Lead, NumberSequence, Order, OrderItem, Payment, Permission, Product, ProductCategory,
+    StockMovement, StockReservation, UserProfile, WebsiteEnquiry, WebsiteFAQ, WebsiteGallery, WebsiteOrder,
+    WebsiteOrderItem, WebsitePartner, WebsiteStory,
+)
+from .views import (
+    CustomerExportAPIView, CustomersAPIView, DashboardView, LeadsExportAPIView, LeadsImportAPIView,
+    JobDetailAPIView, JobsAPIView, OrderExportAPIView, OrdersAPIView, ProductDetailAPIView, ReportsView,
+)
+from . import cart as cart_service
+from . import exports, search, stock
+from .homepage import build_homepage_context, get_homepage_context
+from .jobs import run_pending_jobs
+from .query_plans import analyze_tables, capture_plans, regressions
+from .roles import (
+    ROLE_CACHE_TIMEOUT, ROLE_ISSUED_CLAIM, clear_local_cache, get_access, resolve_access, tokens_for_user,
+)
+from .activity import ActivityLogWriter, log_activity
+from . import activity_archive
+from . import images
+from . import storage as media_storage
+from . import metrics
+from . import benchmarks
+from . import numbering
+from . import replicas
+from .stats_cache import cached_stats
+from erp_backend.middleware.replicas import ReplicaMiddleware
+
+
+def make_customer(code='CUST0001'):
+    user = User.objects.create_user(username=code.lower(), password='pass')
+    return Customer.objects.create(
+        user=user, customer_code=code, billing_address='', shipping_address='',
+        credit_limit=Decimal('0'), tax_number='',
+    )
+
+
+def make_order(customer, number, grand_total, status='delivered', days_ago=0):
+    order = Order.objects.create(
+        order_number=number, customer=customer, status=status,
+        total_amount=grand_total, grand_total=grand_total, shipping_address='',
+    )
+    if days_ago:
+        order.order_date = timezone.now() - timedelta(days=days_ago)
+        order.save()
+    return order
+
+
+class DashboardViewTests(TestCase):
+    """Dashboard figures and query count"""
+
+    # One query per stat block, independent of days and categories
+    EXPECTED_QUERIES = 13
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.customer = make_customer()
+
+    def add_category_sales(self, index):
+        category = ProductCategory.objects.create(name=f'Category {index}')
+        product = Product.objects.create(
+            sku=f'SKU{index:04d}', name=f'Product {index}', category=category,
+            price=Decimal('10.00'), cost=Decimal('5.00'),
+        )
+        order = make_order(self.customer, f'ORD{index:05d}', Decimal('10.00'), days_ago=index % 7)
+        OrderItem.objects.create(
+            order=order, product=product, quantity=1,
+            unit_price=Decimal('10.00'), total_price=Decimal('10.00'),
+        )
+
+    def get_dashboard(self):
+        request = self.factory.get('/api/dashboard/')
+        return DashboardView.as_view()(request)
+
+    def test_query_count_is_constant(self):
+        self.add_category_sales(1)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.get_dashboard()
+
+        for index in range(2, 12):
+            self.add_category_sales(index)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.get_dashboard()
+
+    def test_figures(self):
+        make_order(self.customer, 'ORD00001', Decimal('100.00'))
+        make_order(self.customer, 'ORD00002', Decimal('40.00'), days_ago=3)
+        make_order(self.customer, 'ORD00003', Decimal('25.00'), status='pending')
+        make_order(self.customer, 'ORD00004', Decimal('60.00'), days_ago=20)
+        self.add_category_sales(7)
+
+        data = self.get_dashboard().data
+        stats = data['stats']
+        self.assertEqual(stats['total_orders'], 5)
+        self.assertEqual(stats['pending_orders'], 1)
+        self.assertEqual(stats['today_orders'], 3)
+        self.assertEqual(stats['today_sales'], 110.0)
+        self.assertEqual(stats['week_orders'], 4)
+        self.assertEqual(stats['week_sales'], 150.0)
+        self.assertEqual(stats['month_orders'], 5)
+        self.assertEqual(stats['month_sales'], 210.0)
+
+        sales_data = data['charts']['sales_data']
+        self.assertEqual(len(sales_data), 7)
+        self.assertEqual(sales_data[-1]['sales'], 110.0)
+        self.assertEqual(sales_data[-4]['sales'], 40.0)
+        self.assertEqual(sum(day['sales'] for day in sales_data), 150.0)
+
+        self.assertEqual(
+            data['charts']['revenue_by_category'],
+            [{'category': 'Category 7', 'revenue': 10.0}],
+        )
+
+
+class DailySalesRollupTests(TestCase):
+    """Rollup rows follow order saves and deletes"""
+
+    def setUp(self):
+        self.customer = make_customer()
+        self.today = timezone.localdate()
+
+    def bucket(self, status, date=None):
+        return DailySalesRollup.objects.filter(
+            source='erp', status=status, date=date or self.today
+        ).first()
+
+    def test_create_status_change_and_delete(self):
+        order = make_order(self.customer, 'ORD00001', Decimal('100.00'), status='pending')
+        make_order(self.customer, 'ORD00002', Decimal('50.00'), status='pending')
+        self.assertEqual(self.bucket('pending').order_count, 2)
+        self.assertEqual(self.bucket('pending').grand_total, Decimal('150.00'))
+
+        order.status = 'delivered'
+        order.save()
+        self.assertEqual(self.bucket('pending').order_count, 1)
+        self.assertEqual(self.bucket('delivered').grand_total, Decimal('100.00'))
+
+        order.delete()
+        self.assertIsNone(self.bucket('delivered'))
+
+    def test_moving_order_date(self):
+        order = make_order(self.customer, 'ORD00001', Decimal('100.00'))
+        make_order(self.customer, 'ORD00002', Decimal('30.00'), days_ago=2)
+        self.assertEqual(self.bucket('delivered').grand_total, Decimal('100.00'))
+
+        order.order_date = timezone.now() - timedelta(days=2)
+        order.save()
+        self.assertIsNone(self.bucket('delivered'))
+        moved = self.bucket('delivered', date=self.today - timedelta(days=2))
+        self.assertEqual(moved.order_count, 2)
+        self.assertEqual(moved.grand_total, Decimal('130.00'))
+
+    def test_rebuild_command(self):
+        make_order(self.customer, 'ORD00001', Decimal('100.00'))
+        make_order(self.customer, 'ORD00002', Decimal('20.00'), days_ago=5)
+        expected = sorted(DailySalesRollup.objects.values_list('date', 'status', 'order_count', 'grand_total'))
+
+        # Queryset updates bypass signals; a rebuild brings the table back in line
+        DailySalesRollup.objects.all().delete()
+        Order.objects.filter(order_number='ORD00001').update(grand_total=Decimal('80.00'))
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+
+        rows = sorted(DailySalesRollup.objects.values_list('date', 'status', 'order_count', 'grand_total'))
+        self.assertEqual(len(rows), len(expected))
+        self.assertEqual(self.bucket('delivered').grand_total, Decimal('80.00'))
+
+    def test_sales_report_reads_rollup(self):
+        make_order(self.customer, 'ORD00001', Decimal('100.00'))
+        make_order(self.customer, 'ORD00002', Decimal('25.00'))
+        make_order(self.customer, 'ORD00003', Decimal('40.00'), days_ago=4)
+        make_order(self.customer, 'ORD00004', Decimal('99.00'), status='cancelled')
+
+        request = APIRequestFactory().get('/api/reports/', {'type': 'sales'})
+        with self.assertNumQueries(1):
+            response = ReportsView.as_view()(request)
+
+        data = response.data['data']
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[-1]['date'], self.today)
+        self.assertEqual(data[-1]['total_sales'], Decimal('125.00'))
+        self.assertEqual(data[-1]['order_count'], 2)
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pagination on the list views"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.customer = make_customer()
+        # Several orders share an order_date so ties are broken by id
+        same_time = timezone.now() - timedelta(days=1)
+        for index in range(1, 8):
+            order = make_order(self.customer, f'ORD{index:05d}', Decimal('10.00'))
+            if index <= 4:
+                order.order_date = same_time
+                order.save()
+
+    def get_orders(self, **params):
+        return OrdersAPIView.as_view()(self.factory.get('/api/orders/', params))
+
+    def test_walks_all_rows_once(self):
+        seen = []
+        response = self.get_orders(cursor='', page_size=3)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['order_number'] for row in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            response = self.get_orders(cursor=response.data['next_cursor'], page_size=3)
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+        self.assertEqual(seen[:3], ['ORD00007', 'ORD00006', 'ORD00005'])
+        self.assertFalse(response.data['has_more'])
+
+    def test_exact_count_on_request(self):
+        response = self.get_orders(cursor='', page_size=2, count='exact')
+        self.assertEqual(response.data['count'], 7)
+        self.assertFalse(response.data['count_estimated'])
+        self.assertNotIn('total_pages', response.data)
+
+    def test_invalid_cursor(self):
+        response = self.get_orders(cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data['success'])
+
+    def test_page_mode_is_default(self):
+        response = CustomersAPIView.as_view()(
+            self.factory.get('/api/customers/', {'page': 1, 'page_size': 5})
+        )
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['page'], 1)
+        self.assertEqual(response.data['total_pages'], 1)
+        self.assertNotIn('next_cursor', response.data)
+
+
+class StatsCacheTests(TestCase):
+    """List stats are cached until the model changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        make_customer('CUST0001')
+
+    def get_customers(self, **params):
+        return CustomersAPIView.as_view()(self.factory.get('/api/customers/', params))
+
+    def test_stats_cached_and_invalidated(self):
+        self.assertEqual(self.get_customers().data['stats']['total_customers'], 1)
+
+        # Stats come from the cache: only the page count, rows and the
+        # customer's profile are queried
+        with self.assertNumQueries(3):
+            self.get_customers()
+
+        make_customer('CUST0002')
+        self.assertEqual(self.get_customers().data['stats']['total_customers'], 2)
+
+        Customer.objects.get(customer_code='CUST0002').delete()
+        self.assertEqual(self.get_customers().data['stats']['total_customers'], 1)
+
+    def test_fresh_bypasses_cache(self):
+        self.get_customers()
+        # Queryset updates send no signals, so only ?fresh=1 picks them up
+        Customer.objects.update(balance=Decimal('50.00'))
+        self.assertEqual(self.get_customers().data['stats']['total_balance'], 0)
+        self.assertEqual(self.get_customers(fresh='1').data['stats']['total_balance'], 50.0)
+        self.assertEqual(self.get_customers().data['stats']['total_balance'], 50.0)
+
+
+class ExportTests(TestCase):
+    """Streaming CSV/XLSX exports"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        for index in range(1, 6):
+            customer = make_customer(f'CUST{index:04d}')
+            UserProfile.objects.create(user=customer.user, unique_id=f'U{index}', phone=f'555-000{index}')
+            make_order(customer, f'ORD{index:05d}', Decimal('10.00'))
+
+    def test_customer_json_export_single_query(self):
+        request = self.factory.get('/api/customers/export/')
+        with self.assertNumQueries(1):
+            response = CustomerExportAPIView.as_view()(request)
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertIn('555-0005', response.data['data'][0])
+
+    def test_order_csv_export_streams(self):
+        response = OrderExportAPIView.as_view()(self.factory.get('/api/orders/export/'))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Order #')
+        self.assertEqual(len(lines), 6)
+
+    def test_lead_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        Lead.objects.create(
+            lead_number='LEAD0001', company_name='Acme', contact_person='Ann',
+            email='ann@example.com', phone='1', source='website',
+        )
+        response = LeadsExportAPIView.as_view()(self.factory.get('/api/leads/export/'))
+        self.assertIn('.xlsx', response['Content-Disposition'])
+
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(ws.iter_rows(values_only=True))
+        self.assertEqual(rows[0][0], 'Lead #')
+        self.assertEqual(rows[1][:3], ('LEAD0001', 'Ann', 'Acme'))
+
+    def test_rows_are_read_in_keyset_chunks(self):
+        Order.objects.update(order_date=timezone.now())  # ties broken by id
+        export = exports.OrderExport()
+        with self.assertNumQueries(3):
+            rows = list(export.iter_rows(chunk_size=2))
+        self.assertEqual([row[0] for row in rows], [f'ORD{index:05d}' for index in range(5, 0, -1)])
+
+    def test_unknown_output(self):
+        response = OrderExportAPIView.as_view()(self.factory.get('/api/orders/export/', {'output': 'pdf'}))
+        self.assertEqual(response.status_code, 400)
+
+
+def make_workbook(rows):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['Lead #', 'Contact Person', 'Company', 'Email', 'Phone', 'Source', 'Status', 'Estimated Value', 'Notes'])
+    for row in rows:
+        ws.append(row)
+    buffer = BytesIO()
+    wb.save(buffer)
+    return SimpleUploadedFile('leads.xlsx', buffer.getvalue())
+
+
+class LeadImportTests(TestCase):
+    """Batched lead import"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        Lead.objects.create(
+            lead_number='LEAD0001', company_name='Old Co', contact_person='Old',
+            email='old@example.com', phone='1', source='other',
+        )
+
+    def post_import(self, rows, **data):
+        data['file'] = make_workbook(rows)
+        request = self.factory.post('/api/leads/import/', data, format='multipart')
+        return LeadsImportAPIView.as_view()(request)
+
+    def test_upsert_and_error_report(self):
+        response = self.post_import([
+            ['LEAD0001', 'New Name', 'New Co', 'new@example.com', '2', 'website', 'qualified', 1500, ''],
+            ['LEAD0100', 'Bob', 'Bob Co', 'bob@example.com', '3', '', '', None, 'note'],
+            [None, 'No Number', 'NN Co', '', '4', 'referral', 'new', '', ''],
+            ['LEAD0101', 'Bad', 'Bad Co', 'not-an-email', '5', 'website', 'new', '', ''],
+            ['LEAD0102', 'Bad', 'Bad Co', '', '6', 'website', 'unknown', '', ''],
+            [None, None, None, None, None, None, None, None, None],
+        ])
+        data = response.data
+        self.assertTrue(data['success'])
+        self.assertEqual((data['imported'], data['created'], data['updated']), (3, 2, 1))
+        self.assertEqual(data['errors'], 2)
+        self.assertTrue(data['error_details'][0].startswith('Row 5:'))
+        self.assertTrue(data['error_details'][1].startswith('Row 6:'))
+
+        updated = Lead.objects.get(lead_number='LEAD0001')
+        self.assertEqual(updated.company_name, 'New Co')
+        self.assertEqual(updated.estimated_value, Decimal('1500'))
+        self.assertEqual(Lead.objects.get(lead_number='LEAD0100').source, 'other')
+        self.assertTrue(Lead.objects.filter(contact_person='No Number').exclude(lead_number='').exists())
+
+    def test_over_long_values_are_row_errors(self):
+        response = self.post_import([
+            ['LEAD0200', 'Ann', 'Ann Co', '', '1' * 21, 'website', 'new', '', ''],
+            ['LEAD0201', 'Ann', 'C' * 256, '', '', 'website', 'new', '', ''],
+            ['LEAD0202', 'Ann', 'Ann Co', '', '', 'website', 'new', '1' * 20, ''],
+            ['LEAD0203', 'Ann', 'Ann Co', '', '', 'website', 'new', '', ''],
+        ], batch_size=1)
+        data = response.data
+        self.assertEqual((data['imported'], data['errors']), (1, 3))
+        self.assertEqual(data['error_details'][0], 'Row 2: Phone is longer than 20 characters')
+        self.assertTrue(data['error_details'][1].startswith('Row 3: Company name'))
+        self.assertTrue(data['error_details'][2].startswith('Row 4: Invalid estimated value'))
+        self.assertTrue(Lead.objects.filter(lead_number='LEAD0203').exists())
+
+    def test_query_count_per_batch(self):
+        rows = [
+            [f'LEAD{n:04d}', f'Contact {n}', 'Co', '', '', 'website', 'new', '', '']
+            for n in range(2, 102)
+        ]
+        # Per batch: savepoint, lookup, bulk insert, release, and four search
+        # index writes (rows, documents, document insert, tokens). The activity
+        # log entry is written after commit, outside the request.
+        with self.assertNumQueries(8 * 4):
+            response = self.post_import(rows, batch_size=25)
+        self.assertEqual(response.data['created'], 100)
+        self.assertEqual(Lead.objects.count(), 101)
+
+
+class JobTests(TestCase):
+    """Background jobs for exports, imports and reports"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.factory = APIRequestFactory()
+        make_order(make_customer(), 'ORD00001', Decimal('10.00'))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_async_export(self):
+        request = self.factory.get('/api/orders/export/', {'async': '1'})
+        response = OrderExportAPIView.as_view()(request)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job']['id']
+        self.assertEqual(response.data['job']['status'], 'queued')
+
+        self.assertEqual(run_pending_jobs(), 1)
+
+        response = JobDetailAPIView.as_view()(self.factory.get(f'/api/jobs/{job_id}/'), job_id=job_id)
+        job = response.data['job']
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress'], 100)
+        self.assertEqual(job['result'], {'rows': 1})
+        with Job.objects.get(id=job_id).result_file.open('rb') as f:
+            lines = f.read().decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('ORD00001,'))
+
+    def test_async_import_and_report(self):
+        request = self.factory.post('/api/leads/import/?async=1', {
+            'file': make_workbook([['LEAD0001', 'Ann', 'Acme', '', '', 'website', 'new', '', '']])
+        }, format='multipart')
+        self.assertEqual(LeadsImportAPIView.as_view()(request).status_code, 202)
+
+        response = JobsAPIView.as_view()(
+            self.factory.post('/api/jobs/', {'job_type': 'report', 'params': {'type': 'customers'}}, format='json')
+        )
+        self.assertEqual(response.status_code, 202)
+
+        self.assertEqual(run_pending_jobs(), 2)
+        import_job, report_job = Job.objects.order_by('id')
+        self.assertEqual(import_job.status, 'succeeded')
+        self.assertEqual(import_job.result['created'], 1)
+        self.assertTrue(Lead.objects.filter(lead_number='LEAD0001').exists())
+        self.assertEqual(report_job.result['report_type'], 'customers')
+
+    def test_failed_job_records_error(self):
+        response = JobsAPIView.as_view()(
+            self.factory.post('/api/jobs/', {'job_type': 'export', 'params': {'export': 'nope'}}, format='json')
+        )
+        job_id = response.data['job']['id']
+        run_pending_jobs()
+        job = Job.objects.get(id=job_id)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('nope', job.error)
+
+    def test_invalid_job_type(self):
+        response = JobsAPIView.as_view()(
+            self.factory.post('/api/jobs/', {'job_type': 'launch'}, format='json')
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_job_list_is_limited_to_the_callers_jobs(self):
+        staff = User.objects.create_user(username='staffer', password='pass', is_staff=True)
+        customer = User.objects.create_user(username='buyer', password='pass')
+        staff_job = Job.objects.create(job_type='export', params={'export': 'customers'}, created_by=staff)
+        own_job = Job.objects.create(job_type='export', params={'export': 'orders'}, created_by=customer)
+
+        def list_jobs(user=None):
+            request = self.factory.get('/api/jobs/')
+            if user is not None:
+                force_authenticate(request, user=user)
+            return JobsAPIView.as_view()(request)
+
+        self.assertEqual(list_jobs().status_code, 401)
+        self.assertEqual([job['id'] for job in list_jobs(customer).data['results']], [own_job.id])
+        self.assertEqual({job['id'] for job in list_jobs(staff).data['results']}, {staff_job.id, own_job.id})
+
+        response = JobDetailAPIView.as_view()(self.factory.get(f'/api/jobs/{staff_job.id}/'), job_id=staff_job.id)
+        self.assertEqual(response.status_code, 404)
+
+
+class CartCheckoutTests(TestCase):
+    """Session cart pricing and checkout"""
+
+    def setUp(self):
+        self.customer = make_customer()
+        self.client.force_login(self.customer.user)
+        self.products = [
+            Product.objects.create(
+                sku=f'SKU{index:04d}', name=f'Product {index}',
+                price=Decimal('19.99'), cost=Decimal('5.00'), stock_quantity=5,
+            )
+            for index in range(1, 5)
+        ]
+
+    def set_cart(self, cart):
+        session = self.client.session
+        session['cart'] = {str(product_id): quantity for product_id, quantity in cart.items()}
+        session.save()
+
+    def checkout(self):
+        return self.client.post(
+            '/api/website/checkout/',
+            data=json.dumps({'shipping_address': '1 Main St', 'payment_method': 'cod'}),
+            content_type='application/json',
+        )
+
+    def test_get_cart_single_product_query(self):
+        self.set_cart({product.id: 3 for product in self.products})
+        with self.assertNumQueries(2):  # session, products
+            response = self.client.get('/api/website/cart/get/')
+        data = response.json()
+        self.assertEqual(data['item_count'], 4)
+        self.assertEqual(data['total'], 239.88)
+
+    def test_checkout_takes_stock(self):
+        self.set_cart({self.products[0].id: 2, self.products[1].id: 5})
+        response = self.checkout()
+        self.assertTrue(response.json()['success'])
+
+        order = WebsiteOrder.objects.get()
+        self.assertEqual(order.grand_total, Decimal('139.93'))
+        self.assertEqual(WebsiteOrderItem.objects.filter(order=order).count(), 2)
+        self.products[0].refresh_from_db()
+        self.products[1].refresh_from_db()
+        self.assertEqual(self.products[0].stock_quantity, 3)
+        self.assertEqual(self.products[1].stock_quantity, 0)
+
+    def test_checkout_rolls_back_when_stock_runs_out(self):
+        self.set_cart({self.products[0].id: 2, self.products[1].id: 4})
+        real_resolve = cart_service.resolve_cart
+
+        def resolve_then_sell(cart_data):
+            # Another buyer takes stock after the cart was priced
+            cart = real_resolve(cart_data)
+            Product.objects.filter(pk=self.products[1].pk).update(stock_quantity=1)
+            return cart
+
+        with mock.patch('erp_api.website_views.resolve_cart', resolve_then_sell):
+            response = self.checkout()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient stock', response.json()['error'])
+        self.assertFalse(WebsiteOrder.objects.exists())
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock_quantity, 5)
+
+
+class StockLedgerTests(TestCase):
+    """Reservations, sales and the movement log"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            sku='LEDGER01', name='Ledger Chair', price=Decimal('50.00'), stock_quantity=5,
+        )
+
+    def refresh(self):
+        self.product.refresh_from_db()
+        return self.product.stock_quantity, self.product.reserved_quantity
+
+    def test_reserve_then_commit(self):
+        reservation = stock.reserve_stock(self.product, 3)
+        self.assertEqual(self.refresh(), (5, 3))
+        self.assertEqual(self.product.available_quantity, 2)
+
+        with self.assertRaises(stock.InsufficientStock):
+            stock.reserve_stock(self.product, 3)
+
+        stock.commit_reservation(reservation)
+        stock.commit_reservation(reservation)  # second commit is a no-op
+        self.assertEqual(self.refresh(), (2, 0))
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('movement_type', 'quantity')),
+            [('reserve', -3), ('sale', -3)],
+        )
+
+    def test_sweeper_releases_expired_holds(self):
+        expired = stock.reserve_stock(self.product, 2, ttl=timedelta(seconds=-1))
+        stock.reserve_stock(self.product, 1)
+
+        out = StringIO()
+        call_command('release_stock_holds', stdout=out)
+        self.assertIn('Released 1', out.getvalue())
+        self.assertEqual(self.refresh(), (5, 1))
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'expired')
+
+        # Committing after the sweep re-takes stock only while it lasts
+        stock.sell_stock(self.product, 4)
+        with self.assertRaises(stock.InsufficientStock):
+            stock.commit_reservation(expired)
+        self.assertEqual(self.refresh(), (1, 1))
+
+    def test_card_checkout_holds_until_payment(self):
+        customer = make_customer()
+        self.client.force_login(customer.user)
+        session = self.client.session
+        session['cart'] = {str(self.product.id): 2}
+        session.save()
+
+        response = self.client.post(
+            '/api/website/checkout/',
+            data=json.dumps({'shipping_address': '1 Main St', 'payment_method': 'card'}),
+            content_type='application/json',
+        )
+        order_id = response.json()['order_id']
+        self.assertEqual(self.refresh(), (5, 2))
+
+        self.client.post(
+            '/api/website/payment/confirm/',
+            data=json.dumps({'order_id': order_id, 'payment_intent_id': 'pi_test'}),
+            content_type='application/json',
+        )
+        self.assertEqual(self.refresh(), (3, 0))
+        self.assertEqual(WebsiteOrder.objects.get(pk=order_id).status, 'confirmed')
+        self.assertEqual(StockReservation.objects.get().status, 'committed')
+
+    def test_erp_order_items_take_stock(self):
+        customer = make_customer()
+        view = OrdersAPIView.as_view()
+        factory = APIRequestFactory()
+
+        response = view(factory.post('/api/orders/', {
+            'customer_id': customer.id, 'total_amount': 100,
+            'items': [{'product_id': self.product.id, 'quantity': 2}],
+        }, format='json'))
+        self.assertTrue(response.data['success'])
+        self.assertEqual(OrderItem.objects.get().total_price, Decimal('100.00'))
+        self.assertEqual(self.refresh(), (3, 0))
+
+        response = view(factory.post('/api/orders/', {
+            'customer_id': customer.id, 'order_number': 'ORD-BIG',
+            'items': [{'product_id': self.product.id, 'quantity': 4}],
+        }, format='json'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.filter(order_number='ORD-BIG').exists())
+        self.assertEqual(self.refresh(), (3, 0))
+
+
+    def test_product_edit_adjusts_stock_without_overwriting_holds(self):
+        manager = User.objects.create_user(username='manager', password='pass')
+        UserProfile.objects.create(user=manager, unique_id='MGR001', role='manager')
+        request = APIRequestFactory().put(
+            f'/api/products/{self.product.id}/', {'name': 'Desk Chair', 'stock_quantity': 8}, format='json',
+        )
+        force_authenticate(request, user=manager)
+        # A checkout holds units after the view has loaded the product
+        real_get = Product.objects.get
+
+        def get_then_hold(*args, **kwargs):
+            product = real_get(*args, **kwargs)
+            stock.reserve_stock(self.product, 2)
+            return product
+
+        with mock.patch.object(Product.objects, 'get', side_effect=get_then_hold):
+            response = ProductDetailAPIView.as_view()(request, product_id=self.product.id)
+        self.assertTrue(response.data['success'])
+        self.assertEqual(self.refresh(), (8, 2))
+        self.assertEqual(self.product.name, 'Desk Chair')
+        self.assertEqual(StockMovement.objects.get(movement_type='adjustment').quantity, 3)
+
+        with self.assertRaises(stock.InsufficientStock):
+            stock.adjust_stock(self.product, -7)
+        self.assertEqual(self.refresh(), (8, 2))
+
+
+class HomepageContextTests(TestCase):
+    """Homepage context builder and its versioned cache"""
+
+    def setUp(self):
+        cache.clear()
+        for section_type in ('why_us', 'details', 'stories', 'testimonials'):
+            section = HomepageSection.objects.create(section_type=section_type, heading=section_type)
+            if section_type == 'why_us':
+                for index in range(3):
+                    HomepageWhyUsItem.objects.create(section=section, text=f'Reason {index}', order=index)
+        parent = HomepageNavigation.objects.create(label='Shop', url='/shop/', is_dropdown=True)
+        for index in range(3):
+            HomepageNavigation.objects.create(label=f'Sub {index}', url='/', parent=parent, order=index)
+
+    def test_children_are_prefetched(self):
+        context = build_homepage_context()
+        with self.assertNumQueries(0):
+            reasons = [item.text for item in context['why_us_section'].why_us_items.all()]
+            submenus = [len(item.submenu.all()) for item in context['navigation_items']]
+        self.assertEqual(reasons, ['Reason 0', 'Reason 1', 'Reason 2'])
+        self.assertEqual(sorted(submenus), [0, 0, 0, 3])
+
+    def test_cached_until_homepage_model_saved(self):
+        get_homepage_context()
+        with self.assertNumQueries(0):
+            context = get_homepage_context()
+        self.assertEqual(len(context['why_us_section'].why_us_items.all()), 3)
+
+        HomepageWhyUsItem.objects.create(section=context['why_us_section'], text='Reason 3', order=3)
+        context = get_homepage_context()
+        self.assertEqual(len(context['why_us_section'].why_us_items.all()), 4)
+
+
+class SearchIndexTests(TestCase):
+    """Token search index kept current by signals"""
+
+    def setUp(self):
+        self.customer = make_customer('CUST0001')
+        self.customer.user.first_name = 'John'
+        self.customer.user.last_name = 'Smith'
+        self.customer.user.email = 'john.smith@example.com'
+        self.customer.user.save()
+
+    def test_customers_match_every_term_by_prefix(self):
+        other = make_customer('CUST0002')
+        other.user.first_name = 'John'
+        other.user.last_name = 'Doe'
+        other.user.save()
+
+        self.assertEqual(search.search_ids('customers', 'jo smi'), [self.customer.id])
+        self.assertEqual(sorted(search.search_ids('customers', 'john')), sorted([self.customer.id, other.id]))
+        self.assertEqual(search.search_ids('customers', 'john.smith@exa'), [self.customer.id])
+        self.assertEqual(search.search_ids('customers', 'mith'), [])
+
+    def test_ranked_by_field_weight(self):
+        in_description = Product.objects.create(sku='P-1', name='Armchair', price=1, description='Oak frame')
+        in_name = Product.objects.create(sku='P-2', name='Oak Table', price=1)
+        self.assertEqual(search.search_ids('products', 'oak'), [in_name.id, in_description.id])
+
+        in_name.delete()
+        self.assertEqual(search.search_ids('products', 'oak'), [in_description.id])
+
+    def test_list_view_and_api_search_use_index(self):
+        make_order(self.customer, 'ORD00001', Decimal('10.00'))
+        make_order(make_customer('CUST0002'), 'ORD00002', Decimal('10.00'))
+
+        request = APIRequestFactory().get('/api/orders/', {'search': 'smith'})
+        data = OrdersAPIView.as_view()(request).data
+        self.assertEqual([row['order_number'] for row in data['results']], ['ORD00001'])
+
+        # Renaming the user reindexes their customer and orders
+        self.customer.user.last_name = 'Jones'
+        self.customer.user.save()
+        response = self.client.get('/api/search/', {'q': 'jones', 'types': 'customers,orders'})
+        results = response.json()
+        self.assertEqual([row['customer_code'] for row in results['customers']], ['CUST0001'])
+        self.assertEqual([row['order_number'] for row in results['orders']], ['ORD00001'])
+
+    def test_list_search_keeps_every_match(self):
+        for index in range(8):
+            Lead.objects.create(lead_number=f'LEAD{index:04d}', company_name=f'Acme {index}', contact_person='Ann')
+        Lead.objects.create(lead_number='LEAD0100', company_name='Globex', contact_person='Bob')
+
+        # The ranked search is capped; the list filter is not
+        self.assertEqual(len(search.search_ids('leads', 'acme', limit=3)), 3)
+        matches = search.filter_queryset(Lead.objects.order_by('lead_number'), 'leads', 'acme ann')
+        self.assertEqual(matches.count(), 8)
+        self.assertEqual(matches.first().lead_number, 'LEAD0000')
+
+    def test_migration_backfills_an_empty_index(self):
+        from django.apps import apps
+        backfill = import_module('erp_api.migrations.0033_search_index_backfill').backfill_search_index
+        Lead.objects.create(lead_number='LEAD0001', company_name='Acme Corp', contact_person='Ann')
+        indexed = search.SearchDocument.objects.get(entity='leads').content
+        search.SearchDocument.objects.filter(entity='leads').delete()
+
+        backfill(apps, None)
+        backfill(apps, None)  # entities already indexed are left alone
+
+        self.assertEqual(search.SearchDocument.objects.get(entity='leads').content, indexed)
+        self.assertEqual(len(search.search_ids('leads', 'acme')), 1)
+        self.assertEqual(search.search_ids('customers', 'smith'), [self.customer.id])
+
+    def test_rebuild_command(self):
+        Lead.objects.create(lead_number='LEAD0001', company_name='Acme Corp', contact_person='Ann')
+        search.SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', '--entity', 'leads', stdout=StringIO())
+        self.assertEqual(len(search.search_ids('leads', 'acme')), 1)
+
+
+class CatalogTests(TestCase):
+    """Paginated public catalog with facets"""
+
+    def setUp(self):
+        self.chairs = ProductCategory.objects.create(name='Chairs')
+        self.tables = ProductCategory.objects.create(name='Tables')
+        for index in range(30):
+            Product.objects.create(
+                sku=f'CAT{index:03d}', name=f'Item {index:02d}',
+                category=self.chairs if index % 3 else self.tables,
+                price=Decimal(10 + index * 5), is_active=index != 29,
+            )
+
+    def test_page_with_facets_in_fixed_queries(self):
+        with self.assertNumQueries(7):  # versions, stock state, count, page, category facet, price bounds, histogram
+            response = self.client.get('/api/products/catalog/', {
+                'categories': str(self.chairs.id), 'sort': 'price_high', 'page': 2, 'page_size': 5,
+            })
+        data = response.json()
+        self.assertEqual(data['count'], 19)
+        self.assertEqual(data['total_pages'], 4)
+        self.assertEqual([row['price'] for row in data['results']], [110.0, 105.0, 95.0, 90.0, 80.0])
+
+        categories = {row['name']: row for row in data['facets']['categories']}
+        self.assertEqual(categories['Chairs']['count'], 19)
+        self.assertTrue(categories['Chairs']['selected'])
+        self.assertEqual(categories['Tables']['count'], 10)
+
+        buckets = data['facets']['price']['buckets']
+        self.assertEqual(sum(bucket['count'] for bucket in buckets), 19)
+        self.assertLessEqual(buckets[0]['from'], 15.0)
+        self.assertGreater(buckets[-1]['to'], 150.0)
+
+    def test_price_filter_and_categories_endpoint(self):
+        data = self.client.get('/api/products/catalog/', {'min_price': 50, 'max_price': 60, 'sort': 'price_low'}).json()
+        self.assertEqual([row['price'] for row in data['results']], [50.0, 55.0, 60.0])
+
+        with self.assertNumQueries(2):  # versions, counts
+            data = self.client.get('/api/products/categories/').json()
+        self.assertEqual({row['name']: row['product_count'] for row in data['results']}, {'Chairs': 19, 'Tables': 10})
+
+
+class ConditionalGetTests(TestCase):
+    """ETag/Last-Modified answers on the public read APIs"""
+
+    def test_unchanged_content_is_not_modified(self):
+        WebsiteFAQ.objects.create(question='Shipping?', answer='Free')
+        response = self.client.get('/api/website/faq/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/website/faq/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        WebsiteFAQ.objects.create(question='Returns?', answer='30 days')
+        response = self.client.get('/api/website/faq/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_bulk_save_and_stock_changes_refresh_the_etag(self):
+        faq = WebsiteFAQ.objects.create(question='Shipping?', answer='Free')
+        etag = self.client.get('/api/website/faq/')['ETag']
+        self.client.force_login(User.objects.create_user(username='editor', password='pass', is_staff=True))
+        self.client.post('/api/website/save-all/', {'faqs': [{'id': faq.id, 'question': 'Shipping?', 'answer': 'Paid'}]},
+                         content_type='application/json')
+        self.assertEqual(self.client.get('/api/website/faq/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        product = Product.objects.create(sku='ETAG1', name='Lamp', price=Decimal('20'), stock_quantity=5)
+        etag = self.client.get('/api/products/catalog/')['ETag']
+        self.assertEqual(self.client.get('/api/products/catalog/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        stock.sell_stock(product, 2)
+        response = self.client.get('/api/products/catalog/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['stock_quantity'], 3)
+
+    def test_cms_list_and_missing_page(self):
+        CMSContent.objects.create(slug='hero', title='Hero', description='Welcome')
+        etag = self.client.get('/api/cms/list/')['ETag']
+        self.assertEqual(self.client.get('/api/cms/list/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.get('/api/cms/page/missing/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class QueryPlanTests(TransactionTestCase):
+    """List and report endpoints stay on their indexes (ANALYZE commits on MySQL, hence TransactionTestCase)"""
+
+    LIST_REQUESTS = [
+        ('/api/orders/', {}),
+        ('/api/orders/', {'status': 'pending'}),
+        ('/api/orders/', {'payment_status': 'paid'}),
+        ('/api/orders/', {'cursor': '', 'status': 'shipped'}),
+        ('/api/invoices/', {}),
+        ('/api/invoices/', {'status': 'sent'}),
+        ('/api/leads/', {}),
+        ('/api/leads/', {'status': 'new', 'page': 3}),
+        ('/api/payments/', {}),
+        ('/api/customers/', {'customer_type': 'regular'}),
+        ('/api/website-enquiries/', {}),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        customers = [make_customer(f'CUST{index:04d}') for index in range(40)]
+        today = timezone.localdate()
+        for index in range(300):
+            customer = customers[index % len(customers)]
+            Order.objects.create(
+                order_number=f'ORD{index:05d}', customer=customer, total_amount=10, grand_total=10,
+                status=Order.STATUS_CHOICES[index % 6][0], payment_status=Order.PAYMENT_STATUS_CHOICES[index % 3][0],
+                shipping_address='',
+            )
+            Invoice.objects.create(
+                invoice_number=f'INV{index:05d}', customer=customer, invoice_date=today, due_date=today,
+                total_amount=10, balance_amount=10, status=Invoice.STATUS_CHOICES[index % 5][0],
+            )
+            Lead.objects.create(
+                lead_number=f'LEAD{index:05d}', company_name='Acme', contact_person='Pat', email='pat@example.com',
+                phone='1', status=Lead.STATUS_CHOICES[index % 7][0],
+            )
+            Payment.objects.create(
+                payment_number=f'PAY{index:05d}', customer=customer, payment_date=today,
+                payment_method='cash', amount=10,
+            )
+            WebsiteEnquiry.objects.create(
+                enquiry_number=f'ENQ{index:05d}', company_name='Acme', contact_person='Pat', email='pat@example.com',
+                phone='1', subject='Sofa', message='Price?', status=WebsiteEnquiry.ENQUIRY_STATUS[index % 5][0],
+            )
+            ActivityLog.objects.create(action='seed', table_name='orders', record_id=index)
+        analyze_tables([Customer, Order, Invoice, Lead, Payment, WebsiteEnquiry, ActivityLog])
+        self.client.force_login(customers[0].user)
+
+    def assert_indexed(self, path, params, allowed_scans=(), allow_sorts=False):
+        self.client.get(path, params)  # warm the list stats cache
+        plans = capture_plans(self.client.get, path, params)
+        self.assertTrue(plans)
+        regressed = regressions(plans, allowed_scans, allow_sorts)
+        if regressed:
+            self.fail('Query plan regressed:\n' + '\n'.join(map(str, regressed)))
+
+    def test_list_endpoints(self):
+        for path, params in self.LIST_REQUESTS:
+            with self.subTest(path=path, **params):
+                self.assert_indexed(path, params)
+
+    def test_dashboard_and_reports(self):
+        # Whole-table aggregates: the small rollup table, low stock and sales per product
+        self.assert_indexed(
+            '/api/dashboard/', {},
+            allowed_scans={'daily_sales_rollup', 'products', 'order_items'}, allow_sorts=True,
+        )
+        self.assert_indexed('/api/reports/', {'type': 'sales'})
+
+
+class RoleResolverTests(TestCase):
+    """Role and permission lookups shared by the decorators and permission classes"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.user = User.objects.create_user(username='clerk', password='pass')
+        self.profile = UserProfile.objects.create(user=self.user, unique_id='STF001', role='staff')
+
+    def test_role_is_resolved_once_and_reloaded_after_a_change(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/customers/').status_code, 302)
+        # Session and user loads only; the role comes from the process cache
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/customers/').status_code, 302)
+        self.assertEqual(self.client.get('/payments/').status_code, 403)
+
+        self.profile.role = 'finance'
+        self.profile.save()
+        self.assertEqual(self.client.get('/payments/').status_code, 302)
+        self.assertEqual(self.client.get('/customers/').status_code, 403)
+
+    def test_token_role_claim_is_trusted_until_the_profile_changes(self):
+        token = tokens_for_user(self.user).access_token
+        self.assertEqual(token['role'], 'staff')
+        clear_local_cache()
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_access(self.user, token).role, 'staff')
+
+        self.profile.role = 'finance'
+        self.profile.save()
+        self.assertEqual(resolve_access(self.user, token).role, 'finance')
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker-a'},
+        'worker_b': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker-b'},
+    })
+    def test_stale_claim_expires_when_workers_do_not_share_the_cache(self):
+        # Worker B issues the token; worker A saves the role change and
+        # bumps the version in its own cache only
+        with override_settings(ROLE_CACHE_ALIAS='worker_b'):
+            fresh = tokens_for_user(self.user).access_token
+            old = tokens_for_user(self.user).access_token
+        old[ROLE_ISSUED_CLAIM] -= ROLE_CACHE_TIMEOUT + 1
+        self.profile.role = 'finance'
+        self.profile.save()
+
+        with override_settings(ROLE_CACHE_ALIAS='worker_b'):
+            clear_local_cache()
+            self.assertEqual(resolve_access(self.user, fresh).role, 'staff')
+            clear_local_cache()
+            self.assertEqual(resolve_access(self.user, old).role, 'finance')
+            with override_settings(ROLE_CACHE_SHARED=True):
+                self.assertEqual(resolve_access(self.user, old).role, 'staff')
+
+    def test_permission_matrix(self):
+        Permission.objects.create(role='staff', module='orders', can_view=True, can_edit=False)
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        access = get_access(request)
+        self.assertIs(get_access(request), access)
+        self.assertTrue(access.can('orders'))
+        self.assertFalse(access.can('orders', 'edit'))
+        self.assertFalse(access.can('invoices'))
+
+        Permission.objects.filter(role='staff', module='orders').get().delete()
+        request = APIRequestFactory().get('/')
+        request.user = self.user
+        self.assertFalse(get_access(request).can('orders'))
+
+
+class ActivityLogTests(TestCase):
+    """Buffered activity log writes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='auditor', password='pass')
+
+    def make_request(self):
+        request = APIRequestFactory().post(
+            '/', HTTP_USER_AGENT='Mozilla/5.0 (Test)', HTTP_X_FORWARDED_FOR='203.0.113.7, 10.0.0.1',
+        )
+        request.user = self.user
+        return request
+
+    @override_settings(ACTIVITY_LOG_ASYNC=False)
+    def test_entry_is_written_on_commit_with_request_details(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            log_activity(self.make_request(), 'CREATE_CUSTOMER', table_name='customers', record_id=7)
+        self.assertFalse(ActivityLog.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        entry = ActivityLog.objects.get()
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.action, 'CREATE_CUSTOMER')
+        self.assertEqual(entry.ip_address, '203.0.113.7')
+        self.assertEqual(entry.user_agent, 'Mozilla/5.0 (Test)')
+
+    def test_writer_inserts_in_batches_and_falls_back_when_full(self):
+        writer = ActivityLogWriter(batch_size=2, max_size=3)
+        with mock.patch.object(writer, 'ensure_started'):
+            for index in range(4):
+                writer.put(ActivityLog(action=f'ACTION_{index}', user=self.user))
+        # The fourth entry found the queue full and was written directly
+        self.assertEqual(list(ActivityLog.objects.values_list('action', flat=True)), ['ACTION_3'])
+
+        with self.assertNumQueries(2):
+            self.assertEqual(writer.flush(), 3)
+        self.assertEqual(ActivityLog.objects.count(), 4)
+
+
+class ActivityArchiveTests(TestCase):
+    """Activity log retention and archive reads"""
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(ACTIVITY_LOG_ARCHIVE_DIR=self.archive_dir)
+        self.settings_override.enable()
+        self.admin = User.objects.create_user(username='boss', password='pass')
+        UserProfile.objects.create(user=self.admin, unique_id='ADM001', role='admin')
+        now = timezone.now()
+        for days_ago in (200, 120, 100, 10, 1):
+            entry = ActivityLog.objects.create(user=self.admin, action=f'ACTION_{days_ago}', table_name='orders')
+            ActivityLog.objects.filter(pk=entry.pk).update(created_at=now - timedelta(days=days_ago))
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.archive_dir, ignore_errors=True)
+
+    def actions(self, **kwargs):
+        return [entry['action'] for entry in activity_archive.read_activity(**kwargs)]
+
+    def test_command_moves_old_entries_to_archive_files(self):
+        out = StringIO()
+        call_command('archive_activity_log', days=90, batch_size=2, stdout=out)
+        self.assertIn('Archived 3', out.getvalue())
+        self.assertEqual(sorted(ActivityLog.objects.values_list('action', flat=True)), ['ACTION_1', 'ACTION_10'])
+        self.assertEqual(len(activity_archive.archived_days()), 3)
+
+        self.assertEqual(self.actions(), ['ACTION_1', 'ACTION_10', 'ACTION_100', 'ACTION_120', 'ACTION_200'])
+        start = timezone.now() - timedelta(days=150)
+        end = timezone.now() - timedelta(days=5)
+        self.assertEqual(self.actions(start=start, end=end), ['ACTION_10', 'ACTION_100', 'ACTION_120'])
+        self.assertEqual(self.actions(action='ACTION_200'), ['ACTION_200'])
+
+        # Ranges inside the hot window never open the archive
+        with mock.patch.object(activity_archive, 'read_archived_day') as read_day:
+            self.assertEqual(self.actions(start=timezone.now() - timedelta(days=5)), ['ACTION_1'])
+        read_day.assert_not_called()
+
+    def test_interrupted_run_does_not_duplicate_entries(self):
+        cutoff = timezone.now() - timedelta(days=90)
+        rows = ActivityLog.objects.filter(created_at__lt=cutoff).order_by('created_at').values(
+            *activity_archive.ARCHIVE_FIELDS
+        )
+        # Files written but rows not yet deleted when the run stopped
+        for row in rows:
+            activity_archive.append_entries(activity_archive.entry_day(row['created_at']),
+                                            [activity_archive.entry_to_dict(row)])
+        self.assertEqual(len(self.actions()), 5)
+
+        activity_archive.archive_before(cutoff)
+        self.assertEqual(self.actions(), ['ACTION_1', 'ACTION_10', 'ACTION_100', 'ACTION_120', 'ACTION_200'])
+
+    def test_api_reads_archived_range(self):
+        activity_archive.archive_before(timezone.now() - timedelta(days=90))
+        self.client.force_login(self.admin)
+        day = (timezone.localdate() - timedelta(days=120)).isoformat()
+        response = self.client.get('/api/activity-logs/', {'from': day, 'to': day})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['action'] for entry in response.json()['results']], ['ACTION_120'])
+        self.assertEqual(response.json()['results'][0]['username'], 'boss')
+
+
+def make_jpeg(width=1200, height=800, orientation=None, color=(200, 80, 40)):
+    from PIL import Image
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCam'  # Make
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class ImageVariantTests(TestCase):
+    """Responsive variants for uploaded images"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_upload_strips_exif_and_renders_variants(self):
+        from PIL import Image
+        upload = SimpleUploadedFile('Sofa Photo.JPG', make_jpeg(orientation=6), content_type='image/jpeg')
+        response = self.client.post('/api/website/upload-image/', {'image': upload})
+        self.assertEqual(response.status_code, 201)
+
+        asset = ImageAsset.objects.get()
+        self.assertRegex(asset.name, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        # Orientation 6 is a quarter turn: the stored image is portrait
+        self.assertEqual((asset.width, asset.height), (800, 1200))
+        self.assertTrue(asset.lqip.startswith('data:image/jpeg;base64,'))
+        self.assertEqual(
+            sorted((variant['width'], variant['format']) for variant in asset.variants),
+            [(320, 'jpg'), (320, 'webp'), (640, 'jpg'), (640, 'webp'), (800, 'jpg'), (800, 'webp')],
+        )
+        with Image.open(os.path.join(self.media_root, asset.name)) as original:
+            self.assertEqual(len(original.getexif()), 0)
+        with Image.open(os.path.join(self.media_root, asset.variants[1]['name'])) as variant:
+            self.assertEqual(variant.format, 'WEBP')
+
+        image_set = response.json()['image_set']
+        self.assertIn('640w', image_set['srcset'])
+        self.assertTrue(image_set['webp_srcset'].endswith('.webp 800w'))
+
+    def test_large_batches_go_to_the_job_worker(self):
+        files = [SimpleUploadedFile(f'p{n}.jpg', make_jpeg(400, 300, color=(n * 40, 0, 0))) for n in range(5)]
+        response = self.client.post('/api/website/upload-image/', {'images': files})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(ImageAsset.objects.exists())
+        self.assertEqual(len(response.json()['images']), 5)
+
+        run_pending_jobs()
+        self.assertEqual(ImageAsset.objects.count(), 5)
+        gallery = WebsiteGallery.objects.create(title='Room', image_url=response.json()['images'][0]['image_url'])
+        data = self.client.get('/api/website/gallery/').json()
+        self.assertEqual(data[0]['id'], gallery.id)
+        self.assertIn('320w', data[0]['image_set']['srcset'])
+
+    def test_saving_a_product_image_queues_variants(self):
+        product = Product.objects.create(sku='IMG1', name='Chair', price=Decimal('10'))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = SimpleUploadedFile('chair.jpg', make_jpeg(700, 700))
+            product.save()
+        job = Job.objects.get(job_type='image_variants')
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.result['processed'], 1)
+
+        product.refresh_from_db()
+        result = self.client.get('/api/products/catalog/').json()['results'][0]
+        self.assertEqual(result['image_set']['width'], 700)
+        self.assertEqual(images.image_set(product.image.name)['src'], result['image_set']['src'])
+
+    def test_product_image_is_replaced_by_its_stripped_copy(self):
+        from PIL import Image
+        product = Product.objects.create(sku='IMG2', name='Lamp', price=Decimal('10'))
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = SimpleUploadedFile('lamp.jpg', make_jpeg(500, 500))
+            product.save()
+        uploaded = product.image.name
+        with product.image.open('rb'), Image.open(product.image) as original:
+            self.assertEqual(original.getexif()[0x010F], 'TestCam')
+
+        run_pending_jobs()
+        product.refresh_from_db()
+        self.assertNotEqual(product.image.name, uploaded)
+        with product.image.open('rb'), Image.open(product.image) as stored:
+            self.assertEqual(len(stored.getexif()), 0)
+        self.assertEqual(ImageAsset.objects.get().name, product.image.name)
+        self.assertEqual(Job.objects.filter(job_type='image_variants').count(), 1)
+
+
+class WebsiteSyncTests(TestCase):
+    """Website Controller saves only write what changed"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='editor', password='pass', is_staff=True))
+
+    def save(self, payload):
+        return self.client.post('/api/website/save-all/', payload, content_type='application/json')
+
+    def test_collection_is_diffed_against_current_rows(self):
+        kept = WebsiteFAQ.objects.create(question='Returns?', answer='30 days', category='returns')
+        edited = WebsiteFAQ.objects.create(question='Shipping?', answer='Free')
+        removed = WebsiteFAQ.objects.create(question='Old?', answer='Gone')
+        unlisted = WebsiteFAQ.objects.create(question='Warranty?', answer='2 years')
+        kept_stamp = WebsiteFAQ.objects.get(pk=kept.pk).updated_at
+
+        response = self.save({'faqs': [
+            {'id': kept.id, 'question': 'Returns?', 'answer': '30 days', 'category': 'returns'},
+            {'id': edited.id, 'question': 'Shipping?', 'answer': 'Paid'},
+            {'id': 1760000000000, 'question': 'Payment?', 'answer': 'Card'},
+        ], 'deleted': {'faqs': [removed.id]}})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['changes']['faqs'], {'created': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1})
+        self.assertEqual(WebsiteFAQ.objects.get(pk=edited.pk).answer, 'Paid')
+        self.assertEqual(WebsiteFAQ.objects.get(pk=kept.pk).updated_at, kept_stamp)
+        self.assertFalse(WebsiteFAQ.objects.filter(pk=removed.pk).exists())
+        self.assertTrue(WebsiteFAQ.objects.filter(pk=unlisted.pk).exists())
+        self.assertTrue(WebsiteFAQ.objects.filter(question='Payment?').exists())
+
+    def test_empty_lists_delete_nothing(self):
+        WebsiteFAQ.objects.create(question='Shipping?', answer='Free')
+        WebsiteStory.objects.create(title='Hidden', excerpt='', author='', is_active=False)
+
+        response = self.save({'stories': [], 'testimonials': [], 'gallery': [], 'faqs': [], 'partners': []})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['changes']['stories']['deleted'], 0)
+        self.assertEqual((WebsiteFAQ.objects.count(), WebsiteStory.objects.count()), (1, 1))
+
+    def test_anonymous_saves_are_refused(self):
+        faq = WebsiteFAQ.objects.create(question='Shipping?', answer='Free')
+        self.client.logout()
+        response = self.save({'faqs': [{'id': faq.id, 'question': 'Hacked?'}], 'deleted': {'faqs': [faq.id]}})
+        self.assertIn(response.status_code, (401, 403))
+        self.assertEqual(WebsiteFAQ.objects.get(pk=faq.pk).question, 'Shipping?')
+
+    def test_save_query_count_does_not_grow_with_items(self):
+        for index in range(20):
+            WebsitePartner.objects.create(name=f'Partner {index}', logo_url='', link='')
+        partners = [{'id': partner.id, 'name': partner.name, 'logo': '', 'link': ''} for partner in WebsitePartner.objects.all()]
+        partners[0]['name'] = 'Renamed'
+        partners += [{'id': 1760000000000 + index, 'name': f'New {index}'} for index in range(10)]
+
+        # session, user, savepoint, current rows, bulk insert, bulk update, content version, release
+        with self.assertNumQueries(8):
+            response = self.save({'partners': partners})
+        self.assertEqual(response.json()['changes']['partners'], {'created': 10, 'updated': 1, 'deleted': 0, 'unchanged': 19})
+
+        partners = [{'id': partner.id, 'name': partner.name, 'logo': '', 'link': ''} for partner in WebsitePartner.objects.all()]
+        with self.assertNumQueries(5):  # session, user, savepoint, current rows, release
+            response = self.save({'partners': partners})
+        self.assertEqual(response.json()['changes']['partners']['unchanged'], 30)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Hash-named media files and the garbage collector"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.storage = media_storage.ContentAddressedStorage()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def age(self, name, hours=48):
+        path = self.storage.path(name)
+        stamp = os.stat(path).st_mtime - hours * 3600
+        os.utime(path, (stamp, stamp))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.storage.save('products/a.JPG', SimpleUploadedFile('a.JPG', b'same bytes'))
+        second = self.storage.save('homepage/hero/b.jpg', SimpleUploadedFile('b.jpg', b'same bytes'))
+        third = self.storage.save('products/a.jpg', SimpleUploadedFile('a.jpg', b'other bytes'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertTrue(first.startswith('cas/') and first.endswith('.jpg'))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.media_root, 'cas'))), sorted({first[4:6], third[4:6]}))
+
+        # Shared files survive delete(); the collector removes them
+        self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+
+    def test_collector_sweeps_unreferenced_files(self):
+        kept = self.storage.save('x.jpg', SimpleUploadedFile('x.jpg', b'product image'))
+        linked = self.storage.save('y.jpg', SimpleUploadedFile('y.jpg', b'gallery image'))
+        orphan = self.storage.save('z.jpg', SimpleUploadedFile('z.jpg', b'replaced image'))
+        recent = self.storage.save('w.jpg', SimpleUploadedFile('w.jpg', b'just uploaded'))
+        for name in (kept, linked, orphan):
+            self.age(name)
+        Product.objects.create(sku='GC1', name='Lamp', price=Decimal('5'), image=kept)
+        WebsiteGallery.objects.create(title='Room', image_url=f'http://localhost:8000/media/{linked}')
+
+        removed, freed, _ = media_storage.collect_garbage(dry_run=True)
+        self.assertEqual(removed, [orphan])
+        self.assertTrue(self.storage.exists(orphan))
+
+        out = StringIO()
+        call_command('collect_media_garbage', stdout=out)
+        self.assertIn('Deleted 1 file(s)', out.getvalue())
+        self.assertFalse(self.storage.exists(orphan))
+        for name in (kept, linked, recent):
+            self.assertTrue(self.storage.exists(name))
+
+    def test_repeat_upload_restarts_the_grace_period(self):
+        name = self.storage.save('a.jpg', SimpleUploadedFile('a.jpg', b'unreferenced image'))
+        self.age(name)
+        self.assertEqual(self.storage.save('b.jpg', SimpleUploadedFile('b.jpg', b'unreferenced image')), name)
+
+        removed, _, _ = media_storage.collect_garbage(dry_run=True)
+        self.assertEqual(removed, [])
+
+
+class MetricsTests(TestCase):
+    """Per-endpoint metrics and the Prometheus endpoint"""
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def series(self, text, name, view, method='GET'):
+        prefix = f'{name}{{view="{view}",method="{method}"}} '
+        values = [line[len(prefix):] for line in text.splitlines() if line.startswith(prefix)]
+        return float(values[0]) if values else None
+
+    def test_requests_are_recorded_per_url_name(self):
+        health = self.client.get('/api/health/').json()
+        self.assertEqual(health['status'], 'ok')
+        self.assertTrue(health['databases']['default']['ok'])
+        self.client.get('/api/health/')
+        self.client.get('/api/no-such-endpoint/')
+
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertEqual(self.series(text, 'erp_http_requests_total', 'health_check'), 2)
+        self.assertEqual(self.series(text, 'erp_db_queries_total', 'health_check'), 2)
+        self.assertEqual(self.series(text, 'erp_http_request_errors_total', 'health_check'), 0)
+        self.assertGreater(self.series(text, 'erp_http_response_size_bytes_total', 'health_check'), 0)
+        self.assertEqual(self.series(text, 'erp_http_requests_total', 'unresolved'), 1)
+        self.assertIn(
+            'erp_http_request_duration_seconds_bucket{view="health_check",method="GET",le="+Inf"} 2', text
+        )
+
+    def test_worker_dumps_are_added_up(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        with override_settings(METRICS_DIR=directory):
+            metrics.registry.record('api_dashboard', 'GET', 500, 0.2, 100, 7, 0.05)
+            metrics.registry.flush(directory)
+            # Pretend the dump came from another worker
+            os.rename(os.path.join(directory, f'{os.getpid()}.json'), os.path.join(directory, '1.json'))
+            metrics.registry.reset()
+            metrics.registry.record('api_dashboard', 'GET', 200, 0.02, 50, 3, 0.01)
+
+            totals = metrics.collect()
+        series = totals[('api_dashboard', 'GET')]
+        self.assertEqual(series[metrics.COUNT], 2)
+        self.assertEqual(series[metrics.ERRORS], 1)
+        self.assertEqual(series[metrics.QUERIES], 10)
+        self.assertEqual(series[metrics.SIZE], 150)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token_protects_the_endpoint(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+
+class LoadDataTests(TestCase):
+    """generate_load_data builds a linked, repeatable dataset and removes it again"""
+
+    def generate(self, *extra):
+        out = StringIO()
+        call_command(
+            'generate_load_data', '--users', '20', '--companies', '3', '--products', '10', '--orders', '60',
+            '--leads', '15', '--enquiries', '10', '--activity', '40', '--batch-size', '25', *extra, stdout=out,
+        )
+        return out.getvalue()
+
+    def test_generates_linked_rows_with_historical_dates(self):
+        self.generate()
+        self.assertEqual(Order.objects.count(), 60)
+        self.assertEqual(Customer.objects.count(), 19)
+        self.assertEqual(UserProfile.objects.filter(role='staff').count(), 1)
+        self.assertFalse(OrderItem.objects.filter(order__isnull=True).exists())
+        self.assertEqual(Invoice.objects.count(), Order.objects.exclude(status__in=['pending', 'cancelled']).count())
+        for invoice in Invoice.objects.select_related('order'):
+            self.assertEqual(invoice.total_amount, invoice.order.grand_total)
+            self.assertEqual(invoice.paid_amount + invoice.balance_amount, invoice.total_amount)
+        oldest = Order.objects.order_by('order_date').first().order_date
+        self.assertLess(oldest, timezone.now() - timedelta(days=30))
+        self.assertTrue(DailySalesRollup.objects.exists())
+
+    def test_same_seed_gives_same_data_and_flush_removes_it(self):
+        self.generate()
+        first = list(Order.objects.order_by('order_number').values_list('order_number', 'status', 'grand_total'))
+        with self.assertRaises(CommandError):
+            self.generate()
+
+        output = self.generate('--flush')
+        self.assertIn('Deleted', output)
+        second = list(Order.objects.order_by('order_number').values_list('order_number', 'status', 'grand_total'))
+        self.assertEqual(first, second)
+
+        self.generate('--flush-only', '--skip-rebuild')
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='ld_').exists())
+
+
+class BenchmarkTests(TestCase):
+    """Benchmark runs through the test client and baseline comparison"""
+
+    def test_scenarios_report_latency_and_queries(self):
+        category = ProductCategory.objects.create(name='Chairs')
+        for index in range(3):
+            Product.objects.create(sku=f'BEN{index}', name=f'Oak Chair {index}', price=Decimal('50'),
+                                   stock_quantity=10, category=category)
+
+        results = benchmarks.run_benchmarks(scenarios=['catalog', 'cart', 'checkout'], requests=4, warmup=1)
+
+        self.assertEqual(results['meta']['concurrency'], 1)
+        for name in ('catalog', 'cart', 'checkout'):
+            result = results['scenarios'][name]
+            self.assertEqual((result['requests'], result['errors']), (4, 0), name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['queries_per_request'], 0)
+        self.assertEqual(results['scenarios']['cart']['queries_per_request'], 2)
+        # Checkout orders and sessions are cleaned up
+        self.assertFalse(WebsiteOrder.objects.exists())
+        self.assertEqual(Product.objects.get(sku=benchmarks.PRODUCT_SKU).stock_quantity, 10 ** 9)
+
+    def test_compare_flags_regressions(self):
+        baseline = {'scenarios': {
+            'catalog': {'p95_ms': 10.0, 'queries_per_request': 7, 'errors': 0},
+            'search': {'p95_ms': 20.0, 'queries_per_request': 5, 'errors': 0},
+        }}
+        results = {'scenarios': {
+            'catalog': {'p95_ms': 11.0, 'queries_per_request': 9, 'errors': 0},
+            'search': {'p95_ms': 30.0, 'queries_per_request': 5, 'errors': 2},
+        }}
+        problems = benchmarks.compare(results, baseline, tolerance=0.2)
+        self.assertEqual(len(problems), 3)
+        self.assertTrue(problems[0].startswith('catalog: 9 queries/request'))
+        self.assertEqual(benchmarks.compare(baseline, baseline), [])
+
+
+class NumberSequenceTests(TransactionTestCase):
+    """Document numbers allocated from NumberSequence rows"""
+
+    def setUp(self):
+        numbering.reset_cache()
+        self.addCleanup(numbering.reset_cache)
+        self.customer = make_customer()
+
+    def test_series_continues_after_existing_documents(self):
+        make_order(self.customer, 'ORD00001', Decimal('10'))
+        make_order(self.customer, 'ORD00002', Decimal('10'))
+
+        self.assertEqual(numbering.next_number('order'), 'ORD00003')
+        self.assertEqual(numbering.allocate('order', 2), ['ORD00004', 'ORD00005'])
+        self.assertEqual(NumberSequence.objects.get(name='order').next_value, 23)
+
+    def test_blocks_are_cached_outside_transactions(self):
+        self.assertEqual(numbering.next_number('payment'), 'PAY00001')
+        self.assertEqual(NumberSequence.objects.get(name='payment').next_value, 21)
+
+        with self.assertNumQueries(1):  # only the check for numbers already taken
+            self.assertEqual(numbering.allocate('payment', 3), ['PAY00002', 'PAY00003', 'PAY00004'])
+
+    def test_seed_and_allocation_skip_numbers_in_use(self):
+        # INV00001 was deleted; INV00002 and a hand-entered INV00005 remain
+        for number in ('INV00002', 'INV00005'):
+            Invoice.objects.create(invoice_number=number, customer=self.customer, total_amount=Decimal('5'),
+                                   balance_amount=Decimal('5'), invoice_date=timezone.localdate(),
+                                   due_date=timezone.localdate())
+        Lead.objects.create(lead_number=f"LEAD{timezone.localdate():%Y%m%d}0042", company_name='From enquiry')
+
+        with transaction.atomic():
+            self.assertEqual(numbering.next_number('invoice'), 'INV00006')
+        NumberSequence.objects.filter(name='invoice').update(next_value=2)
+        with transaction.atomic():
+            self.assertEqual(numbering.allocate('invoice', 2), ['INV00003', 'INV00004'])
+        with transaction.atomic():
+            self.assertEqual(numbering.next_number('invoice'), 'INV00006')
+
+        # Enquiry lead numbers fit LEAD{number} too but do not seed it
+        self.assertEqual(numbering.next_number('lead'), 'LEAD0001')
+        self.assertTrue(numbering.next_number('enquiry_lead').endswith('0043'))
+
+    def test_rollback_hands_numbers_back(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertEqual(numbering.allocate('payment', 2), ['PAY00001', 'PAY00002'])
+                raise RuntimeError
+
+        with transaction.atomic():
+            self.assertEqual(numbering.next_number('payment'), 'PAY00001')
+        self.assertEqual(NumberSequence.objects.get(name='payment').next_value, 2)
+
+    @override_settings(NUMBER_SEQUENCES={'order': {'format': 'SO-{date:%Y}-{number:03d}'}, 'quote': {'format': 'Q{number}'}})
+    def test_formats_from_settings(self):
+        self.assertEqual(numbering.next_number('order'), f'SO-{timezone.localdate().year}-001')
+        self.assertEqual(numbering.next_number('quote'), 'Q1')
+        with self.assertRaises(ValueError):
+            numbering.next_number('unknown')
+
+    def test_create_views_use_sequences(self):
+        Invoice.objects.create(invoice_number='INV00001', customer=self.customer, total_amount=Decimal('5'),
+                               balance_amount=Decimal('5'), invoice_date=timezone.localdate(),
+                               due_date=timezone.localdate())
+
+        # The failed create (no due date) hands its number back
+        response = self.client.post('/api/invoices/', {'customer_id': self.customer.id, 'amount': '20'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(numbering.next_number('invoice'), 'INV00002')
+
+        response = self.client.post('/api/leads/', {'company_name': 'Acme', 'lead_number': ''},
+                                    content_type='application/json')
+        self.assertEqual(Lead.objects.get(company_name='Acme').lead_number, 'LEAD0001')
+
+
+# 'default' stands in for the replica alias: the router's answer shows the routing
+@override_settings(REPLICA_DATABASE='default', REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Reads under a read intent go to the replica unless the client wrote"""
+
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+
+    def make_request(self, user=None, **cookies):
+        request = APIRequestFactory().get('/api/customers/')
+        request.user = user or AnonymousUser()
+        request.COOKIES.update(cookies)
+        return request
+
+    def test_writes_pin_the_rest_of_the_request(self):
+        self.assertIsNone(self.router.db_for_read(Customer))
+        with replicas.read_intent(self.make_request()):
+            self.assertEqual(self.router.db_for_read(Customer), 'default')
+            self.router.db_for_write(Lead)
+            self.assertIsNone(self.router.db_for_read(Customer))
+        self.assertIsNone(self.router.db_for_read(Customer))
+
+    def test_recent_writers_read_from_primary(self):
+        user = User(pk=7, username='writer')
+        self.addCleanup(cache.delete, replicas.pin_key(7))
+
+        def write_view(request):
+            self.router.db_for_write(Lead)
+            return HttpResponse()
+
+        request = self.make_request(user)
+        response = ReplicaMiddleware(write_view)(request)
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE]['max-age'], 5)
+        self.assertNotIn(replicas.PIN_COOKIE, ReplicaMiddleware(lambda request: HttpResponse())(request).cookies)
+
+        # The same user from another client, and the same browser signed out
+        for request in (self.make_request(user), self.make_request(**{replicas.PIN_COOKIE: '1'})):
+            with replicas.read_intent(request):
+                self.assertIsNone(self.router.db_for_read(Customer))
+
+    def test_cached_stats_are_computed_on_the_primary(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        request = self.make_request()
+        with replicas.read_intent(request):
+            stats = cached_stats(Customer, lambda: {'db': self.router.db_for_read(Customer)}, request)
+            self.assertEqual(self.router.db_for_read(Customer), 'default')
+        self.assertEqual(stats, {'db': None})
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_no_replica_configured(self):
+        view = replicas.replica_reads(lambda request: self.router.db_for_read(Customer))
+        self.assertIsNone(view(self.make_request()))
@@ -52,14 +52,18 @@ urlpatterns = [
     # API endpoints for orders
     path('api/orders/', views.OrdersAPIView.as_view(), name='api_orders_list'),
     path('api/orders/<int:order_id>/', views.OrderDetailAPIView.as_view(), name='api_order_detail'),
+    path('api/orders/export/', views.OrderExportAPIView.as_view(), name='api_order_export'),
     path('dashboard/api/orders/', views.OrdersAPIView.as_view(), name='api_orders_list_dashboard'),
     path('dashboard/api/orders/<int:order_id>/', views.OrderDetailAPIView.as_view(), name='api_order_detail_dashboard'),
+    path('dashboard/api/orders/export/', views.OrderExportAPIView.as_view(), name='api_order_export_dashboard'),
     
     # API endpoints for invoices
     path('api/invoices/', views.InvoicesAPIView.as_view(), name='api_invoices_list'),
     path('api/invoices/<int:invoice_id>/', views.InvoiceDetailAPIView.as_view(), name='api_invoice_detail'),
+    path('api/invoices/export/', views.InvoiceExportAPIView.as_view(), name='api_invoice_export'),
     path('dashboard/api/invoices/', views.InvoicesAPIView.as_view(), name='api_invoices_list_dashboard'),
     path('dashboard/api/invoices/<int:invoice_id>/', views.InvoiceDetailAPIView.as_view(), name='api_invoice_detail_dashboard'),
+    path('dashboard/api/invoices/export/', views.InvoiceExportAPIView.as_view(), name='api_invoice_export_dashboard'),
     
     # API endpoints for leads
     path('api/leads/', views.LeadsAPIView.as_view(), name='api_leads_list'),
@@ -72,8 +76,10 @@ urlpatterns = [
     # API endpoints for payments
     path('api/payments/', views.PaymentsAPIView.as_view(), name='api_payments_list'),
     path('api/payments/<int:payment_id>/', views.PaymentDetailAPIView.as_view(), name='api_payment_detail'),
+    path('api/payments/export/', views.PaymentExportAPIView.as_view(), name='api_payment_export'),
     path('dashboard/api/payments/', views.PaymentsAPIView.as_view(), name='api_payments_list_dashboard'),
     path('dashboard/api/payments/<int:payment_id>/', views.PaymentDetailAPIView.as_view(), name='api_payment_detail_dashboard'),
+    path('dashboard/api/payments/export/', views.PaymentExportAPIView.as_view(), name='api_payment_export_dashboard'),
     
     # User management API endpoints
     path('api/users/staff-finance/', views.get_staff_finance_users, name='api_get_staff_finance_users'),
@@ -1,15 +1,20 @@
 # =============== IMPORTS ===============
 import json
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+from itertools import islice
 from django.utils import timezone
 
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
-from django.db.models import Sum, Count, Q, F, Avg, FloatField
+from django.db import connections, transaction
+from django.db.models import Sum, Q, F, FloatField
 
 # REST Framework imports
 from rest_framework.views import APIView
@@ -17,14 +22,37 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import generics
 
 # Model imports
 from .models import *
+from .analytics import order_summary, daily_sales_series, orders_by_status, revenue_by_category, build_report, REPORT_TYPES
+from .pagination import paginate_queryset
+from .rollups import day_range
+from .stats_cache import cached_stats, invalidate_stats
+from .homepage import get_homepage_context
+from .conditional import conditional_get
+from . import search as search_index
+from .imports import LeadImporter, DEFAULT_BATCH_SIZE
+from .jobs import enqueue_job, save_job_upload, job_to_dict, JOB_HANDLERS
+from .stock import adjust_stock, create_erp_order_items
+from .exports import (
+    CustomerExport, LeadExport, OrderExport, InvoiceExport, PaymentExport,
+    csv_response, xlsx_response,
+)
 from .decorators import role_required, admin_required, admin_or_manager_required, finance_required, staff_required
+from .roles import get_access, tokens_for_user
+from .activity import get_client_ip, log_activity
+from .activity_archive import read_activity
+from . import images, metrics
+from .images import image_set
+from .website_sync import sync_website_data
+from .website_views import IsStaffUser
+from .numbering import next_number
+from .replicas import replica_reads
 from .serializers import (
     SiteInfoSerializer,
+    WebsiteEnquirySerializer,
     WebsiteStorySerializer,
     WebsiteTestimonialSerializer,
     WebsiteGallerySerializer,
@@ -97,7 +125,7 @@ class RegisterView(APIView):
                 )
             
             # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
             
             return Response({
                 'success': True,
@@ -146,7 +174,7 @@ class LoginView(APIView):
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             # Generate tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_for_user(user)
             
             # Update last login
             user.last_login = timezone.now()
@@ -179,46 +207,24 @@ class LoginView(APIView):
 
 
 # =============== DASHBOARD VIEWS ===============
+@method_decorator(replica_reads, name='get')
 class DashboardView(APIView):
     """Main dashboard with analytics and metrics"""
     permission_classes = [AllowAny]
     
     def get(self, request):
         try:
-            # Get date ranges
             today = datetime.now().date()
-            week_ago = today - timedelta(days=7)
-            month_ago = today - timedelta(days=30)
+            
+            # Order counts and sales for today/week/month from the daily rollup
+            summary = order_summary(today)
             
             # Basic counts
             total_customers = Customer.objects.count()
             total_products = Product.objects.count()
-            total_orders = Order.objects.count()
             total_invoices = Invoice.objects.count()
             
-            # Today's metrics
-            today_orders = Order.objects.filter(order_date__date=today).count()
-            today_sales = Order.objects.filter(
-                order_date__date=today, 
-                status='delivered'
-            ).aggregate(total=Sum('grand_total'))['total'] or 0
-            
-            # This week metrics
-            week_orders = Order.objects.filter(order_date__date__gte=week_ago).count()
-            week_sales = Order.objects.filter(
-                order_date__date__gte=week_ago,
-                status='delivered'
-            ).aggregate(total=Sum('grand_total'))['total'] or 0
-            
-            # This month metrics
-            month_orders = Order.objects.filter(order_date__date__gte=month_ago).count()
-            month_sales = Order.objects.filter(
-                order_date__date__gte=month_ago,
-                status='delivered'
-            ).aggregate(total=Sum('grand_total'))['total'] or 0
-            
             # Pending items
-            pending_orders = Order.objects.filter(status='pending').count()
             pending_invoices = Invoice.objects.filter(status='sent').count()
             
             # Low stock products
@@ -239,37 +245,7 @@ class DashboardView(APIView):
             ).order_by('-total_sold')[:5]
             
             # Sales data for chart (last 7 days)
-            sales_data = []
-            for i in range(6, -1, -1):
-                date = today - timedelta(days=i)
-                daily_sales = Order.objects.filter(
-                    order_date__date=date,
-                    status='delivered'
-                ).aggregate(total=Sum('grand_total'))['total'] or 0
-                
-                sales_data.append({
-                    'date': date.strftime('%Y-%m-%d'),
-                    'sales': float(daily_sales)
-                })
-            
-            # Orders by status
-            orders_by_status = Order.objects.values('status').annotate(
-                count=Count('id')
-            )
-            
-            # Revenue by product category
-            revenue_by_category = []
-            categories = ProductCategory.objects.all()
-            for category in categories:
-                category_revenue = OrderItem.objects.filter(
-                    product__category=category
-                ).aggregate(total=Sum('total_price'))['total'] or 0
-                
-                if category_revenue > 0:
-                    revenue_by_category.append({
-                        'category': category.name,
-                        'revenue': float(category_revenue)
-                    })
+            sales_data = daily_sales_series(today, days=7)
             
             # Recent customers
             recent_customers = Customer.objects.select_related('user').order_by('-created_at')[:5].values(
@@ -285,22 +261,22 @@ class DashboardView(APIView):
                 'stats': {
                     'total_customers': total_customers,
                     'total_products': total_products,
-                    'total_orders': total_orders,
+                    'total_orders': summary['total_orders'],
                     'total_invoices': total_invoices,
-                    'today_orders': today_orders,
-                    'today_sales': float(today_sales),
-                    'week_orders': week_orders,
-                    'week_sales': float(week_sales),
-                    'month_orders': month_orders,
-                    'month_sales': float(month_sales),
-                    'pending_orders': pending_orders,
+                    'today_orders': summary['today_orders'],
+                    'today_sales': float(summary['today_sales']),
+                    'week_orders': summary['week_orders'],
+                    'week_sales': float(summary['week_sales']),
+                    'month_orders': summary['month_orders'],
+                    'month_sales': float(summary['month_sales']),
+                    'pending_orders': summary['pending_orders'],
                     'pending_invoices': pending_invoices,
                     'low_stock': low_stock,
                 },
                 'charts': {
                     'sales_data': sales_data,
-                    'orders_by_status': list(orders_by_status),
-                    'revenue_by_category': revenue_by_category,
+                    'orders_by_status': orders_by_status(),
+                    'revenue_by_category': revenue_by_category(),
                 },
                 'recent': {
                     'orders': list(recent_orders),
@@ -319,16 +295,23 @@ class DashboardView(APIView):
 
 
 # =============== CUSTOMER API VIEWS ===============
+@method_decorator(replica_reads, name='get')
 class CustomersAPIView(APIView):
     """List and create customers"""
     permission_classes = [AllowAny]
     
+    def get_stats(self):
+        """Summary figures shown above the list, independent of filters"""
+        return {
+            'total_customers': Customer.objects.count(),
+            'total_balance': float(Customer.objects.aggregate(Sum('balance'))['balance__sum'] or 0),
+            'new_this_month': Customer.objects.filter(created_at__gte=month_start()).count()
+        }
+    
     def get(self, request):
         """Get paginated list of customers with filters"""
         try:
             # Get query parameters
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
             search = request.GET.get('search', '').strip()
             customer_type_filter = request.GET.get('customer_type', '').strip()
             
@@ -337,23 +320,13 @@ class CustomersAPIView(APIView):
             
             # Apply filters
             if search:
-                queryset = queryset.filter(
-                    Q(user__first_name__icontains=search) |
-                    Q(user__last_name__icontains=search) |
-                    Q(user__email__icontains=search) |
-                    Q(customer_code__icontains=search)
-                )
+                queryset = search_index.filter_queryset(queryset, 'customers', search)
             
             if customer_type_filter:
                 queryset = queryset.filter(customer_type=customer_type_filter)
             
-            # Get total count
-            total_count = queryset.count()
-            
-            # Apply pagination
-            start = (page - 1) * page_size
-            end = start + page_size
-            paginated_queryset = queryset[start:end]
+            # Apply pagination (page/page_size, or cursor)
+            paginated_queryset, pagination = paginate_queryset(request, queryset, 'created_at')
             
             # Format results
             results = []
@@ -380,23 +353,13 @@ class CustomersAPIView(APIView):
                 results.append(customer_data)
             
             # Get stats
-            stats = {
-                'total_customers': Customer.objects.count(),
-                'total_balance': float(Customer.objects.aggregate(Sum('balance'))['balance__sum'] or 0),
-                'new_this_month': Customer.objects.filter(
-                    created_at__month=datetime.now().month,
-                    created_at__year=datetime.now().year
-                ).count()
-            }
+            stats = cached_stats(Customer, self.get_stats, request)
             
             return Response({
                 'success': True,
                 'results': results,
-                'count': total_count,
                 'stats': stats,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size
+                **pagination
             })
             
         except Exception as e:
@@ -416,7 +379,7 @@ class CustomersAPIView(APIView):
                 if email:
                     username = email.split('@')[0]
                 else:
-                    username = f"cust{Customer.objects.count() + 1:04d}"
+                    username = next_number('customer')
                 data['username'] = username
             
             # Check if user exists
@@ -504,8 +467,8 @@ class CustomersAPIView(APIView):
             )
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_CUSTOMER',
                 table_name='customers',
                 record_id=customer.id,
@@ -576,7 +539,7 @@ class CustomerDetailAPIView(APIView):
             # Check authorization - only finance, admin, manager can update
             if request.user.is_authenticated:
                 try:
-                    user_profile = UserProfile.objects.get(user=request.user)
+                    user_profile = get_access(request).require_profile()
                     if user_profile.role not in ['finance', 'admin', 'manager']:
                         return Response({
                             'success': False,
@@ -647,8 +610,8 @@ class CustomerDetailAPIView(APIView):
             customer.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_CUSTOMER',
                 table_name='customers',
                 record_id=customer.id,
@@ -684,8 +647,8 @@ class CustomerDetailAPIView(APIView):
             customer_code = customer.customer_code
             customer.delete()
             user.delete()
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_CUSTOMER',
                 table_name='customers',
                 record_id=customer_id,
@@ -708,51 +671,37 @@ class CustomerDetailAPIView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CustomerExportAPIView(APIView):
-    """Export customers to CSV"""
+@method_decorator(replica_reads, name='get')
+class ExportAPIView(APIView):
+    """Stream an export as CSV or XLSX (?output=csv|xlsx, ?async=1 to run as a job)"""
     permission_classes = [AllowAny]
+    export_class = None
+    default_output = 'csv'
     
     def get(self, request):
         try:
-            customers = Customer.objects.select_related('user').all()
-            
-            # Format data for CSV
-            csv_data = []
-            headers = [
-                'Customer Code', 'First Name', 'Last Name', 'Email', 'Phone',
-                'Company', 'Type', 'Status', 'Credit Limit', 'Balance',
-                'Tax Number', 'Billing Address', 'Shipping Address', 'Notes',
-                'Created Date'
-            ]
-            
-            for customer in customers:
-                user = customer.user
-                profile = getattr(user, 'userprofile', None)
-                
-                row = [
-                    customer.customer_code,
-                    user.first_name or '',
-                    user.last_name or '',
-                    user.email or '',
-                    profile.phone if profile else '',
-                    getattr(customer, 'company', ''),
-                    getattr(customer, 'customer_type', 'retail'),
-                    getattr(customer, 'status', 'active'),
-                    str(customer.credit_limit),
-                    str(customer.balance),
-                    customer.tax_number or '',
-                    customer.billing_address or '',
-                    customer.shipping_address or '',
-                    getattr(customer, 'notes', ''),
-                    customer.created_at.strftime('%Y-%m-%d %H:%M:%S') if customer.created_at else ''
-                ]
-                csv_data.append(row)
+            export = self.export_class()
+            output = request.GET.get('output', self.default_output).lower()
+            
+            if request.GET.get('async') == '1' and output in ('csv', 'xlsx'):
+                job = enqueue_job('export', {'export': export.name, 'output': output}, user=request.user)
+                return job_accepted_response(job, request)
+            
+            if output == 'csv':
+                return csv_response(export)
+            if output == 'xlsx':
+                return xlsx_response(export)
+            if output == 'json':
+                return Response({
+                    'success': True,
+                    'headers': export.headers,
+                    'data': list(export.iter_rows())
+                })
             
             return Response({
-                'success': True,
-                'headers': headers,
-                'data': csv_data
-            })
+                'success': False,
+                'error': f'Unsupported output format: {output}'
+            }, status=status.HTTP_400_BAD_REQUEST)
             
         except Exception as e:
             return Response({
@@ -761,7 +710,29 @@ class CustomerExportAPIView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CustomerExportAPIView(ExportAPIView):
+    """Export customers (JSON by default, ?output=csv|xlsx to download)"""
+    export_class = CustomerExport
+    default_output = 'json'
+
+
+class OrderExportAPIView(ExportAPIView):
+    """Export orders to CSV/XLSX"""
+    export_class = OrderExport
+
+
+class InvoiceExportAPIView(ExportAPIView):
+    """Export invoices to CSV/XLSX"""
+    export_class = InvoiceExport
+
+
+class PaymentExportAPIView(ExportAPIView):
+    """Export payments to CSV/XLSX"""
+    export_class = PaymentExport
+
+
 # =============== COMPANIES API VIEWS ===============
+@method_decorator(replica_reads, name='get')
 class CompaniesAPIView(APIView):
     """List and create companies"""
     permission_classes = [AllowAny]
@@ -779,12 +750,7 @@ class CompaniesAPIView(APIView):
             
             # Apply filters
             if search:
-                queryset = queryset.filter(
-                    Q(name__icontains=search) |
-                    Q(address__icontains=search) |
-                    Q(email__icontains=search) |
-                    Q(phone__icontains=search)
-                )
+                queryset = search_index.filter_queryset(queryset, 'companies', search)
             
             # Get total count
             total_count = queryset.count()
@@ -862,8 +828,8 @@ class CompaniesAPIView(APIView):
             )
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_COMPANY',
                 table_name='companies',
                 record_id=company.id,
@@ -950,8 +916,8 @@ class CompanyDetailAPIView(APIView):
             company.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_COMPANY',
                 table_name='companies',
                 record_id=company.id,
@@ -996,8 +962,8 @@ class CompanyDetailAPIView(APIView):
             company.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_COMPANY',
                 table_name='companies',
                 record_id=company.id,
@@ -1034,8 +1000,8 @@ class CompanyDetailAPIView(APIView):
             company.delete()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_COMPANY',
                 table_name='companies',
                 record_id=company_id,
@@ -1060,6 +1026,7 @@ class CompanyDetailAPIView(APIView):
 
 
 # =============== PRODUCT API VIEWS ===============
+@method_decorator(replica_reads, name='get')
 class ProductsAPIView(APIView):
     """List and create products"""
     permission_classes = [AllowAny]
@@ -1198,8 +1165,8 @@ class ProductsAPIView(APIView):
                 product.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_PRODUCT',
                 table_name='products',
                 record_id=product.id,
@@ -1276,7 +1243,7 @@ class ProductDetailAPIView(APIView):
             # Check authorization - only finance, admin, manager can update
             if request.user.is_authenticated:
                 try:
-                    user_profile = UserProfile.objects.get(user=request.user)
+                    user_profile = get_access(request).require_profile()
                     if user_profile.role not in ['finance', 'admin', 'manager']:
                         return Response({
                             'success': False,
@@ -1295,6 +1262,9 @@ class ProductDetailAPIView(APIView):
             
             product = Product.objects.get(id=product_id)
             data = request.data
+            # Only the edited columns are written: checkouts change
+            # stock_quantity and reserved_quantity concurrently
+            changed = []
             
             # Update category if provided
             if 'category' in data and data['category']:
@@ -1302,6 +1272,7 @@ class ProductDetailAPIView(APIView):
                     name=data['category']
                 )
                 product.category = category
+                changed.append('category')
             
             # Update other fields
             update_fields = [
@@ -1310,25 +1281,36 @@ class ProductDetailAPIView(APIView):
             ]
             
             for field in update_fields:
-                if field in data:
+                if field in data and field != 'stock_quantity':
                     if field in ['price', 'cost']:
                         setattr(product, field, float(data[field]))
-                    elif field in ['stock_quantity', 'min_stock_level']:
+                    elif field == 'min_stock_level':
                         setattr(product, field, int(data[field]))
                     elif field == 'is_active':
                         setattr(product, field, bool(data[field]))
                     else:
                         setattr(product, field, data[field])
+                    changed.append(field)
             
             # Handle image upload
             if 'image' in request.FILES:
                 product.image = request.FILES['image']
-            
-            product.save()
+                changed.append('image')
+            
+            with transaction.atomic():
+                if changed:
+                    product.save(update_fields=changed)
+                # Stock edits become a logged adjustment by the difference
+                if 'stock_quantity' in data:
+                    difference = int(data['stock_quantity']) - product.stock_quantity
+                    if difference:
+                        adjust_stock(product, difference, notes='Product edit', user=request.user)
+                        # update() sends no signals
+                        transaction.on_commit(lambda: invalidate_stats(Product))
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_PRODUCT',
                 table_name='products',
                 record_id=product.id,
@@ -1357,7 +1339,7 @@ class ProductDetailAPIView(APIView):
             # Check authorization - only finance, admin, manager can delete
             if request.user.is_authenticated:
                 try:
-                    user_profile = UserProfile.objects.get(user=request.user)
+                    user_profile = get_access(request).require_profile()
                     if user_profile.role not in ['finance', 'admin', 'manager']:
                         return Response({
                             'success': False,
@@ -1384,8 +1366,8 @@ class ProductDetailAPIView(APIView):
             product.delete()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_PRODUCT',
                 table_name='products',
                 record_id=product_id,
@@ -1430,16 +1412,27 @@ class ProductCategoriesAPIView(APIView):
 
 
 # =============== ORDER API VIEWS ===============
+@method_decorator(replica_reads, name='get')
 class OrdersAPIView(APIView):
     """List and create orders"""
     permission_classes = [AllowAny]
     
+    def get_stats(self):
+        """Summary figures shown above the list, independent of filters"""
+        return {
+            'total_orders': Order.objects.count(),
+            'pending_orders': Order.objects.filter(status='pending').count(),
+            'processing_orders': Order.objects.filter(status='processing').count(),
+            'today_revenue': Order.objects.filter(
+                order_date__date=datetime.now().date(),
+                status='delivered'
+            ).aggregate(total=Sum('grand_total'))['total'] or 0
+        }
+    
     def get(self, request):
         """Get paginated list of orders with filters"""
         try:
             # Get query parameters
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
             search = request.GET.get('search', '').strip()
             status_filter = request.GET.get('status', '').strip()
             payment_filter = request.GET.get('payment_status', '').strip()
@@ -1449,12 +1442,7 @@ class OrdersAPIView(APIView):
             
             # Apply filters
             if search:
-                queryset = queryset.filter(
-                    Q(order_number__icontains=search) |
-                    Q(customer__user__first_name__icontains=search) |
-                    Q(customer__user__last_name__icontains=search) |
-                    Q(customer__user__email__icontains=search)
-                )
+                queryset = search_index.filter_queryset(queryset, 'orders', search)
             
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
@@ -1462,13 +1450,8 @@ class OrdersAPIView(APIView):
             if payment_filter:
                 queryset = queryset.filter(payment_status=payment_filter)
             
-            # Get total count
-            total_count = queryset.count()
-            
-            # Apply pagination
-            start = (page - 1) * page_size
-            end = start + page_size
-            paginated_queryset = queryset[start:end]
+            # Apply pagination (page/page_size, or cursor)
+            paginated_queryset, pagination = paginate_queryset(request, queryset, 'order_date')
             
             # Format results
             results = []
@@ -1491,24 +1474,13 @@ class OrdersAPIView(APIView):
                 })
             
             # Calculate stats
-            stats = {
-                'total_orders': Order.objects.count(),
-                'pending_orders': Order.objects.filter(status='pending').count(),
-                'processing_orders': Order.objects.filter(status='processing').count(),
-                'today_revenue': Order.objects.filter(
-                    order_date__date=datetime.now().date(),
-                    status='delivered'
-                ).aggregate(total=Sum('grand_total'))['total'] or 0
-            }
+            stats = cached_stats(Order, self.get_stats, request)
             
             return Response({
                 'success': True,
                 'results': results,
-                'count': total_count,
                 'stats': stats,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size
+                **pagination
             })
             
         except Exception as e:
@@ -1539,7 +1511,7 @@ class OrdersAPIView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Generate order number
-            order_number = data.get('order_number', f"ORD{Order.objects.count() + 1:05d}")
+            order_number = data.get('order_number') or next_number('order')
             
             # Calculate totals
             total_amount = float(data.get('total_amount', 0))
@@ -1547,24 +1519,27 @@ class OrdersAPIView(APIView):
             discount_amount = float(data.get('discount_amount', 0))
             grand_total = total_amount + tax_amount - discount_amount
             
-            # Create order
-            order = Order.objects.create(
-                order_number=order_number,
-                customer=customer,
-                total_amount=total_amount,
-                tax_amount=tax_amount,
-                discount_amount=discount_amount,
-                grand_total=grand_total,
-                status=data.get('status', 'pending'),
-                payment_status=data.get('payment_status', 'pending'),
-                shipping_address=data.get('shipping_address', customer.shipping_address or ''),
-                notes=data.get('notes', ''),
-                created_by=request.user if request.user.is_authenticated else None
-            )
+            # Create order, its items and take their stock together
+            with transaction.atomic():
+                order = Order.objects.create(
+                    order_number=order_number,
+                    customer=customer,
+                    total_amount=total_amount,
+                    tax_amount=tax_amount,
+                    discount_amount=discount_amount,
+                    grand_total=grand_total,
+                    status=data.get('status', 'pending'),
+                    payment_status=data.get('payment_status', 'pending'),
+                    shipping_address=data.get('shipping_address', customer.shipping_address or ''),
+                    notes=data.get('notes', ''),
+                    created_by=request.user if request.user.is_authenticated else None
+                )
+                if data.get('items'):
+                    create_erp_order_items(order, data['items'], user=request.user)
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_ORDER',
                 table_name='orders',
                 record_id=order.id,
@@ -1658,8 +1633,8 @@ class OrderDetailAPIView(APIView):
             order.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_ORDER',
                 table_name='orders',
                 record_id=order.id,
@@ -1694,8 +1669,8 @@ class OrderDetailAPIView(APIView):
             order.delete()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_ORDER',
                 table_name='orders',
                 record_id=order_id,
@@ -1720,15 +1695,25 @@ class OrderDetailAPIView(APIView):
 
 
 # =============== INVOICES API ===============
+@method_decorator(replica_reads, name='get')
 class InvoicesAPIView(APIView):
     """List and create invoices"""
     permission_classes = [AllowAny]
     
+    def get_stats(self):
+        """Summary figures shown above the list, independent of filters"""
+        return {
+            'total_invoices': Invoice.objects.count(),
+            'paid_invoices': Invoice.objects.filter(status='paid').count(),
+            'outstanding_amount': float(Invoice.objects.aggregate(
+                total=Sum(F('total_amount') - F('paid_amount'), output_field=FloatField())
+            )['total'] or 0),
+            'total_revenue': float(Invoice.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0)
+        }
+    
     def get(self, request):
         """Get paginated list of invoices with filters"""
         try:
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
             search = request.GET.get('search', '').strip()
             status_filter = request.GET.get('status', '').strip()
             
@@ -1744,10 +1729,8 @@ class InvoicesAPIView(APIView):
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
             
-            total_count = queryset.count()
-            start = (page - 1) * page_size
-            end = start + page_size
-            paginated_queryset = queryset[start:end]
+            # Apply pagination (page/page_size, or cursor)
+            paginated_queryset, pagination = paginate_queryset(request, queryset, 'created_at')
             
             results = []
             for invoice in paginated_queryset:
@@ -1765,23 +1748,14 @@ class InvoicesAPIView(APIView):
                     'due_date': invoice.due_date.isoformat() if invoice.due_date else ''
                 })
             
-            stats = {
-                'total_invoices': Invoice.objects.count(),
-                'paid_invoices': Invoice.objects.filter(status='paid').count(),
-                'outstanding_amount': float(Invoice.objects.aggregate(
-                    total=Sum(F('total_amount') - F('paid_amount'), output_field=FloatField())
-                )['total'] or 0),
-                'total_revenue': float(Invoice.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0)
-            }
+            # Get stats
+            stats = cached_stats(Invoice, self.get_stats, request)
             
             return Response({
                 'success': True,
                 'results': results,
-                'count': total_count,
                 'stats': stats,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size
+                **pagination
             })
         except Exception as e:
             return Response({
@@ -1808,23 +1782,25 @@ class InvoicesAPIView(APIView):
                     'error': 'Customer not found'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            invoice_number = data.get('invoice_number', f"INV{Invoice.objects.count() + 1:05d}")
             amount = float(data.get('amount', 0))
             
-            invoice = Invoice.objects.create(
-                invoice_number=invoice_number,
-                customer=customer,
-                total_amount=amount,
-                paid_amount=float(data.get('paid_amount', 0)),
-                status=data.get('status', 'draft'),
-                invoice_date=data.get('invoice_date') or datetime.now().date(),
-                due_date=data.get('due_date'),
-                notes=data.get('notes', ''),
-                created_by=request.user if request.user.is_authenticated else None
-            )
+            # Number and invoice commit together, so failed creates leave no gap
+            with transaction.atomic():
+                invoice_number = data.get('invoice_number') or next_number('invoice')
+                invoice = Invoice.objects.create(
+                    invoice_number=invoice_number,
+                    customer=customer,
+                    total_amount=amount,
+                    paid_amount=float(data.get('paid_amount', 0)),
+                    status=data.get('status', 'draft'),
+                    invoice_date=data.get('invoice_date') or datetime.now().date(),
+                    due_date=data.get('due_date'),
+                    notes=data.get('notes', ''),
+                    created_by=request.user if request.user.is_authenticated else None
+                )
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_INVOICE',
                 table_name='invoices',
                 record_id=invoice.id,
@@ -1898,8 +1874,8 @@ class InvoiceDetailAPIView(APIView):
             invoice.notes = data.get('notes', invoice.notes)
             invoice.save()
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_INVOICE',
                 table_name='invoices',
                 record_id=invoice.id,
@@ -1929,8 +1905,8 @@ class InvoiceDetailAPIView(APIView):
             invoice_number = invoice.invoice_number
             invoice.delete()
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_INVOICE',
                 table_name='invoices',
                 record_id=invoice_id,
@@ -1954,36 +1930,36 @@ class InvoiceDetailAPIView(APIView):
 
 
 # =============== LEADS API ===============
+@method_decorator(replica_reads, name='get')
 class LeadsAPIView(APIView):
     """List and create leads"""
     permission_classes = [AllowAny]
     
+    def get_stats(self):
+        """Summary figures shown above the list, independent of filters"""
+        return {
+            'total_leads': Lead.objects.count(),
+            'new_leads': Lead.objects.filter(status='new').count(),
+            'qualified_leads': Lead.objects.filter(status='qualified').count(),
+            'converted_leads': Lead.objects.filter(status='converted').count()
+        }
+    
     def get(self, request):
         """Get paginated list of leads with filters"""
         try:
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
             search = request.GET.get('search', '').strip()
             status_filter = request.GET.get('status', '').strip()
             
             queryset = Lead.objects.all()
             
             if search:
-                queryset = queryset.filter(
-                    Q(lead_number__icontains=search) |
-                    Q(contact_person__icontains=search) |
-                    Q(company_name__icontains=search) |
-                    Q(email__icontains=search) |
-                    Q(phone__icontains=search)
-                )
+                queryset = search_index.filter_queryset(queryset, 'leads', search)
             
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
             
-            total_count = queryset.count()
-            start = (page - 1) * page_size
-            end = start + page_size
-            paginated_queryset = queryset[start:end]
+            # Apply pagination (page/page_size, or cursor)
+            paginated_queryset, pagination = paginate_queryset(request, queryset, 'created_at')
             
             results = []
             for lead in paginated_queryset:
@@ -2001,21 +1977,14 @@ class LeadsAPIView(APIView):
                     'created_at': lead.created_at.isoformat() if lead.created_at else ''
                 })
             
-            stats = {
-                'total_leads': Lead.objects.count(),
-                'new_leads': Lead.objects.filter(status='new').count(),
-                'qualified_leads': Lead.objects.filter(status='qualified').count(),
-                'converted_leads': Lead.objects.filter(status='converted').count()
-            }
+            # Get stats
+            stats = cached_stats(Lead, self.get_stats, request)
             
             return Response({
                 'success': True,
                 'results': results,
-                'count': total_count,
                 'stats': stats,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size
+                **pagination
             })
         except Exception as e:
             return Response({
@@ -2028,7 +1997,7 @@ class LeadsAPIView(APIView):
         try:
             data = request.data
             
-            lead_number = data.get('lead_number', f"LEAD{Lead.objects.count() + 1:04d}")
+            lead_number = data.get('lead_number') or next_number('lead')
             
             lead = Lead.objects.create(
                 lead_number=lead_number,
@@ -2043,8 +2012,8 @@ class LeadsAPIView(APIView):
                 created_by=request.user if request.user.is_authenticated else None
             )
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_LEAD',
                 table_name='leads',
                 record_id=lead.id,
@@ -2121,8 +2090,8 @@ class LeadDetailAPIView(APIView):
             lead.notes = data.get('notes', lead.notes)
             lead.save()
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_LEAD',
                 table_name='leads',
                 record_id=lead.id,
@@ -2152,8 +2121,8 @@ class LeadDetailAPIView(APIView):
             lead_number = lead.lead_number
             lead.delete()
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_LEAD',
                 table_name='leads',
                 record_id=lead_id,
@@ -2177,75 +2146,10 @@ class LeadDetailAPIView(APIView):
 
 
 # =============== LEADS EXPORT/IMPORT ===============
-class LeadsExportAPIView(APIView):
-    """Export leads to Excel"""
-    permission_classes = [AllowAny]
-    
-    def get(self, request):
-        """Export all leads to Excel file"""
-        try:
-            from openpyxl import Workbook
-            from openpyxl.styles import Font, PatternFill, Alignment
-            from django.http import HttpResponse
-            
-            # Create workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Leads"
-            
-            # Define header style
-            header_font = Font(bold=True, color="FFFFFF")
-            header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            
-            # Add headers
-            headers = ['Lead #', 'Contact Person', 'Company', 'Email', 'Phone', 'Source', 'Status', 'Estimated Value', 'Notes', 'Created At']
-            for col_idx, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_idx)
-                cell.value = header
-                cell.font = header_font
-                cell.fill = header_fill
-                cell.alignment = header_alignment
-            
-            # Add data
-            leads = Lead.objects.all().order_by('-created_at')
-            for row_idx, lead in enumerate(leads, 2):
-                ws.cell(row=row_idx, column=1).value = lead.lead_number or f"LEAD{lead.id:04d}"
-                ws.cell(row=row_idx, column=2).value = lead.contact_person or ''
-                ws.cell(row=row_idx, column=3).value = lead.company_name or ''
-                ws.cell(row=row_idx, column=4).value = lead.email or ''
-                ws.cell(row=row_idx, column=5).value = lead.phone or ''
-                ws.cell(row=row_idx, column=6).value = lead.source or ''
-                ws.cell(row=row_idx, column=7).value = lead.status or ''
-                ws.cell(row=row_idx, column=8).value = float(lead.estimated_value or 0)
-                ws.cell(row=row_idx, column=9).value = lead.notes or ''
-                ws.cell(row=row_idx, column=10).value = lead.created_at.strftime('%Y-%m-%d %H:%M:%S') if lead.created_at else ''
-            
-            # Adjust column widths
-            ws.column_dimensions['A'].width = 12
-            ws.column_dimensions['B'].width = 20
-            ws.column_dimensions['C'].width = 25
-            ws.column_dimensions['D'].width = 25
-            ws.column_dimensions['E'].width = 15
-            ws.column_dimensions['F'].width = 15
-            ws.column_dimensions['G'].width = 12
-            ws.column_dimensions['H'].width = 15
-            ws.column_dimensions['I'].width = 30
-            ws.column_dimensions['J'].width = 18
-            
-            # Create response
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = f'attachment; filename="leads_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
-            wb.save(response)
-            
-            return response
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': str(e)
-            }, status=status.HTTP_400_BAD_REQUEST)
+class LeadsExportAPIView(ExportAPIView):
+    """Export leads to Excel (?output=csv for CSV)"""
+    export_class = LeadExport
+    default_output = 'xlsx'
 
 
 class LeadsImportAPIView(APIView):
@@ -2255,9 +2159,6 @@ class LeadsImportAPIView(APIView):
     def post(self, request):
         """Import leads from uploaded Excel file"""
         try:
-            from openpyxl import load_workbook
-            from io import BytesIO
-            
             if 'file' not in request.FILES:
                 return Response({
                     'success': False,
@@ -2265,68 +2166,43 @@ class LeadsImportAPIView(APIView):
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             uploaded_file = request.FILES['file']
+            batch_size = int(request.data.get('batch_size') or request.GET.get('batch_size') or DEFAULT_BATCH_SIZE)
             
-            # Load workbook
-            wb = load_workbook(BytesIO(uploaded_file.read()))
-            ws = wb.active
+            if request.GET.get('async') == '1' or request.data.get('async') == '1':
+                job = enqueue_job('import_leads', {
+                    'upload': save_job_upload(uploaded_file),
+                    'batch_size': batch_size
+                }, user=request.user)
+                return job_accepted_response(job, request)
             
-            imported_count = 0
-            error_count = 0
-            errors = []
+            importer = LeadImporter(
+                user=request.user if request.user.is_authenticated else None,
+                batch_size=batch_size
+            ).run(uploaded_file)
             
-            # Skip header row
-            for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
-                try:
-                    if not row[0]:  # Skip empty rows
-                        continue
-                    
-                    # Extract data from row
-                    lead_number = row[0] or f"LEAD{Lead.objects.count() + imported_count + 1:04d}"
-                    contact_person = row[1] or ''
-                    company_name = row[2] or ''
-                    email = row[3] or ''
-                    phone = row[4] or ''
-                    source = row[5] or 'other'
-                    status = row[6] or 'new'
-                    estimated_value = float(row[7]) if row[7] else None
-                    notes = row[8] or ''
-                    
-                    # Create or update lead
-                    lead, created = Lead.objects.update_or_create(
-                        lead_number=lead_number,
-                        defaults={
-                            'contact_person': contact_person,
-                            'company_name': company_name,
-                            'email': email,
-                            'phone': phone,
-                            'source': source,
-                            'status': status,
-                            'estimated_value': estimated_value,
-                            'notes': notes,
-                            'created_by': request.user if request.user.is_authenticated else None
-                        }
-                    )
-                    
-                    imported_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {row_idx}: {str(e)}")
-                    continue
+            imported_count = importer.imported
+            error_count = len(importer.errors)
             
             # Log the import
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='IMPORT_LEADS',
                 table_name='leads',
-                new_values={'imported_count': imported_count, 'error_count': error_count}
+                new_values={
+                    'imported_count': imported_count,
+                    'created_count': importer.created,
+                    'updated_count': importer.updated,
+                    'error_count': error_count
+                }
             )
             
             return Response({
                 'success': True,
                 'imported': imported_count,
+                'created': importer.created,
+                'updated': importer.updated,
                 'errors': error_count,
-                'error_details': errors if errors else None,
+                'error_details': importer.errors if importer.errors else None,
                 'message': f'Import completed: {imported_count} leads imported, {error_count} errors'
             })
         except Exception as e:
@@ -2337,15 +2213,22 @@ class LeadsImportAPIView(APIView):
 
 
 # =============== PAYMENTS API ===============
+@method_decorator(replica_reads, name='get')
 class PaymentsAPIView(APIView):
     """List and create payments"""
     permission_classes = [AllowAny]
     
+    def get_stats(self):
+        """Summary figures shown above the list, independent of filters"""
+        return {
+            'total_payments': Payment.objects.count(),
+            'total_amount': float(Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0),
+            'credit_card_payments': Payment.objects.filter(payment_method='credit_card').count()
+        }
+    
     def get(self, request):
         """Get paginated list of payments with filters"""
         try:
-            page = int(request.GET.get('page', 1))
-            page_size = int(request.GET.get('page_size', 10))
             search = request.GET.get('search', '').strip()
             payment_method_filter = request.GET.get('payment_method', '').strip()
             
@@ -2360,10 +2243,8 @@ class PaymentsAPIView(APIView):
             if payment_method_filter:
                 queryset = queryset.filter(payment_method=payment_method_filter)
             
-            total_count = queryset.count()
-            start = (page - 1) * page_size
-            end = start + page_size
-            paginated_queryset = queryset[start:end]
+            # Apply pagination (page/page_size, or cursor)
+            paginated_queryset, pagination = paginate_queryset(request, queryset, 'created_at')
             
             results = []
             for payment in paginated_queryset:
@@ -2382,20 +2263,14 @@ class PaymentsAPIView(APIView):
                     'created_at': payment.created_at.isoformat() if payment.created_at else ''
                 })
             
-            stats = {
-                'total_payments': Payment.objects.count(),
-                'total_amount': float(Payment.objects.aggregate(Sum('amount'))['amount__sum'] or 0),
-                'credit_card_payments': Payment.objects.filter(payment_method='credit_card').count()
-            }
+            # Get stats
+            stats = cached_stats(Payment, self.get_stats, request)
             
             return Response({
                 'success': True,
                 'results': results,
-                'count': total_count,
                 'stats': stats,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size
+                **pagination
             })
         except Exception as e:
             return Response({
@@ -2422,7 +2297,7 @@ class PaymentsAPIView(APIView):
                     'error': 'Invoice not found'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            payment_number = data.get('payment_number', f"PAY{Payment.objects.count() + 1:05d}")
+            payment_number = data.get('payment_number') or next_number('payment')
             amount = float(data.get('amount', 0))
             
             payment = Payment.objects.create(
@@ -2437,8 +2312,8 @@ class PaymentsAPIView(APIView):
                 created_by=request.user if request.user.is_authenticated else None
             )
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_PAYMENT',
                 table_name='payments',
                 record_id=payment.id,
@@ -2516,8 +2391,8 @@ class PaymentDetailAPIView(APIView):
             payment.payment_date = data.get('payment_date', payment.payment_date)
             payment.save()
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_PAYMENT',
                 table_name='payments',
                 record_id=payment.id,
@@ -2547,8 +2422,8 @@ class PaymentDetailAPIView(APIView):
             payment_number = payment.payment_number
             payment.delete()
             
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_PAYMENT',
                 table_name='payments',
                 record_id=payment_id,
@@ -2572,67 +2447,173 @@ class PaymentDetailAPIView(APIView):
 
 
 # =============== REPORTS VIEW ===============
+@method_decorator(replica_reads, name='get')
 class ReportsView(APIView):
-    """Generate reports"""
+    """Generate reports (?async=1 to build in the background)"""
     permission_classes = [AllowAny]
     
     def get(self, request):
         report_type = request.GET.get('type', 'sales')
         
-        if report_type == 'sales':
-            # Last 30 days sales report
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=30)
-            
-            sales_report = Order.objects.filter(
-                order_date__date__range=[start_date, end_date],
-                status='delivered'
-            ).extra({
-                'date': "DATE(order_date)"
-            }).values('date').annotate(
-                total_sales=Sum('grand_total'),
-                order_count=Count('id')
-            ).order_by('date')
+        if report_type not in REPORT_TYPES:
+            return Response({
+                'error': 'Invalid report type'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.GET.get('async') == '1':
+            job = enqueue_job('report', {'type': report_type}, user=request.user)
+            return job_accepted_response(job, request)
+        
+        return Response(build_report(report_type))
+
+
+# =============== ACTIVITY LOG ===============
+@method_decorator(replica_reads, name='get')
+class ActivityLogAPIView(APIView):
+    """Activity log for a date range, including entries already archived"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            if not get_access(request).has_role('admin', 'manager'):
+                return Response({
+                    'success': False,
+                    'error': 'Permission denied. Only managers and admins can view the activity log.'
+                }, status=status.HTTP_403_FORBIDDEN)
+            
+            start = end = None
+            if request.GET.get('from'):
+                start = day_range(datetime.strptime(request.GET['from'], '%Y-%m-%d').date(), timezone.localdate())[0]
+            if request.GET.get('to'):
+                end = day_range(timezone.localdate(), datetime.strptime(request.GET['to'], '%Y-%m-%d').date())[1]
+            user_id = int(request.GET['user']) if request.GET.get('user') else None
+            limit = min(max(int(request.GET.get('limit', 50)), 1), 500)
+            
+            entries = list(islice(read_activity(
+                start=start,
+                end=end,
+                user_id=user_id,
+                action=request.GET.get('action', '').strip(),
+                table_name=request.GET.get('table', '').strip(),
+            ), limit))
             
             return Response({
-                'report_type': 'sales',
-                'period': f'{start_date} to {end_date}',
-                'data': list(sales_report)
+                'success': True,
+                'count': len(entries),
+                'results': entries
             })
-        
-        elif report_type == 'inventory':
-            inventory_report = Product.objects.values(
-                'category__name'
-            ).annotate(
-                total_products=Count('id'),
-                total_value=Sum(F('price') * F('stock_quantity')),
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-                low_stock=Count('id', filter=Q(stock_quantity__lt=F('min_stock_level')))
-            )
+
+# =============== BACKGROUND JOBS ===============
+def job_accepted_response(job, request):
+    """202 response pointing the client at the job status endpoint"""
+    return Response({
+        'success': True,
+        'job': job_to_dict(job, request),
+        'status_url': request.build_absolute_uri(f'/api/jobs/{job.id}/')
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def visible_jobs(request):
+    """Jobs the caller may see: staff all of them, others their own"""
+    if request.user.is_authenticated and request.user.is_staff:
+        return Job.objects.all()
+    if request.user.is_authenticated:
+        return Job.objects.filter(created_by=request.user)
+    # Anonymous callers can poll the jobs they started by id
+    return Job.objects.filter(created_by__isnull=True)
+
+
+class JobsAPIView(APIView):
+    """List and enqueue background jobs"""
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        """Most recent jobs, optionally filtered by status or type"""
+        if not request.user.is_authenticated:
+            # Results link to exports; anonymous callers only poll their job by id
+            return Response({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            queryset = visible_jobs(request)
             
+            status_filter = request.GET.get('status', '').strip()
+            type_filter = request.GET.get('job_type', '').strip()
+            if status_filter:
+                queryset = queryset.filter(status=status_filter)
+            if type_filter:
+                queryset = queryset.filter(job_type=type_filter)
+            
+            limit = min(int(request.GET.get('limit', 20)), 100)
             return Response({
-                'report_type': 'inventory',
-                'data': list(inventory_report)
+                'success': True,
+                'results': [job_to_dict(job, request) for job in queryset[:limit]]
             })
-        
-        elif report_type == 'customers':
-            # Customer statistics
-            customer_report = Customer.objects.values(
-                'customer_type'
-            ).annotate(
-                total=Count('id'),
-                avg_credit_limit=Avg('credit_limit'),
-                total_balance=Sum('balance')
-            )
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    def post(self, request):
+        """
+        Enqueue a job.
+        POST data: {'job_type': 'export|import_leads|report', 'params': {...}}
+        Lead imports are sent as multipart with the workbook in 'file'.
+        """
+        try:
+            job_type = request.data.get('job_type', '')
+            if job_type not in JOB_HANDLERS:
+                return Response({
+                    'success': False,
+                    'error': f'Invalid job type. Must be one of: {", ".join(JOB_HANDLERS)}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            params = request.data.get('params') or {}
+            if isinstance(params, str):
+                params = json.loads(params)
+            params = dict(params)
             
+            if job_type == 'import_leads':
+                if 'file' not in request.FILES:
+                    return Response({
+                        'success': False,
+                        'error': 'No file provided'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                params['upload'] = save_job_upload(request.FILES['file'])
+            
+            job = enqueue_job(job_type, params, user=request.user)
+            return job_accepted_response(job, request)
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class JobDetailAPIView(APIView):
+    """Poll a background job"""
+    permission_classes = [AllowAny]
+    
+    def get(self, request, job_id):
+        try:
+            job = visible_jobs(request).get(id=job_id)
             return Response({
-                'report_type': 'customers',
-                'data': list(customer_report)
+                'success': True,
+                'job': job_to_dict(job, request)
             })
-        
-        return Response({
-            'error': 'Invalid report type'
-        }, status=status.HTTP_400_BAD_REQUEST)
+        except Job.DoesNotExist:
+            return Response({
+                'success': False,
+                'error': 'Job not found'
+            }, status=status.HTTP_404_NOT_FOUND)
 
 
 # =============== LEGACY FUNCTIONS ===============
@@ -2644,7 +2625,7 @@ def api_add_lead(request):
             data = json.loads(request.body)
             
             # Generate lead number if not provided
-            lead_number = data.get('lead_number', f"LEAD{Lead.objects.count() + 1:04d}")
+            lead_number = data.get('lead_number') or next_number('lead')
             
             lead = Lead.objects.create(
                 lead_number=lead_number,
@@ -2660,8 +2641,8 @@ def api_add_lead(request):
             )
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_LEAD',
                 table_name='leads',
                 record_id=lead.id,
@@ -2726,8 +2707,8 @@ def api_update_order_status(request, order_id):
             order.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_ORDER_STATUS',
                 table_name='orders',
                 record_id=order.id,
@@ -2743,35 +2724,19 @@ def api_update_order_status(request, order_id):
 
 
 @csrf_exempt
+@replica_reads
 def api_search(request):
-    """Search across all models"""
+    """Ranked search across customers, products, orders and leads"""
     query = request.GET.get('q', '')
     
     try:
-        results = {
-            'customers': list(Customer.objects.filter(
-                Q(user__username__icontains=query) |
-                Q(customer_code__icontains=query) |
-                Q(user__email__icontains=query)
-            ).values('id', 'customer_code', 'user__username')[:5]),
-            
-            'products': list(Product.objects.filter(
-                Q(name__icontains=query) |
-                Q(sku__icontains=query) |
-                Q(description__icontains=query)
-            ).values('id', 'name', 'sku', 'price')[:5]),
-            
-            'orders': list(Order.objects.filter(
-                Q(order_number__icontains=query) |
-                Q(customer__user__username__icontains=query)
-            ).values('id', 'order_number', 'customer__user__username', 'grand_total')[:5]),
-            
-            'leads': list(Lead.objects.filter(
-                Q(company_name__icontains=query) |
-                Q(contact_person__icontains=query) |
-                Q(email__icontains=query)
-            ).values('id', 'lead_number', 'company_name', 'contact_person')[:5]),
-        }
+        limit = min(max(int(request.GET.get('limit', search_index.DEFAULT_RESULT_LIMIT)), 1), search_index.MAX_RESULT_LIMIT)
+        types = [name for name in request.GET.get('types', '').split(',') if name]
+        unknown = [name for name in types if name not in search_index.SEARCH_ENTITIES]
+        if unknown:
+            return JsonResponse({'error': f"Unknown search type '{unknown[0]}'"}, status=400)
+        
+        results = search_index.search(query, types or ['customers', 'products', 'orders', 'leads'], limit=limit)
         
         return JsonResponse(results)
     except Exception as e:
@@ -2838,8 +2803,8 @@ def api_customer_detail_legacy(request, customer_id):
             customer.save()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='UPDATE_CUSTOMER',
                 table_name='customers',
                 record_id=customer.id,
@@ -2859,8 +2824,8 @@ def api_customer_detail_legacy(request, customer_id):
             user.delete()
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_CUSTOMER',
                 table_name='customers',
                 record_id=customer_id,
@@ -2922,10 +2887,7 @@ def api_customers_list_legacy(request):
             'total_customers': Customer.objects.count(),
             'active_customers': Customer.objects.filter(status='active').count(),
             'total_balance': float(Customer.objects.aggregate(Sum('balance'))['balance__sum'] or 0),
-            'new_this_month': Customer.objects.filter(
-                created_at__month=datetime.now().month,
-                created_at__year=datetime.now().year
-            ).count()
+            'new_this_month': Customer.objects.filter(created_at__gte=month_start()).count()
         }
         
         # Apply pagination
@@ -2974,7 +2936,7 @@ def api_delete_customer_legacy(request, customer_id):
             # Check authorization
             if request.user.is_authenticated:
                 try:
-                    user_profile = UserProfile.objects.get(user=request.user)
+                    user_profile = get_access(request).require_profile()
                     if user_profile.role not in ['finance', 'admin', 'manager']:
                         return JsonResponse({
                             'success': False,
@@ -2995,8 +2957,8 @@ def api_delete_customer_legacy(request, customer_id):
             customer.delete()
 
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='DELETE_CUSTOMER',
                 table_name='customers',
                 record_id=customer_id,
@@ -3015,30 +2977,12 @@ def api_dashboard_data(request):
     """API endpoint for dashboard data (for AJAX calls)"""
     if request.method == 'GET':
         try:
-            # Get date ranges
-            today = datetime.now().date()
-            week_ago = today - timedelta(days=7)
-            month_ago = today - timedelta(days=30)
+            # Order counts and sales from the daily rollup
+            summary = order_summary(datetime.now().date())
             
             # Basic counts
             total_customers = Customer.objects.count()
             total_products = Product.objects.count()
-            total_orders = Order.objects.count()
-            
-            # Today's sales
-            today_sales = Order.objects.filter(
-                order_date__date=today,
-                status='delivered'
-            ).aggregate(total=Sum('grand_total'))['total'] or 0
-            
-            # Month sales
-            month_sales = Order.objects.filter(
-                order_date__date__gte=month_ago,
-                status='delivered'
-            ).aggregate(total=Sum('grand_total'))['total'] or 0
-            
-            # Pending orders
-            pending_orders = Order.objects.filter(status='pending').count()
             
             # Low stock
             low_stock = Product.objects.filter(stock_quantity__lt=F('min_stock_level')).count()
@@ -3060,10 +3004,10 @@ def api_dashboard_data(request):
                 'stats': {
                     'total_customers': total_customers,
                     'total_products': total_products,
-                    'total_orders': total_orders,
-                    'today_sales': float(today_sales),
-                    'month_sales': float(month_sales),
-                    'pending_orders': pending_orders,
+                    'total_orders': summary['total_orders'],
+                    'today_sales': float(summary['today_sales']),
+                    'month_sales': float(summary['month_sales']),
+                    'pending_orders': summary['pending_orders'],
                     'low_stock': low_stock,
                 },
                 'recent_orders': list(recent_orders),
@@ -3113,8 +3057,8 @@ def api_add_customer(request):
             )
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_CUSTOMER',
                 table_name='customers',
                 record_id=customer.id,
@@ -3163,8 +3107,8 @@ def api_add_product(request):
             )
             
             # Log activity
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='CREATE_PRODUCT',
                 table_name='products',
                 record_id=product.id,
@@ -3196,26 +3140,29 @@ def api_create_order(request):
             customer = Customer.objects.get(id=data['customer'])
             
             # Use provided values or generate
-            order_number = data.get('order_number', f"ORD{Order.objects.count() + 1:05d}")
+            order_number = data.get('order_number') or next_number('order')
             total_amount = float(data.get('total_amount', 0))
             tax_amount = float(data.get('tax_amount', 0))
             discount_amount = float(data.get('discount_amount', 0))
             grand_total = float(data.get('grand_total', total_amount + tax_amount - discount_amount))
             
-            # Create order
-            order = Order.objects.create(
-                order_number=order_number,
-                customer=customer,
-                total_amount=total_amount,
-                tax_amount=tax_amount,
-                discount_amount=discount_amount,
-                grand_total=grand_total,
-                status=data.get('status', 'pending'),
-                payment_status=data.get('payment_status', 'pending'),
-                shipping_address=data.get('shipping_address', customer.shipping_address),
-                notes=data.get('notes', ''),
-                created_by=request.user if request.user.is_authenticated else None
-            )
+            # Create order, its items and take their stock together
+            with transaction.atomic():
+                order = Order.objects.create(
+                    order_number=order_number,
+                    customer=customer,
+                    total_amount=total_amount,
+                    tax_amount=tax_amount,
+                    discount_amount=discount_amount,
+                    grand_total=grand_total,
+                    status=data.get('status', 'pending'),
+                    payment_status=data.get('payment_status', 'pending'),
+                    shipping_address=data.get('shipping_address', customer.shipping_address),
+                    notes=data.get('notes', ''),
+                    created_by=request.user if request.user.is_authenticated else None
+                )
+                if data.get('items'):
+                    create_erp_order_items(order, data['items'], user=request.user)
             
             return JsonResponse({
                 'success': True,
@@ -3562,7 +3509,7 @@ def get_staff_finance_users(request):
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
     try:
-        profile = UserProfile.objects.get(user=request.user)
+        profile = get_access(request).require_profile()
         if profile.role not in ['manager', 'admin']:
             return JsonResponse({'error': 'Permission denied. Only managers and admins can view users.'}, status=403)
     except UserProfile.DoesNotExist:
@@ -3608,8 +3555,32 @@ def get_staff_finance_users(request):
 
 @csrf_exempt
 def health_check(request):
-    """Health check endpoint"""
-    return JsonResponse({'status': 'ok', 'message': 'API is working'})
+    """Health check endpoint; also times a round trip to each database"""
+    databases = {}
+    for alias in connections:
+        start = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            databases[alias] = {'ok': True, 'latency_ms': round((time.perf_counter() - start) * 1000, 2)}
+        except Exception as e:
+            databases[alias] = {'ok': False, 'error': str(e)}
+
+    healthy = all(database['ok'] for database in databases.values())
+    return JsonResponse({
+        'status': 'ok' if healthy else 'error',
+        'message': 'API is working' if healthy else 'Database unavailable',
+        'databases': databases,
+    }, status=200 if healthy else 503)
+
+
+def metrics_view(request):
+    """Request metrics in Prometheus text format; set METRICS_TOKEN to require a bearer token"""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @csrf_exempt
@@ -3629,7 +3600,7 @@ def create_staff_user(request):
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
     try:
-        profile = UserProfile.objects.get(user=request.user)
+        profile = get_access(request).require_profile()
         print(f"[DEBUG] User profile found - Role: {profile.role}")
         if profile.role not in ['manager', 'admin']:
             print(f"[ERROR] Permission denied for role: {profile.role}")
@@ -3729,7 +3700,7 @@ def create_finance_user(request):
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
     try:
-        profile = UserProfile.objects.get(user=request.user)
+        profile = get_access(request).require_profile()
         if profile.role not in ['manager', 'admin']:
             return JsonResponse({'error': 'Permission denied. Only managers and admins can create users.'}, status=403)
     except UserProfile.DoesNotExist:
@@ -3825,7 +3796,7 @@ def delete_user(request, user_id):
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
     try:
-        profile = UserProfile.objects.get(user=request.user)
+        profile = get_access(request).require_profile()
         if profile.role not in ['manager', 'admin']:
             return JsonResponse({'error': 'Permission denied. Only managers and admins can delete users.'}, status=403)
     except UserProfile.DoesNotExist:
@@ -3959,8 +3930,8 @@ def cms_add_content(request):
         )
         
         # Log activity
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='CREATE',
             table_name='CMS Content',
             record_id=content.id,
@@ -4009,8 +3980,8 @@ def cms_view_content(request, content_id):
         content.save()
         
         # Log activity
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='UPDATE',
             table_name='CMS Content',
             record_id=content.id,
@@ -4042,8 +4013,8 @@ def cms_delete_content(request, content_id):
         content.delete()
         
         # Log activity
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='DELETE',
             table_name='CMS Content',
             record_id=content_id,
@@ -4110,8 +4081,8 @@ def cms_add_page(request):
             published_at=timezone.now() if is_published else None
         )
         
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='CREATE',
             table_name='CMS Page',
             record_id=page.id,
@@ -4143,8 +4114,8 @@ def cms_view_page(request, page_id):
         
         page.save()
         
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='UPDATE',
             table_name='CMS Page',
             record_id=page.id,
@@ -4212,8 +4183,8 @@ def cms_delete_page(request, page_id):
         title = page.title
         page.delete()
         
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='DELETE',
             table_name='CMS Page',
             record_id=page_id,
@@ -4239,8 +4210,8 @@ def hero_headers_list(request):
         serializer = WebsiteHeroHeaderSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(created_by=request.user)
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='CREATE',
                 table_name='Website Hero Headers',
                 record_id=serializer.instance.id,
@@ -4267,8 +4238,8 @@ def hero_header_detail(request, header_id):
         serializer = WebsiteHeroHeaderSerializer(header, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='UPDATE',
                 table_name='Website Hero Headers',
                 record_id=header.id,
@@ -4281,8 +4252,8 @@ def hero_header_detail(request, header_id):
     elif request.method == 'DELETE':
         old_values = WebsiteHeroHeaderSerializer(header).data
         header.delete()
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='DELETE',
             table_name='Website Hero Headers',
             record_id=header_id,
@@ -4305,8 +4276,8 @@ def conducts_list(request):
         serializer = WebsiteConductSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(created_by=request.user)
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='CREATE',
                 table_name='Website Conducts',
                 record_id=serializer.instance.id,
@@ -4333,8 +4304,8 @@ def conduct_detail(request, conduct_id):
         serializer = WebsiteConductSerializer(conduct, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='UPDATE',
                 table_name='Website Conducts',
                 record_id=conduct.id,
@@ -4347,8 +4318,8 @@ def conduct_detail(request, conduct_id):
     elif request.method == 'DELETE':
         old_values = WebsiteConductSerializer(conduct).data
         conduct.delete()
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='DELETE',
             table_name='Website Conducts',
             record_id=conduct_id,
@@ -4371,8 +4342,8 @@ def product_displays_list(request):
         serializer = WebsiteProductDisplaySerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(created_by=request.user)
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='CREATE',
                 table_name='Website Product Displays',
                 record_id=serializer.instance.id,
@@ -4399,8 +4370,8 @@ def product_display_detail(request, display_id):
         serializer = WebsiteProductDisplaySerializer(display, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='UPDATE',
                 table_name='Website Product Displays',
                 record_id=display.id,
@@ -4413,8 +4384,8 @@ def product_display_detail(request, display_id):
     elif request.method == 'DELETE':
         old_values = WebsiteProductDisplaySerializer(display).data
         display.delete()
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='DELETE',
             table_name='Website Product Displays',
             record_id=display_id,
@@ -4432,8 +4403,7 @@ def website_enquiries_create(request):
         serializer = WebsiteEnquirySerializer(data=request.data)
         if serializer.is_valid():
             # Generate enquiry number
-            count = WebsiteEnquiry.objects.count() + 1
-            enquiry_number = f"ENQ{timezone.now().strftime('%Y%m%d')}{count:04d}"
+            enquiry_number = next_number('enquiry')
             
             enquiry = serializer.save(
                 enquiry_number=enquiry_number,
@@ -4441,13 +4411,12 @@ def website_enquiries_create(request):
             )
             
             # Log for admins
-            ActivityLog.objects.create(
-                user=request.user if request.user.is_authenticated else None,
+            log_activity(
+                request,
                 action='WEBSITE_ENQUIRY',
                 table_name='Website Enquiries',
                 record_id=enquiry.id,
-                new_values=WebsiteEnquirySerializer(enquiry).data,
-                ip_address=get_client_ip(request)
+                new_values=WebsiteEnquirySerializer(enquiry).data
             )
             
             return Response({
@@ -4483,8 +4452,8 @@ def website_enquiry_detail(request, enquiry_id):
         serializer = WebsiteEnquirySerializer(enquiry, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            ActivityLog.objects.create(
-                user=request.user,
+            log_activity(
+                request,
                 action='UPDATE',
                 table_name='Website Enquiries',
                 record_id=enquiry.id,
@@ -4497,8 +4466,8 @@ def website_enquiry_detail(request, enquiry_id):
     elif request.method == 'DELETE':
         old_values = WebsiteEnquirySerializer(enquiry).data
         enquiry.delete()
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='DELETE',
             table_name='Website Enquiries',
             record_id=enquiry_id,
@@ -4517,8 +4486,7 @@ def convert_enquiry_to_lead(request, enquiry_id):
     
     try:
         # Create lead from enquiry
-        lead_count = Lead.objects.count() + 1
-        lead_number = f"LEAD{timezone.now().strftime('%Y%m%d')}{lead_count:04d}"
+        lead_number = next_number('enquiry_lead')
         
         lead = Lead.objects.create(
             lead_number=lead_number,
@@ -4539,8 +4507,8 @@ def convert_enquiry_to_lead(request, enquiry_id):
         enquiry.converted_by = request.user
         enquiry.save()
         
-        ActivityLog.objects.create(
-            user=request.user,
+        log_activity(
+            request,
             action='CONVERT_ENQUIRY',
             table_name='Website Enquiries',
             record_id=enquiry_id,
@@ -4594,48 +4562,8 @@ def cms_enquiries_page(request):
 def homepage_dynamic(request):
     """Dynamic homepage using admin-managed content from models"""
     try:
-        # Get hero section
-        hero_section = HomepageHeroSection.objects.filter(is_active=True).first()
-        
-        # Get features
-        features = HomepageFeature.objects.filter(is_active=True).order_by('order')
-        
-        # Get products
-        products = Product.objects.filter(is_active=True)[:12]
-        
-        # Get sections
-        why_us_section = HomepageSection.objects.filter(section_type='why_us', is_active=True).first()
-        details_section = HomepageSection.objects.filter(section_type='details', is_active=True).first()
-        stories_section = HomepageSection.objects.filter(section_type='stories', is_active=True).first()
-        instagram_section = HomepageSection.objects.filter(section_type='instagram', is_active=True).first()
-        testimonials_section = HomepageSection.objects.filter(section_type='testimonials', is_active=True).first()
-        
-        # Get navigation items
-        navigation_items = HomepageNavigation.objects.filter(is_active=True).order_by('order')
-        
-        # Get footer sections
-        footer_sections = HomepageFooterSection.objects.filter(is_active=True).order_by('order')
-        
-        # Get social links
-        social_links = HomepageSocialLink.objects.filter(is_active=True).order_by('order')
-        
-        # Get SEO data
-        seo = HomepageSEO.objects.first()
-        
-        context = {
-            'hero_section': hero_section,
-            'features': features,
-            'products': products,
-            'why_us_section': why_us_section,
-            'details_section': details_section,
-            'stories_section': stories_section,
-            'instagram_section': instagram_section,
-            'testimonials_section': testimonials_section,
-            'navigation_items': navigation_items,
-            'footer_sections': footer_sections,
-            'social_links': social_links,
-            'seo': seo,
-        }
+        # Sections, children, navigation and footer come from one cached context
+        context = get_homepage_context()
         
         return render(request, 'website/index_dynamic.html', context)
     
@@ -4649,18 +4577,15 @@ def homepage_dynamic(request):
 
 # ============= HELPER FUNCTIONS =============
 
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+def month_start():
+    """Start of the current local month, as a range bound that can use a created_at index"""
+    today = timezone.localdate()
+    return day_range(today.replace(day=1), today)[0]
 
 
 # ============= HOMEPAGE CMS API VIEWS (FOR REACT FRONTEND) =============
 
+@method_decorator(conditional_get(HomepageHeroSection, ImageAsset), name='get')
 class HomepageHeroAPIView(APIView):
     """Get homepage hero section data"""
     permission_classes = [AllowAny]
@@ -4674,6 +4599,7 @@ class HomepageHeroAPIView(APIView):
                     'heading': hero.heading,
                     'subheading': hero.subheading,
                     'background_image': hero.background_image.url if hero.background_image else None,
+                    'background_image_set': image_set(hero.background_image.name),
                     'background_color': hero.background_color,
                     'cta_button_text': hero.cta_button_text,
                     'cta_button_url': hero.cta_button_url,
@@ -4685,6 +4611,7 @@ class HomepageHeroAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(conditional_get(HomepageFeature, HomepageSection, HomepageWhyUsItem), name='get')
 class HomepageFeaturesAPIView(APIView):
     """Get homepage features"""
     permission_classes = [AllowAny]
@@ -4745,6 +4672,7 @@ class HomepageFeaturesAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(conditional_get(HomepageSection, HomepageDetailCard), name='get')
 class HomepageDetailsAPIView(APIView):
     """Get details section with cards"""
     permission_classes = [AllowAny]
@@ -4776,6 +4704,7 @@ class HomepageDetailsAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(conditional_get(HomepageStory), name='get')
 class HomepageStoriesAPIView(APIView):
     """Get stories section"""
     permission_classes = [AllowAny]
@@ -4802,6 +4731,7 @@ class HomepageStoriesAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(conditional_get(HomepageInstagramSection), name='get')
 class HomepageInstagramAPIView(APIView):
     """Get Instagram section"""
     permission_classes = [AllowAny]
@@ -4822,6 +4752,7 @@ class HomepageInstagramAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@method_decorator(conditional_get(HomepageTestimonial), name='get')
 class HomepageTestimonialsAPIView(APIView):
     """Get testimonials section"""
     permission_classes = [AllowAny]
@@ -4863,6 +4794,7 @@ class HomepageTestimonialsAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(conditional_get(HomepageNavigation), name='get')
 class HomepageNavigationAPIView(APIView):
     """Get navigation items"""
     permission_classes = [AllowAny]
@@ -4899,6 +4831,7 @@ class HomepageNavigationAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(conditional_get(HomepageFooterSection, HomepageFooterLink), name='get')
 class HomepageFooterAPIView(APIView):
     """Get footer sections"""
     permission_classes = [AllowAny]
@@ -4946,6 +4879,7 @@ class HomepageFooterAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(conditional_get(HomepageSocialLink), name='get')
 class HomepageSocialAPIView(APIView):
     """Get social media links"""
     permission_classes = [AllowAny]
@@ -4983,6 +4917,7 @@ class HomepageSocialAPIView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+@method_decorator(conditional_get(HomepageSEO), name='get')
 class HomepageSEOAPIView(APIView):
     """Get SEO data"""
     permission_classes = [AllowAny]
@@ -5024,6 +4959,7 @@ class HomepageSEOAPIView(APIView):
 
 # ============= SITE INFO API =============
 
+@method_decorator(conditional_get(SiteInfo), name='get')
 class SiteInfoView(generics.RetrieveUpdateAPIView):
     queryset = SiteInfo.objects.all()
     serializer_class = SiteInfoSerializer
@@ -5066,6 +5002,7 @@ class UserProfileAPIView(APIView):
 
 # ============= WEBSITE CONTENT APIs =============
 
+@method_decorator(conditional_get(WebsiteStory, ImageAsset), name='get')
 class WebsiteStoryListCreateView(generics.ListCreateAPIView):
     """Get all stories or create a new story"""
     queryset = WebsiteStory.objects.filter(is_active=True).order_by('order')
@@ -5073,6 +5010,7 @@ class WebsiteStoryListCreateView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteStory, ImageAsset), name='get')
 class WebsiteStoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a story"""
     queryset = WebsiteStory.objects.all()
@@ -5080,6 +5018,7 @@ class WebsiteStoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteTestimonial), name='get')
 class WebsiteTestimonialListCreateView(generics.ListCreateAPIView):
     """Get all testimonials or create a new one"""
     queryset = WebsiteTestimonial.objects.filter(is_active=True).order_by('-created_at')
@@ -5087,6 +5026,7 @@ class WebsiteTestimonialListCreateView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteTestimonial), name='get')
 class WebsiteTestimonialDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a testimonial"""
     queryset = WebsiteTestimonial.objects.all()
@@ -5094,6 +5034,7 @@ class WebsiteTestimonialDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteGallery, ImageAsset), name='get')
 class WebsiteGalleryListCreateView(generics.ListCreateAPIView):
     """Get all gallery items or create a new one"""
     queryset = WebsiteGallery.objects.filter(is_active=True).order_by('order')
@@ -5101,6 +5042,7 @@ class WebsiteGalleryListCreateView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteGallery, ImageAsset), name='get')
 class WebsiteGalleryDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a gallery item"""
     queryset = WebsiteGallery.objects.all()
@@ -5108,6 +5050,7 @@ class WebsiteGalleryDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteFAQ), name='get')
 class WebsiteFAQListCreateView(generics.ListCreateAPIView):
     """Get all FAQs or create a new one"""
     queryset = WebsiteFAQ.objects.filter(is_active=True).order_by('order')
@@ -5115,6 +5058,7 @@ class WebsiteFAQListCreateView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteFAQ), name='get')
 class WebsiteFAQDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete an FAQ"""
     queryset = WebsiteFAQ.objects.all()
@@ -5122,6 +5066,7 @@ class WebsiteFAQDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsitePartner), name='get')
 class WebsitePartnerListCreateView(generics.ListCreateAPIView):
     """Get all partners or create a new one"""
     queryset = WebsitePartner.objects.filter(is_active=True).order_by('order')
@@ -5129,6 +5074,7 @@ class WebsitePartnerListCreateView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsitePartner), name='get')
 class WebsitePartnerDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a partner"""
     queryset = WebsitePartner.objects.all()
@@ -5136,6 +5082,7 @@ class WebsitePartnerDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [AllowAny]
 
 
+@method_decorator(conditional_get(WebsiteHeroSection), name='get')
 class WebsiteHeroSectionView(generics.RetrieveUpdateAPIView):
     """Get or update hero section"""
     queryset = WebsiteHeroSection.objects.all()
@@ -5147,6 +5094,7 @@ class WebsiteHeroSectionView(generics.RetrieveUpdateAPIView):
         return obj
 
 
+@method_decorator(conditional_get(WebsiteCollectionsSection), name='get')
 class WebsiteCollectionsSectionView(generics.RetrieveUpdateAPIView):
     """Get or update collections section"""
     queryset = WebsiteCollectionsSection.objects.all()
@@ -5158,6 +5106,7 @@ class WebsiteCollectionsSectionView(generics.RetrieveUpdateAPIView):
         return obj
 
 
+@method_decorator(conditional_get(WebsiteQualitySection), name='get')
 class WebsiteQualitySectionView(generics.RetrieveUpdateAPIView):
     """Get or update quality/about section"""
     queryset = WebsiteQualitySection.objects.all()
@@ -5169,6 +5118,7 @@ class WebsiteQualitySectionView(generics.RetrieveUpdateAPIView):
         return obj
 
 
+@method_decorator(conditional_get(WebsiteNewsletter), name='get')
 class WebsiteNewsletterView(generics.RetrieveUpdateAPIView):
     """Get or update newsletter settings"""
     queryset = WebsiteNewsletter.objects.all()
@@ -5180,6 +5130,7 @@ class WebsiteNewsletterView(generics.RetrieveUpdateAPIView):
         return obj
 
 
+@method_decorator(conditional_get(WebsiteFurnitureDetailsSection), name='get')
 class WebsiteFurnitureDetailsSectionView(generics.RetrieveUpdateAPIView):
     """Get or update furniture details section"""
     queryset = WebsiteFurnitureDetailsSection.objects.all()
@@ -5191,6 +5142,7 @@ class WebsiteFurnitureDetailsSectionView(generics.RetrieveUpdateAPIView):
         return obj
 
 
+@method_decorator(conditional_get(WebsiteTestimonialsSectionSettings), name='get')
 class WebsiteTestimonialsSectionSettingsView(generics.RetrieveUpdateAPIView):
     """Get or update testimonials section settings"""
     queryset = WebsiteTestimonialsSectionSettings.objects.all()
@@ -5202,6 +5154,7 @@ class WebsiteTestimonialsSectionSettingsView(generics.RetrieveUpdateAPIView):
         return obj
 
 
+@method_decorator(conditional_get(WebsiteStoriesSectionSettings), name='get')
 class WebsiteStoriesSectionSettingsView(generics.RetrieveUpdateAPIView):
     """Get or update stories section settings"""
     queryset = WebsiteStoriesSectionSettings.objects.all()
@@ -5215,177 +5168,21 @@ class WebsiteStoriesSectionSettingsView(generics.RetrieveUpdateAPIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class WebsiteDataBulkSaveView(APIView):
-    """Save all website data at once (from Website Controller)"""
-    permission_classes = [AllowAny]
+    """
+    Save all website data at once (from Website Controller), staff only.
+
+    Each collection sent creates or updates that section's items and
+    ids listed under `deleted` are removed; see website_sync for how the
+    changes are diffed and applied.
+    """
+    permission_classes = [IsStaffUser]
     
     def post(self, request):
         try:
-            data = request.data
-            
-            # Save stories
-            if 'stories' in data:
-                for story in data['stories']:
-                    # Check if this is a frontend-generated ID (large number from Date.now()) or actual DB ID
-                    story_id = story.get('id')
-                    image_data = story.get('image_url') or story.get('image', '')
-                    if story_id and isinstance(story_id, (int, float)) and story_id > 1000000:
-                        # This is a frontend ID, create new record
-                        WebsiteStory.objects.create(
-                            title=story.get('title', ''),
-                            excerpt=story.get('excerpt', ''),
-                            author=story.get('author', ''),
-                            image_url=image_data,
-                        )
-                    elif story_id and WebsiteStory.objects.filter(id=story_id).exists():
-                        # This is an actual DB ID, update existing
-                        WebsiteStory.objects.filter(id=story_id).update(
-                            title=story.get('title', ''),
-                            excerpt=story.get('excerpt', ''),
-                            author=story.get('author', ''),
-                            image_url=image_data,
-                        )
-                    else:
-                        # No ID or unknown ID, create new
-                        WebsiteStory.objects.create(
-                            title=story.get('title', ''),
-                            excerpt=story.get('excerpt', ''),
-                            author=story.get('author', ''),
-                            image_url=image_data,
-                        )
-            
-            # Save testimonials
-            if 'testimonials' in data:
-                for testimonial in data['testimonials']:
-                    testimonial_id = testimonial.get('id')
-                    image_data = testimonial.get('image_url') or testimonial.get('image', '')
-                    if testimonial_id and isinstance(testimonial_id, (int, float)) and testimonial_id > 1000000:
-                        # Frontend ID, create new
-                        WebsiteTestimonial.objects.create(
-                            name=testimonial.get('name', ''),
-                            role=testimonial.get('role', ''),
-                            comment=testimonial.get('comment', ''),
-                            rating=testimonial.get('rating', 5),
-                            image_url=image_data,
-                        )
-                    elif testimonial_id and WebsiteTestimonial.objects.filter(id=testimonial_id).exists():
-                        # DB ID, update existing
-                        WebsiteTestimonial.objects.filter(id=testimonial_id).update(
-                            name=testimonial.get('name', ''),
-                            role=testimonial.get('role', ''),
-                            comment=testimonial.get('comment', ''),
-                            rating=testimonial.get('rating', 5),
-                            image_url=image_data,
-                        )
-                    else:
-                        # No ID, create new
-                        WebsiteTestimonial.objects.create(
-                            name=testimonial.get('name', ''),
-                            role=testimonial.get('role', ''),
-                            comment=testimonial.get('comment', ''),
-                            rating=testimonial.get('rating', 5),
-                            image_url=image_data,
-                        )
-            
-            # Save gallery
-            if 'gallery' in data:
-                for item in data['gallery']:
-                    item_id = item.get('id')
-                    image_data = item.get('image_url') or item.get('image', '')
-                    if item_id and isinstance(item_id, (int, float)) and item_id > 1000000:
-                        # Frontend ID, create new
-                        WebsiteGallery.objects.create(
-                            title=item.get('title', ''),
-                            image_url=image_data,
-                            category=item.get('category', 'rooms'),
-                        )
-                    elif item_id and WebsiteGallery.objects.filter(id=item_id).exists():
-                        # DB ID, update existing
-                        WebsiteGallery.objects.filter(id=item_id).update(
-                            title=item.get('title', ''),
-                            image_url=image_data,
-                            category=item.get('category', 'rooms'),
-                        )
-                    else:
-                        # No ID, create new
-                        WebsiteGallery.objects.create(
-                            title=item.get('title', ''),
-                            image_url=image_data,
-                            category=item.get('category', 'rooms'),
-                        )
-            
-            # Save FAQs
-            if 'faqs' in data:
-                for faq in data['faqs']:
-                    faq_id = faq.get('id')
-                    if faq_id and isinstance(faq_id, (int, float)) and faq_id > 1000000:
-                        # Frontend ID, create new
-                        WebsiteFAQ.objects.create(
-                            question=faq.get('question', ''),
-                            answer=faq.get('answer', ''),
-                            category=faq.get('category', 'shipping'),
-                        )
-                    elif faq_id and WebsiteFAQ.objects.filter(id=faq_id).exists():
-                        # DB ID, update existing
-                        WebsiteFAQ.objects.filter(id=faq_id).update(
-                            question=faq.get('question', ''),
-                            answer=faq.get('answer', ''),
-                            category=faq.get('category', 'shipping'),
-                        )
-                    else:
-                        # No ID, create new
-                        WebsiteFAQ.objects.create(
-                            question=faq.get('question', ''),
-                            answer=faq.get('answer', ''),
-                            category=faq.get('category', 'shipping'),
-                        )
-            
-            # Save partners
-            if 'partners' in data:
-                for partner in data['partners']:
-                    partner_id = partner.get('id')
-                    if partner_id and isinstance(partner_id, (int, float)) and partner_id > 1000000:
-                        # Frontend ID, create new
-                        WebsitePartner.objects.create(
-                            name=partner.get('name', ''),
-                            logo_url=partner.get('logo', ''),
-                            link=partner.get('link', ''),
-                        )
-                    elif partner_id and WebsitePartner.objects.filter(id=partner_id).exists():
-                        # DB ID, update existing
-                        WebsitePartner.objects.filter(id=partner_id).update(
-                            name=partner.get('name', ''),
-                            logo_url=partner.get('logo', ''),
-                            link=partner.get('link', ''),
-                        )
-                    else:
-                        # No ID, create new
-                        WebsitePartner.objects.create(
-                            name=partner.get('name', ''),
-                            logo_url=partner.get('logo', ''),
-                            link=partner.get('link', ''),
-                        )
-            
-            # Save hero section
-            if 'heroSection' in data:
-                hero_data = data['heroSection']
-                hero, created = WebsiteHeroSection.objects.get_or_create(pk=1)
-                hero.title = hero_data.get('title', '')
-                hero.subtitle = hero_data.get('subtitle', '')
-                hero.cta_text = hero_data.get('cta_text', 'Explore Products')
-                hero.image_url = hero_data.get('image', '')
-                hero.save()
-            
-            # Save newsletter
-            if 'newsletter' in data:
-                newsletter_data = data['newsletter']
-                newsletter, created = WebsiteNewsletter.objects.get_or_create(pk=1)
-                newsletter.title = newsletter_data.get('title', 'Subscribe to Our Newsletter')
-                newsletter.description = newsletter_data.get('description', '')
-                newsletter.placeholder = newsletter_data.get('placeholder', 'Enter your email')
-                newsletter.save()
-            
+            changes = sync_website_data(request.data)
             return Response({
-                'message': 'All website data saved successfully to database'
+                'message': 'All website data saved successfully to database',
+                'changes': changes,
             }, status=status.HTTP_200_OK)
         
         except Exception as e:
@@ -5394,51 +5191,51 @@ class WebsiteDataBulkSaveView(APIView):
 
 # =============== IMAGE UPLOAD VIEW ===============
 class ImageUploadView(APIView):
-    """Upload image file and return URL"""
+    """
+    Upload one image ('image') or several ('images') and return their URLs.
+    
+    Variants are rendered before responding for up to IMAGE_INLINE_LIMIT
+    files; larger batches (or ?async=1) are rendered by the job worker.
+    """
     permission_classes = [AllowAny]
     
     def post(self, request):
         try:
-            if 'image' not in request.FILES:
+            files = request.FILES.getlist('images') or request.FILES.getlist('image')
+            if not files:
                 return Response({'error': 'No image file provided'}, status=status.HTTP_400_BAD_REQUEST)
             
-            image_file = request.FILES['image']
-            
             # Validate file type
             allowed_extensions = ['jpg', 'jpeg', 'png', 'gif', 'webp']
-            file_ext = image_file.name.split('.')[-1].lower()
-            
-            if file_ext not in allowed_extensions:
-                return Response({'error': f'File type {file_ext} not allowed. Use: {", ".join(allowed_extensions)}'}, 
-                              status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create media directory if it doesn't exist
-            import os
-            from django.conf import settings
-            media_dir = settings.MEDIA_ROOT
-            if not os.path.exists(media_dir):
-                os.makedirs(media_dir)
-            
-            # Generate unique filename
-            from django.utils.text import slugify
-            import uuid
-            filename = f"{slugify(image_file.name.split('.')[0])}-{uuid.uuid4().hex[:8]}.{file_ext}"
-            filepath = os.path.join(media_dir, filename)
-            
-            # Save file
-            with open(filepath, 'wb+') as f:
-                for chunk in image_file.chunks():
-                    f.write(chunk)
-            
-            # Return URL
-            from django.urls import reverse
-            image_url = f"http://localhost:8000/media/{filename}"
-            
-            return Response({
+            for image_file in files:
+                file_ext = image_file.name.split('.')[-1].lower()
+                if file_ext not in allowed_extensions:
+                    return Response({'error': f'File type {file_ext} not allowed. Use: {", ".join(allowed_extensions)}'}, 
+                                  status=status.HTTP_400_BAD_REQUEST)
+            
+            inline = len(files) <= getattr(settings, 'IMAGE_INLINE_LIMIT', 4) and request.GET.get('async') != '1'
+            saved = images.save_uploads(files, render=inline)
+            
+            uploaded = [{
+                'image_url': request.build_absolute_uri(default_storage.url(name)),
+                'image_set': images.asset_image_set(asset) if asset else None,
+            } for name, asset in saved]
+            data = {
                 'success': True,
-                'image_url': image_url,
+                'image_url': uploaded[0]['image_url'],
+                'image_set': uploaded[0]['image_set'],
+                'images': uploaded,
                 'message': 'Image uploaded successfully'
-            }, status=status.HTTP_201_CREATED)
+            }
+            if not inline:
+                job = enqueue_job(
+                    'image_variants', {'names': [name for name, _ in saved], 'keep_names': True}, user=request.user,
+                )
+                data['job'] = job_to_dict(job, request)
+                return Response(data, status=status.HTTP_202_ACCEPTED)
+            return Response(data, status=status.HTTP_201_CREATED)
         
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Diff-based saving for the Website Controller (/api/website/save-all/).
+
+Each collection the controller posts (stories, testimonials, gallery,
+FAQs, partners) holds the items to create or update. For every
+collection in the payload, sync_collection():
+
+    1. loads the rows the items refer to in one query,
+    2. matches the items to them by id; items with no id, or an id the
+       table does not have (the controller numbers new items with
+       Date.now()), are creates,
+    3. applies the diff with one bulk_create(), one bulk_update() of the
+       rows whose values actually changed, and one delete() of the ids
+       listed under that collection in the payload's `deleted` mapping,
+       e.g. {"faqs": [...], "deleted": {"faqs": [4, 7]}}.
+
+Rows missing from a list are left alone, so an empty or partial list
+never removes content. Unchanged rows are not written, so their updated_at and content version
+stay put. The singleton hero/newsletter sections are only saved when a
+value differs.
+
+bulk_create()/bulk_update() send no signals; sync_website_data() bumps
+the content version of every model it changed.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .conditional import bump_content_version
+from .models import (
+    WebsiteFAQ, WebsiteGallery, WebsiteHeroSection, WebsiteNewsletter, WebsitePartner, WebsiteStory,
+    WebsiteTestimonial,
+)
+
+
+# ============= PAYLOAD MAPPING =============
+def story_values(item):
+    return {
+        'title': item.get('title', ''),
+        'excerpt': item.get('excerpt', ''),
+        'author': item.get('author', ''),
+        'image_url': item.get('image_url') or item.get('image', ''),
+    }
+
+
+def testimonial_values(item):
+    return {
+        'name': item.get('name', ''),
+        'role': item.get('role', ''),
+        'comment': item.get('comment', ''),
+        'rating': item.get('rating', 5),
+        'image_url': item.get('image_url') or item.get('image', ''),
+    }
+
+
+def gallery_values(item):
+    return {
+        'title': item.get('title', ''),
+        'image_url': item.get('image_url') or item.get('image', ''),
+        'category': item.get('category', 'rooms'),
+    }
+
+
+def faq_values(item):
+    return {
+        'question': item.get('question', ''),
+        'answer': item.get('answer', ''),
+        'category': item.get('category', 'shipping'),
+    }
+
+
+def partner_values(item):
+    return {
+        'name': item.get('name', ''),
+        'logo_url': item.get('logo', ''),
+        'link': item.get('link', ''),
+    }
+
+
+# Payload key: (model, item -> field values)
+COLLECTIONS = {
+    'stories': (WebsiteStory, story_values),
+    'testimonials': (WebsiteTestimonial, testimonial_values),
+    'gallery': (WebsiteGallery, gallery_values),
+    'faqs': (WebsiteFAQ, faq_values),
+    'partners': (WebsitePartner, partner_values),
+}
+
+
+def hero_values(data):
+    return {
+        'title': data.get('title', ''),
+        'subtitle': data.get('subtitle', ''),
+        'cta_text': data.get('cta_text', 'Explore Products'),
+        'image_url': data.get('image', ''),
+    }
+
+
+def newsletter_values(data):
+    return {
+        'title': data.get('title', 'Subscribe to Our Newsletter'),
+        'description': data.get('description', ''),
+        'placeholder': data.get('placeholder', 'Enter your email'),
+    }
+
+
+# Payload key: (singleton model, section data -> field values)
+SINGLETONS = {
+    'heroSection': (WebsiteHeroSection, hero_values),
+    'newsletter': (WebsiteNewsletter, newsletter_values),
+}
+
+
+# ============= DIFF =============
+def cleaned_values(model, values):
+    """Field values as the model holds them, so '5' and 5 compare equal"""
+    return {name: model._meta.get_field(name).to_python(value) for name, value in values.items()}
+
+
+def row_id(item):
+    try:
+        return int(item.get('id'))
+    except (TypeError, ValueError):
+        return None
+
+
+def row_ids(values):
+    ids = (row_id({'id': value}) for value in values or [])
+    return sorted({pk for pk in ids if pk is not None})
+
+
+def diff_collection(model, items, values_for):
+    """Return (rows to create, rows to update, changed field names, unchanged count)"""
+    fields = list(cleaned_values(model, values_for({})))
+    ids = row_ids(item.get('id') for item in items)
+    current = {row.pk: row for row in model.objects.filter(pk__in=ids).order_by().only('pk', *fields)} if ids else {}
+
+    creates, updates, changed_fields, unchanged = [], [], set(), 0
+    for item in items:
+        values = cleaned_values(model, values_for(item))
+        row = current.pop(row_id(item), None)
+        if row is None:
+            creates.append(model(**values))
+            continue
+        changed = [name for name, value in values.items() if getattr(row, name) != value]
+        if not changed:
+            unchanged += 1
+            continue
+        for name in changed:
+            setattr(row, name, values[name])
+        changed_fields.update(changed)
+        updates.append(row)
+    return creates, updates, sorted(changed_fields), unchanged
+
+
+def sync_collection(model, items, values_for, deleted=()):
+    """Create/update the rows of `model` from `items` and delete the `deleted` ids; returns the change summary"""
+    creates, updates, changed_fields, unchanged = diff_collection(model, items, values_for)
+    deletes = row_ids(deleted)
+    if creates:
+        model.objects.bulk_create(creates)
+    if updates:
+        now = timezone.now()
+        for row in updates:
+            row.updated_at = now
+        model.objects.bulk_update(updates, changed_fields + ['updated_at'])
+    deleted_count = 0
+    if deletes:
+        deleted_count = model.objects.filter(pk__in=deletes).delete()[1].get(model._meta.label, 0)
+    return {'created': len(creates), 'updated': len(updates), 'deleted': deleted_count, 'unchanged': unchanged}
+
+
+def sync_singleton(model, values):
+    """Save the pk=1 row of a singleton section if any value differs; returns whether it was written"""
+    values = cleaned_values(model, values)
+    row, created = model.objects.get_or_create(pk=1, defaults=values)
+    if created:
+        return True
+    changed = [name for name, value in values.items() if getattr(row, name) != value]
+    if not changed:
+        return False
+    for name in changed:
+        setattr(row, name, values[name])
+    row.save(update_fields=changed + ['updated_at'])
+    return True
+
+
+def sync_website_data(data):
+    """
+    Apply a Website Controller payload in one transaction. Returns
+    {payload key: summary}; collections get created/updated/deleted/
+    unchanged counts and singleton sections whether they were saved.
+    """
+    changes = {}
+    changed_models = []
+    deleted = data.get('deleted') or {}
+    if not isinstance(deleted, dict):
+        raise ValueError("'deleted' must map collection names to id lists")
+    with transaction.atomic():
+        for key, (model, values_for) in COLLECTIONS.items():
+            if key not in data and not deleted.get(key):
+                continue
+            summary = sync_collection(model, data.get(key) or [], values_for, deleted.get(key))
+            changes[key] = summary
+            if summary['created'] or summary['updated']:
+                changed_models.append(model)
+        for key, (model, values_for) in SINGLETONS.items():
+            if key in data:
+                changes[key] = {'saved': sync_singleton(model, values_for(data[key] or {}))}
+        if changed_models:
+            # Deletes send post_delete, which bumps the version already
+            bump_content_version(*changed_models)
+    return changes
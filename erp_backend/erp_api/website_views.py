@@ -7,7 +7,20 @@ from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.models import User
 from django.conf import settings
-from erp_api.models import Lead, Product, CMSContent, CMSPage, CMSPageSection
+from django.db import transaction
+from erp_api.models import Lead, Product, ProductCategory, CMSContent, CMSPage, CMSPageSection, ImageAsset
+from erp_api.activity import get_client_ip
+from erp_api.cart import resolve_cart, create_order_items
+from erp_api.catalog import CatalogQuery, category_counts, stock_state
+from erp_api.conditional import conditional_get
+from erp_api.homepage import get_homepage_context
+from erp_api.images import image_set, image_sets
+from erp_api.numbering import next_number
+from erp_api.replicas import replica_reads
+from erp_api.roles import get_access
+from erp_api.stock import (
+    InsufficientStock, commit_order_stock, hold_order_stock, release_order_stock, sell_order_stock,
+)
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, BasePermission, AllowAny
 import json
@@ -18,59 +31,13 @@ import uuid
 class IsStaffUser(BasePermission):
     """Allow access only to staff/admin users"""
     def has_permission(self, request, view):
-        return request.user and (request.user.is_staff or request.user.is_superuser)
+        return get_access(request).is_staff
 
 def website_home(request):
     """Main website homepage with dynamic content from admin"""
     try:
-        # Import models here to avoid circular imports
-        from erp_api.models import (
-            HomepageHeroSection, HomepageFeature, HomepageSection, 
-            HomepageNavigation, HomepageFooterSection, HomepageSocialLink, HomepageSEO
-        )
-        
-        # Get hero section
-        hero_section = HomepageHeroSection.objects.filter(is_active=True).first()
-        
-        # Get features
-        features = HomepageFeature.objects.filter(is_active=True).order_by('order')
-        
-        # Get products
-        products = Product.objects.filter(is_active=True)[:12]
-        
-        # Get sections
-        why_us_section = HomepageSection.objects.filter(section_type='why_us', is_active=True).first()
-        details_section = HomepageSection.objects.filter(section_type='details', is_active=True).first()
-        stories_section = HomepageSection.objects.filter(section_type='stories', is_active=True).first()
-        instagram_section = HomepageSection.objects.filter(section_type='instagram', is_active=True).first()
-        testimonials_section = HomepageSection.objects.filter(section_type='testimonials', is_active=True).first()
-        
-        # Get navigation items
-        navigation_items = HomepageNavigation.objects.filter(is_active=True).order_by('order')
-        
-        # Get footer sections
-        footer_sections = HomepageFooterSection.objects.filter(is_active=True).order_by('order')
-        
-        # Get social links
-        social_links = HomepageSocialLink.objects.filter(is_active=True).order_by('order')
-        
-        # Get SEO data
-        seo = HomepageSEO.objects.first()
-        
-        context = {
-            'hero_section': hero_section,
-            'features': features,
-            'products': products,
-            'why_us_section': why_us_section,
-            'details_section': details_section,
-            'stories_section': stories_section,
-            'instagram_section': instagram_section,
-            'testimonials_section': testimonials_section,
-            'navigation_items': navigation_items,
-            'footer_sections': footer_sections,
-            'social_links': social_links,
-            'seo': seo,
-        }
+        # Sections, children, navigation and footer come from one cached context
+        context = get_homepage_context()
         
         return render(request, 'website/index_dynamic.html', context)
     
@@ -205,8 +172,7 @@ def submit_inquiry(request):
         message = data.get('message', '').strip()
         
         # Generate unique lead number
-        lead_count = Lead.objects.count() + 1
-        lead_number = f"WEB-{lead_count:06d}"
+        lead_number = next_number('website_lead')
         
         # Combine message and product interest in notes
         notes = f"Product Interest: {product_interest}\n\nInquiry Message:\n{message}"
@@ -389,6 +355,7 @@ def cms_testimonials(request):
     return render(request, 'website/cms_testimonials.html', context)
 
 @csrf_exempt
+@conditional_get(CMSPage, CMSPageSection, CMSContent)
 def api_cms_page(request, page_slug):
     """
     API endpoint to get CMS page data as JSON
@@ -420,6 +387,7 @@ def api_cms_page(request, page_slug):
         return JsonResponse({'success': False, 'error': 'Page not found'}, status=404)
 
 @csrf_exempt
+@conditional_get(CMSContent, ImageAsset)
 def api_cms_content(request, content_slug):
     """
     API endpoint to get CMS content data as JSON
@@ -434,6 +402,7 @@ def api_cms_content(request, content_slug):
                 'description': content.description,
                 'type': content.content_type,
                 'image': content.image.url if content.image else None,
+                'image_set': image_set(content.image.name),
                 'is_featured': content.is_featured,
                 'created_at': content.created_at.isoformat(),
             }
@@ -442,6 +411,7 @@ def api_cms_content(request, content_slug):
         return JsonResponse({'success': False, 'error': 'Content not found'}, status=404)
 
 @csrf_exempt
+@conditional_get(CMSContent, ImageAsset)
 def api_cms_list(request, content_type=None):
     """
     API endpoint to list CMS content items
@@ -453,7 +423,8 @@ def api_cms_list(request, content_type=None):
         if content_type:
             items = items.filter(content_type=content_type)
         
-        items = items.order_by('order', '-created_at')
+        items = list(items.order_by('order', '-created_at'))
+        sets = image_sets([item.image.name for item in items])
         
         content_list = []
         for item in items:
@@ -463,6 +434,7 @@ def api_cms_list(request, content_type=None):
                 'slug': item.slug,
                 'type': item.content_type,
                 'image': item.image.url if item.image else None,
+                'image_set': sets.get(item.image.name),
                 'is_featured': item.is_featured,
             })
         
@@ -600,22 +572,12 @@ def website_cart(request):
     """Shopping cart page"""
     cart_data = request.session.get('cart', {})
     
-    from erp_api.models import Product
-    products = []
-    total = 0
-    
-    for product_id, quantity in cart_data.items():
-        try:
-            product = Product.objects.get(id=int(product_id))
-            item_total = float(product.price) * quantity
-            total += item_total
-            products.append({
-                'product': product,
-                'quantity': quantity,
-                'item_total': item_total
-            })
-        except Product.DoesNotExist:
-            pass
+    cart = resolve_cart(cart_data)
+    products = [
+        {'product': line.product, 'quantity': line.quantity, 'item_total': line.item_total}
+        for line in cart
+    ]
+    total = cart.total
     
     context = {
         'cart_items': products,
@@ -629,7 +591,7 @@ def website_checkout(request):
         from django.urls import reverse
         return redirect(f'{reverse("website:login")}?next={request.path}')
     
-    from erp_api.models import Customer, Product
+    from erp_api.models import Customer
     from django.conf import settings
     
     try:
@@ -642,21 +604,12 @@ def website_checkout(request):
     if not cart_data:
         return redirect('website:cart')
     
-    products = []
-    total = 0
-    
-    for product_id, quantity in cart_data.items():
-        try:
-            product = Product.objects.get(id=int(product_id))
-            item_total = float(product.price) * quantity
-            total += item_total
-            products.append({
-                'product': product,
-                'quantity': quantity,
-                'item_total': item_total
-            })
-        except Product.DoesNotExist:
-            pass
+    cart = resolve_cart(cart_data)
+    products = [
+        {'product': line.product, 'quantity': line.quantity, 'item_total': line.item_total}
+        for line in cart
+    ]
+    total = cart.total
     
     context = {
         'customer': customer,
@@ -760,31 +713,22 @@ def api_remove_from_cart(request):
 @require_http_methods(['GET'])
 def api_get_cart(request):
     """Get current cart"""
-    from erp_api.models import Product
-    
-    cart_data = request.session.get('cart', {})
-    products = []
-    total = 0
-    
-    for product_id, quantity in cart_data.items():
-        try:
-            product = Product.objects.get(id=int(product_id))
-            item_total = float(product.price) * quantity
-            total += item_total
-            products.append({
-                'id': product.id,
-                'name': product.name,
-                'price': float(product.price),
-                'quantity': quantity,
-                'item_total': item_total
-            })
-        except Product.DoesNotExist:
-            pass
+    cart = resolve_cart(request.session.get('cart', {}))
+    products = [
+        {
+            'id': line.product.id,
+            'name': line.product.name,
+            'price': float(line.unit_price),
+            'quantity': line.quantity,
+            'item_total': float(line.item_total)
+        }
+        for line in cart
+    ]
     
     return JsonResponse({
         'success': True,
         'items': products,
-        'total': total,
+        'total': float(cart.total),
         'item_count': len(products)
     })
 
@@ -795,9 +739,8 @@ def api_checkout(request):
     if not request.user.is_authenticated:
         return JsonResponse({'success': False, 'error': 'Please login to checkout'}, status=401)
     
-    from erp_api.models import Customer, WebsiteOrder, WebsiteOrderItem, Product
-    import uuid
-    from django.utils import timezone
+    from erp_api.models import Customer, WebsiteOrder
+    from django.db import transaction
     
     try:
         customer = Customer.objects.get(user=request.user)
@@ -821,32 +764,20 @@ def api_checkout(request):
         if payment_method not in ['card', 'cod']:
             return JsonResponse({'success': False, 'error': 'Invalid payment method'}, status=400)
         
-        # Calculate totals
-        total_amount = Decimal('0')
-        items_data = []
+        # Price the cart with one product query
+        cart = resolve_cart(cart_data)
+        if cart.missing_ids:
+            return JsonResponse({'success': False, 'error': f'Product {cart.missing_ids[0]} not found'}, status=404)
         
-        for product_id, quantity in cart_data.items():
-            try:
-                product = Product.objects.get(id=int(product_id))
-                
-                # Check stock
-                if product.stock_quantity < quantity:
-                    return JsonResponse({
-                        'success': False,
-                        'error': f'Insufficient stock for {product.name}'
-                    }, status=400)
-                
-                item_total = product.price * Decimal(quantity)
-                total_amount += item_total
-                
-                items_data.append({
-                    'product': product,
-                    'quantity': quantity,
-                    'unit_price': product.price,
-                    'total_price': item_total
-                })
-            except Product.DoesNotExist:
-                return JsonResponse({'success': False, 'error': f'Product {product_id} not found'}, status=404)
+        # Fail fast on stock; create_order_items re-checks atomically
+        short_line = cart.out_of_stock()
+        if short_line:
+            return JsonResponse({
+                'success': False,
+                'error': f'Insufficient stock for {short_line.product.name}'
+            }, status=400)
+        
+        total_amount = cart.total
         
         # Create order
         order_number = f"WEB-{uuid.uuid4().hex[:8].upper()}"
@@ -857,32 +788,25 @@ def api_checkout(request):
         else:
             initial_payment_status = 'pending'  # COD - payment pending until received
         
-        order = WebsiteOrder.objects.create(
-            order_number=order_number,
-            customer=customer,
-            total_amount=total_amount,
-            grand_total=total_amount,
-            shipping_address=shipping_address,
-            billing_address=billing_address or shipping_address,
-            payment_method=payment_method,
-            payment_status=initial_payment_status,
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
-        # Create order items
-        for item in items_data:
-            WebsiteOrderItem.objects.create(
-                order=order,
-                product=item['product'],
-                quantity=item['quantity'],
-                unit_price=item['unit_price'],
-                total_price=item['total_price']
-            )
-            
-            # Reduce stock
-            item['product'].stock_quantity -= item['quantity']
-            item['product'].save()
+        try:
+            with transaction.atomic():
+                order = WebsiteOrder.objects.create(
+                    order_number=order_number,
+                    customer=customer,
+                    total_amount=total_amount,
+                    grand_total=total_amount,
+                    shipping_address=shipping_address,
+                    billing_address=billing_address or shipping_address,
+                    payment_method=payment_method,
+                    payment_status=initial_payment_status,
+                    ip_address=get_client_ip(request),
+                    user_agent=request.META.get('HTTP_USER_AGENT', '')
+                )
+                
+                # COD sells the stock now; card holds it until payment is confirmed
+                create_order_items(order, cart.lines, hold=payment_method == 'card')
+        except InsufficientStock as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
         
         # For COD, clear cart and redirect to confirmation
         if payment_method == 'cod':
@@ -912,20 +836,12 @@ def api_checkout(request):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-def get_client_ip(request):
-    """Get client IP address"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
 # ============================================
 # PRODUCT DETAIL API
 # ============================================
 
 @require_http_methods(['GET'])
+@replica_reads
 def api_product_detail(request, product_id):
     """Get full product details for modal display"""
     from erp_api.models import Product
@@ -942,8 +858,9 @@ def api_product_detail(request, product_id):
             'stock_quantity': product.stock_quantity,
             'category': product.category or '',
             'image_url': product.image.url if product.image else None,
-            'in_stock': product.stock_quantity > 0,
-            'low_stock': product.stock_quantity < 10 and product.stock_quantity > 0,
+            'available_quantity': product.available_quantity,
+            'in_stock': product.available_quantity > 0,
+            'low_stock': 0 < product.available_quantity < 10,
         }
         
         return JsonResponse({
@@ -1018,6 +935,14 @@ def api_confirm_payment(request):
         order.stripe_payment_intent_id = payment_intent_id
         order.payment_status = 'paid'
         order.status = 'confirmed'
+        
+        # Turn the checkout holds into sales
+        try:
+            commit_order_stock(website_order=order)
+        except InsufficientStock as e:
+            # Paid after the hold expired and the stock sold out
+            order.status = 'pending'
+            order.notes = f"{order.notes or ''}\n{e} when payment was confirmed".strip()
         order.save()
         
         return JsonResponse({
@@ -1066,10 +991,10 @@ def api_buy_now(request):
             return JsonResponse({'success': False, 'error': 'Product not found'}, status=404)
         
         # Check stock
-        if product.stock_quantity < quantity:
+        if product.available_quantity < quantity:
             return JsonResponse({
                 'success': False,
-                'error': f'Insufficient stock. Available: {product.stock_quantity}'
+                'error': f'Insufficient stock. Available: {product.available_quantity}'
             }, status=400)
         
         # Calculate total
@@ -1077,32 +1002,31 @@ def api_buy_now(request):
         
         # Create order
         order_number = f"BUY-{uuid.uuid4().hex[:8].upper()}"
-        order = WebsiteOrder.objects.create(
-            order_number=order_number,
-            customer=customer,
-            total_amount=total_amount,
-            grand_total=total_amount,
-            shipping_address='',  # To be filled by customer
-            billing_address='',
-            payment_method='cod',  # Default to COD, can be changed
-            payment_status='pending',
-            status='pending',
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')
-        )
-        
-        # Create order item
-        WebsiteOrderItem.objects.create(
-            order=order,
-            product=product,
-            quantity=quantity,
-            unit_price=product.price,
-            total_price=total_amount
-        )
-        
-        # Reduce stock
-        product.stock_quantity -= quantity
-        product.save()
+        with transaction.atomic():
+            order = WebsiteOrder.objects.create(
+                order_number=order_number,
+                customer=customer,
+                total_amount=total_amount,
+                grand_total=total_amount,
+                shipping_address='',  # To be filled by customer
+                billing_address='',
+                payment_method='cod',  # Default to COD, can be changed
+                payment_status='pending',
+                status='pending',
+                ip_address=get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
+            )
+            
+            WebsiteOrderItem.objects.create(
+                order=order,
+                product=product,
+                quantity=quantity,
+                unit_price=product.price,
+                total_price=total_amount
+            )
+            
+            # Hold the stock until the customer completes checkout
+            hold_order_stock([(product, quantity)], website_order=order)
         
         return JsonResponse({
             'success': True,
@@ -1175,7 +1099,12 @@ def api_update_order_address(request):
         order.shipping_address = shipping_address
         order.billing_address = billing_address or shipping_address
         order.payment_method = payment_method
-        order.save()
+        
+        with transaction.atomic():
+            order.save()
+            # A COD order is placed once the address is in; card orders wait for payment
+            if payment_method == 'cod':
+                commit_order_stock(website_order=order)
         
         return JsonResponse({
             'success': True,
@@ -1224,7 +1153,7 @@ def api_process_buy_cod(request):
         
         # Get product
         product = Product.objects.get(id=product_id)
-        if product.stock_quantity < quantity:
+        if product.available_quantity < quantity:
             return JsonResponse({'success': False, 'error': 'Insufficient stock'}, status=400)
         
         # Get or create customer (or use existing)
@@ -1244,36 +1173,36 @@ def api_process_buy_cod(request):
         # Generate order number
         order_number = f"BUY-{uuid.uuid4().hex[:8].upper()}"
         
-        # Create order
-        order = WebsiteOrder.objects.create(
-            order_number=order_number,
-            customer=customer,
-            customer_name=customer_name,
-            customer_email=customer_email,
-            customer_phone=customer_phone,
-            shipping_address=shipping_address,
-            billing_address=billing_address or shipping_address,
-            payment_method='cod',
-            payment_status='pending',
-            status='pending',
-            total_amount=product.price * quantity,
-            grand_total=product.price * quantity,
-            ip_address=request.META.get('REMOTE_ADDR', ''),
-            user_agent=request.META.get('HTTP_USER_AGENT', ''),
-        )
-        
-        # Create order item
-        WebsiteOrderItem.objects.create(
-            order=order,
-            product=product,
-            quantity=quantity,
-            unit_price=product.price,
-            total_price=product.price * quantity,
-        )
-        
-        # Reduce stock
-        product.stock_quantity -= quantity
-        product.save()
+        with transaction.atomic():
+            # Create order
+            order = WebsiteOrder.objects.create(
+                order_number=order_number,
+                customer=customer,
+                customer_name=customer_name,
+                customer_email=customer_email,
+                customer_phone=customer_phone,
+                shipping_address=shipping_address,
+                billing_address=billing_address or shipping_address,
+                payment_method='cod',
+                payment_status='pending',
+                status='pending',
+                total_amount=product.price * quantity,
+                grand_total=product.price * quantity,
+                ip_address=request.META.get('REMOTE_ADDR', ''),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            )
+            
+            # Create order item
+            WebsiteOrderItem.objects.create(
+                order=order,
+                product=product,
+                quantity=quantity,
+                unit_price=product.price,
+                total_price=product.price * quantity,
+            )
+            
+            # Take the stock in the same transaction as the order
+            sell_order_stock([(product, quantity)], website_order=order)
         
         return JsonResponse({
             'success': True,
@@ -1321,7 +1250,7 @@ def api_process_buy_card(request):
         
         # Get product
         product = Product.objects.get(id=product_id)
-        if product.stock_quantity < quantity:
+        if product.available_quantity < quantity:
             return JsonResponse({'success': False, 'error': 'Insufficient stock'}, status=400)
         
         # Get or create customer (or use existing)
@@ -1338,47 +1267,59 @@ def api_process_buy_card(request):
                 tax_number=''
             )
         
-        # Create order
-        amount = int(product.price * quantity * 100)  # Convert to cents
-        
-        intent = stripe.PaymentIntent.create(
-            amount=amount,
-            currency='usd',
-            metadata={
-                'customer_email': customer_email,
-                'customer_name': customer_name,
-            }
-        )
-        
         # Generate order number
         order_number = f"BUY-{uuid.uuid4().hex[:8].upper()}"
         
-        order = WebsiteOrder.objects.create(
-            order_number=order_number,
-            customer=customer,
-            customer_name=customer_name,
-            customer_email=customer_email,
-            customer_phone=customer_phone,
-            shipping_address=shipping_address,
-            billing_address=billing_address or shipping_address,
-            payment_method='card',
-            payment_status='processing',
-            status='processing',
-            total_amount=product.price * quantity,
-            grand_total=product.price * quantity,
-            stripe_payment_intent_id=intent.id,
-            ip_address=request.META.get('REMOTE_ADDR', ''),
-            user_agent=request.META.get('HTTP_USER_AGENT', ''),
-        )
+        with transaction.atomic():
+            order = WebsiteOrder.objects.create(
+                order_number=order_number,
+                customer=customer,
+                customer_name=customer_name,
+                customer_email=customer_email,
+                customer_phone=customer_phone,
+                shipping_address=shipping_address,
+                billing_address=billing_address or shipping_address,
+                payment_method='card',
+                payment_status='processing',
+                status='processing',
+                total_amount=product.price * quantity,
+                grand_total=product.price * quantity,
+                ip_address=request.META.get('REMOTE_ADDR', ''),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            )
+            
+            # Create order item
+            WebsiteOrderItem.objects.create(
+                order=order,
+                product=product,
+                quantity=quantity,
+                unit_price=product.price,
+                total_price=product.price * quantity,
+            )
+            
+            # Hold the stock until the payment is confirmed
+            hold_order_stock([(product, quantity)], website_order=order)
         
-        # Create order item
-        WebsiteOrderItem.objects.create(
-            order=order,
-            product=product,
-            quantity=quantity,
-            unit_price=product.price,
-            total_price=product.price * quantity,
-        )
+        # Only charge for stock that is held; InsufficientStock above
+        # leaves no payment intent behind
+        amount = int(product.price * quantity * 100)  # Convert to cents
+        try:
+            intent = stripe.PaymentIntent.create(
+                amount=amount,
+                currency='usd',
+                metadata={
+                    'order_id': order.id,
+                    'customer_email': customer_email,
+                    'customer_name': customer_name,
+                }
+            )
+        except Exception:
+            release_order_stock(website_order=order)
+            order.status = 'cancelled'
+            order.save(update_fields=['status', 'updated_at'])
+            raise
+        order.stripe_payment_intent_id = intent.id
+        order.save(update_fields=['stripe_payment_intent_id', 'updated_at'])
         
         return JsonResponse({
             'success': True,
@@ -2038,72 +1979,33 @@ def api_delete_social_link(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
+@conditional_get(Product, ProductCategory, ImageAsset, extra=stock_state)
 def api_catalog_products(request):
     """
-    Get products for public catalog page with filtering and sorting.
+    Get a page of products for the public catalog with facet counts.
     Query params:
     - categories: comma-separated category IDs
-    - min_price: minimum price (default 0)
-    - max_price: maximum price (default 999999)
+    - min_price / max_price: price range
     - sort: newest|price_low|price_high|name (default newest)
+    - page, page_size: pagination (page_size max 100)
     """
     try:
-        from erp_api.models import Product
-        
-        # Get filter parameters
-        category_ids = request.GET.get('categories', '')
-        min_price = float(request.GET.get('min_price', 0))
-        max_price = float(request.GET.get('max_price', 999999))
-        sort_by = request.GET.get('sort', 'newest')
-        
-        # Base query - only active products
-        products = Product.objects.filter(is_active=True).select_related('category')
-        
-        # Filter by categories if provided
-        if category_ids:
-            category_list = [int(cid) for cid in category_ids.split(',') if cid.isdigit()]
-            if category_list:
-                products = products.filter(category_id__in=category_list)
-        
-        # Filter by price range
-        products = products.filter(price__gte=min_price, price__lte=max_price)
-        
-        # Apply sorting
-        if sort_by == 'price_low':
-            products = products.order_by('price')
-        elif sort_by == 'price_high':
-            products = products.order_by('-price')
-        elif sort_by == 'name':
-            products = products.order_by('name')
-        else:  # newest
-            products = products.order_by('-created_at')
-        
-        # Build product list
-        product_list = []
-        for product in products:
-            product_data = {
-                'id': product.id,
-                'name': product.name,
-                'description': product.description or '',
-                'price': float(product.price),
-                'cost_price': float(product.cost) if product.cost else None,
-                'discount_percent': getattr(product, 'discount_percent', 0),
-                'image': product.image.url if product.image else None,
-                'category': {
-                    'id': product.category.id,
-                    'name': product.category.name
-                } if product.category else None,
-                'stock_quantity': product.stock_quantity,
-                'sku': product.sku,
-            }
-            product_list.append(product_data)
+        query = CatalogQuery(request.GET)
+        results, count = query.results()
         
         return JsonResponse({
             'success': True,
-            'results': product_list,
-            'count': len(product_list)
+            'results': results,
+            'count': count,
+            'page': query.page,
+            'page_size': query.page_size,
+            'total_pages': (count + query.page_size - 1) // query.page_size,
+            'facets': query.facets(),
         })
     
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -2113,30 +2015,14 @@ def api_catalog_products(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@replica_reads
+@conditional_get(Product, ProductCategory)
 def api_product_categories(request):
     """
     Get all product categories with product count for catalog filters.
     """
     try:
-        from erp_api.models import Product, ProductCategory
-        
-        # Get all categories
-        categories = ProductCategory.objects.filter(is_active=True)
-        
-        category_list = []
-        for category in categories:
-            # Count products in this category
-            product_count = Product.objects.filter(
-                category=category,
-                is_active=True
-            ).count()
-            
-            category_data = {
-                'id': category.id,
-                'name': category.name,
-                'product_count': product_count
-            }
-            category_list.append(category_data)
+        category_list = category_counts()
         
         return JsonResponse({
             'success': True,
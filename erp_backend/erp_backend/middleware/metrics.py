@@ -0,0 +1,70 @@
+"""
+Middleware recording per-endpoint latency, query count, DB time and
+response size (see erp_api.metrics).
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from erp_api.metrics import registry
+
+
+class QueryTimer:
+    """connection.execute_wrapper that counts queries and their time"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Times each request and records it under its URL name and method.
+    Keep it first in MIDDLEWARE so the other middleware is timed too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        registry.record(
+            self.view_label(request), request.method, response.status_code, duration,
+            self.response_size(response), timer.queries, timer.duration,
+        )
+        registry.maybe_flush()
+        return response
+
+    @staticmethod
+    def view_label(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            # Keeps unknown paths from creating a series each
+            return 'unresolved'
+        return match.view_name or match.route or match._func_path
+
+    @staticmethod
+    def response_size(response):
+        if response.streaming:
+            return int(response.get('Content-Length') or 0)
+        return len(response.content)
@@ -0,0 +1,25 @@
+"""
+Middleware scoping read-replica routing to a request (see
+erp_api.replicas).
+"""
+from erp_api import replicas
+
+
+class ReplicaMiddleware:
+    """
+    Gives each request its own read state and pins clients that wrote to
+    the primary for REPLICA_STICKY_SECONDS. Keep it after
+    SessionMiddleware so saving the session does not count as a write.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if replicas.replica_alias() is None:
+            return self.get_response(request)
+
+        with replicas.request_scope() as state:
+            response = self.get_response(request)
+        if state.wrote:
+            replicas.pin(request, response)
+        return response
@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'erp_backend.middleware.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -38,6 +39,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'erp_backend.middleware.csrf_exempt_api.CSRFExemptAPIMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'erp_backend.middleware.replicas.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,6 +79,25 @@ DATABASES = {
     }
 }
 
+# Read replica (erp_api.replicas): list, report, export, search and catalog
+# views read from REPLICA_DATABASE unless the request, or the same client
+# within REPLICA_STICKY_SECONDS, has written. Set DB_REPLICA_NAME and/or
+# DB_REPLICA_HOST to add it; a second local schema (or, from a local settings
+# module, two SQLite files and REPLICA_DATABASE = 'replica') stands in for one.
+if os.getenv('DB_REPLICA_NAME') or os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['erp_api.replicas.ReplicaRouter']
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+REPLICA_STICKY_SECONDS = 5
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -108,12 +129,20 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content under MEDIA_ROOT/cas/
+# (erp_api.storage); sweep unreferenced files with collect_media_garbage
+STORAGES = {
+    'default': {'BACKEND': 'erp_api.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
 
 # CSRF settings - trust localhost:3000 for development (Vite frontend)
 CSRF_TRUSTED_ORIGINS = [
@@ -148,4 +177,78 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'
 # Stripe Configuration (Sandbox Mode)
 # Use environment variables for actual keys
 STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', 'pk_test_placeholder')
-STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', 'sk_test_placeholder')
\ No newline at end of file
+STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', 'sk_test_placeholder')
+# Cache Configuration
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) when running
+# several workers so invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'erp-default'),
+    }
+}
+
+# List page "stats" blocks
+STATS_CACHE_ALIAS = 'default'
+STATS_CACHE_TIMEOUT = 300  # seconds
+
+# Assembled homepage context, invalidated by Homepage*/Product signals
+HOMEPAGE_CACHE_ALIAS = 'default'
+HOMEPAGE_CACHE_TIMEOUT = 600  # seconds
+
+# Role/permission resolution (erp_api.roles): versions live in this cache,
+# resolved roles in a per-process cache for ROLE_CACHE_TIMEOUT seconds.
+# ROLE_JWT_CLAIM embeds the role in issued tokens so API requests skip
+# the profile query while the role is unchanged.
+ROLE_CACHE_ALIAS = 'default'
+ROLE_CACHE_TIMEOUT = 60  # seconds
+# None: decide from the backend (LocMemCache is per process, so role
+# claims are only trusted for ROLE_CACHE_TIMEOUT seconds after login)
+ROLE_CACHE_SHARED = None
+ROLE_JWT_CLAIM = True
+
+# Activity log (erp_api.activity): entries are queued after commit and
+# inserted in batches by a background thread; turn ACTIVITY_LOG_ASYNC off
+# to insert each entry in the request instead
+ACTIVITY_LOG_ASYNC = True
+ACTIVITY_LOG_BATCH_SIZE = 100
+ACTIVITY_LOG_FLUSH_INTERVAL = 2.0  # seconds
+ACTIVITY_LOG_QUEUE_SIZE = 10000  # entries; a full queue falls back to direct inserts
+
+# Activity log retention (python manage.py archive_activity_log): older
+# entries move to gzip JSON-lines files, still readable via /api/activity-logs/
+ACTIVITY_LOG_RETENTION_DAYS = 90
+ACTIVITY_LOG_ARCHIVE_DIR = BASE_DIR / 'archive' / 'activity_log'
+
+# Responsive images (erp_api.images): widths rendered for each upload, in
+# the original format and WebP, by IMAGE_WORKERS processes. Uploads of more
+# than IMAGE_INLINE_LIMIT files are rendered by the job worker instead.
+IMAGE_VARIANT_WIDTHS = (320, 640, 1024, 1600)
+IMAGE_QUALITY = 82
+IMAGE_WORKERS = 2
+IMAGE_INLINE_LIMIT = 4
+
+# Request metrics (erp_api.metrics), scraped from /api/metrics/. Set
+# METRICS_DIR when running several worker processes so the endpoint
+# reports all of them, and METRICS_TOKEN to require a bearer token.
+METRICS_ENABLED = True
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = 10.0  # seconds between a worker's dumps to METRICS_DIR
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+# Background jobs (run the worker with: python manage.py run_jobs)
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 2.0  # seconds
+
+# Search index: 'auto' uses MySQL FULLTEXT on MySQL and the token table
+# elsewhere; 'tokens' forces the token table (python manage.py rebuild_search_index)
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'auto')
+
+# Document numbers (erp_api.numbering): override a series' format or
+# block size, e.g. {'order': {'format': 'SO{number:06d}', 'block': 50}}
+NUMBER_SEQUENCES = {}
+
+# Checkout stock holds (sweep expired ones with: python manage.py release_stock_holds)
+STOCK_RESERVATION_TTL = 900  # seconds
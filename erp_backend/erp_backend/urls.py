@@ -14,11 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import os
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth.views import LoginView, LogoutView
+from erp_api.storage import CAS_PREFIX, serve_immutable
 
 urlpatterns = [
     # Admin panel
@@ -42,6 +45,11 @@ urlpatterns = [
 
 # Serve static files during development
 if settings.DEBUG:
+    # Content-addressed media never changes, so let browsers keep it
+    urlpatterns += [
+        re_path(rf'^{settings.MEDIA_URL.lstrip("/")}{CAS_PREFIX}/(?P<path>.*)$', serve_immutable,
+                {'document_root': os.path.join(settings.MEDIA_ROOT, CAS_PREFIX)}),
+    ]
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -45,18 +45,15 @@ const APIDebugPage = () => {
 
       // Test 4: Bulk save test
       addLog('🧪 Test 4: Testing bulk save endpoint...', 'info');
+      // Saves create or update the items sent and delete only the ids listed
+      // in `deleted`, so this only touches the test story and testimonial.
+      // Needs a staff login.
+      const testStory = { ...storyResponse.data, excerpt: 'Edited by the bulk save test' };
       const bulkResponse = await axios.post('/website/save-all/', {
-        features: [],
-        stories: [],
-        testimonials: [],
-        gallery: [],
-        faqs: [],
-        partners: [],
-        newsletter: { title: 'Test Newsletter', description: '', placeholder: 'test@test.com' },
-        siteInfo: { heading: 'Test', subheading: 'Test', description: '', hero_image: '' },
-        heroSection: { title: 'Test Hero', subtitle: 'Test Subtitle', image: '', cta_text: 'Test' },
+        stories: [testStory],
+        deleted: { testimonials: [testimonialResponse.data?.id] },
       });
-      addLog('✅ Bulk save successful!', 'success');
+      addLog('✅ Bulk save successful! ' + JSON.stringify(bulkResponse.data?.changes), 'success');
 
       addLog('🎉 All tests passed! API is working correctly.', 'success');
     } catch (error) {
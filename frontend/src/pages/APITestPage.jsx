@@ -36,15 +36,11 @@ const APITestPage = () => {
     setError(null);
     setResult(null);
     try {
-      const data = {
-        stories: [],
-        testimonials: [],
-        gallery: [],
-        faqs: [],
-        partners: [],
-        heroSection: {},
-        newsletter: {},
-      };
+      // Send the current stories back unchanged: saves only create or update
+      // items (deletions go in `deleted`), so this changes nothing. Needs a
+      // staff login.
+      const stories = await axios.get('/api/website/stories/');
+      const data = { stories: stories.data };
       console.log('Testing POST /api/website/save-all/', data);
       const response = await axios.post('/api/website/save-all/', data);
       console.log('Response:', response);
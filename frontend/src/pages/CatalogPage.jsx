@@ -10,6 +10,9 @@ export default function CatalogPage() {
   const [priceRange, setPriceRange] = useState([0, 1000]);
   const [sortBy, setSortBy] = useState('newest');
   const [loading, setLoading] = useState(true);
+  const [page, setPage] = useState(1);
+  const [totalPages, setTotalPages] = useState(1);
+  const [totalCount, setTotalCount] = useState(0);
   const [error, setError] = useState(null);
   const [isScrolled, setIsScrolled] = useState(false);
 
@@ -39,13 +42,15 @@ export default function CatalogPage() {
     }
   };
 
-  const loadProducts = async () => {
+  // The catalog API is paginated: page 1 replaces the list, later pages append to it
+  const loadProducts = async (nextPage = 1) => {
     try {
       setLoading(true);
       const params = {
         min_price: priceRange[0],
         max_price: priceRange[1],
         sort: sortBy,
+        page: nextPage,
       };
 
       if (selectedCategories.length > 0) {
@@ -55,7 +60,10 @@ export default function CatalogPage() {
       const response = await axios.get('/products/catalog/', { params });
 
       if (response.data.results) {
-        setProducts(response.data.results);
+        setProducts((prev) => (nextPage > 1 ? [...prev, ...response.data.results] : response.data.results));
+        setPage(response.data.page || nextPage);
+        setTotalPages(response.data.total_pages || 1);
+        setTotalCount(response.data.count ?? response.data.results.length);
         setError(null);
       }
     } catch (err) {
@@ -242,7 +250,8 @@ export default function CatalogPage() {
                 <div className="mb-8 flex justify-between items-center">
                   <div>
                     <p className="text-gray-600">
-                      Showing <span className="font-bold text-gray-900">{products.length}</span> product{products.length !== 1 ? 's' : ''}
+                      Showing <span className="font-bold text-gray-900">{products.length}</span> of{' '}
+                      <span className="font-bold text-gray-900">{totalCount}</span> product{totalCount !== 1 ? 's' : ''}
                     </p>
                   </div>
                 </div>
@@ -321,6 +330,19 @@ export default function CatalogPage() {
                     </div>
                   ))}
                 </div>
+
+                {/* Load More */}
+                {page < totalPages && (
+                  <div className="mt-10 text-center">
+                    <button
+                      onClick={() => loadProducts(page + 1)}
+                      disabled={loading}
+                      className="bg-white border-2 border-blue-600 text-blue-600 px-8 py-3 rounded-full font-semibold hover:bg-blue-50 transition-colors disabled:opacity-50"
+                    >
+                      {loading ? 'Loading...' : 'Load more products'}
+                    </button>
+                  </div>
+                )}
               </>
             )}
           </div>